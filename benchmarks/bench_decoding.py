@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+响应解码基准测试
+对比原先的 json.loads(r.text)['content'] 与 api.decoding 的字节解析 + 字段投影，
+统计每轮轮询（N 个频道）的解析耗时、峰值内存以及解析结果常驻内存。
+可用 --payloads 指定保存了真实 live-detail 响应体的目录（*.json），例如：
+    curl -s https://api.chzzk.naver.com/service/v1/channels/<id>/live-detail > payloads/<id>.json
+未指定时使用内置的样例响应
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from api import decoding
+from api.decoding import decode_live_detail
+
+
+def sample_payload(index: int) -> bytes:
+    """构造与 live-detail 结构一致的样例响应（含体积较大的 livePlaybackJson）"""
+    playback = {
+        'meta': {'videoId': f'{index:032X}', 'streamSeq': index, 'liveId': index, 'paidLive': False},
+        'media': [{
+            'mediaId': protocol,
+            'protocol': protocol,
+            'path': f'https://livecloud.pstatic.net/chzzk/lip2_kr/{index:08x}/hls_playlist.m3u8?hdnts=' + 'x' * 220,
+            'encodingTrack': [{
+                'encodingTrackId': f'{height}p',
+                'videoProfile': 'high', 'audioProfile': 'LC', 'videoCodec': 'H264',
+                'videoBitRate': height * 10000, 'audioBitRate': 192000,
+                'videoFrameRate': '60.0', 'videoWidth': height * 16 // 9, 'videoHeight': height,
+                'audioSamplingRate': 48000, 'audioChannel': 2, 'avoidReencoding': False
+            } for height in (1080, 720, 480, 360, 144)]
+        } for protocol in ('HLS', 'LLHLS')],
+        'thumbnail': {'snapshotThumbnailTemplate': 'https://livecloud-thumb.akamaized.net/{type}/' + 'y' * 120},
+        'multiview': []
+    }
+    content = {
+        'liveId': index,
+        'liveTitle': f'Benchmark stream {index} 방송 중',
+        'status': 'OPEN',
+        'liveImageUrl': f'https://livecloud-thumb.akamaized.net/chzzk/livecloud/KR/stream/{index}/live/image_{{type}}.jpg',
+        'defaultThumbnailImageUrl': None,
+        'concurrentUserCount': 1234 + index,
+        'accumulateCount': 56789,
+        'openDate': '2024-05-01 20:00:00',
+        'closeDate': None,
+        'adult': False,
+        'tags': ['게임', '토크', 'benchmark'],
+        'chatChannelId': f'N1{index:010x}',
+        'categoryType': 'GAME',
+        'liveCategory': 'League_of_Legends',
+        'liveCategoryValue': 'League of Legends',
+        'chatActive': True,
+        'chatAvailableGroup': 'ALL',
+        'paidPromotion': False,
+        'chatAvailableCondition': 'NONE',
+        'minFollowerMinute': 0,
+        'livePlaybackJson': json.dumps(playback),
+        'p2pQuality': ['720p', '480p', '360p'],
+        'channel': {
+            'channelId': f'{index:032x}',
+            'channelName': f'channel{index}',
+            'channelImageUrl': f'https://nng-phinf.pstatic.net/MjAyMzEy/{index}.png',
+            'verifiedMark': False
+        },
+        'livePollingStatusJson': json.dumps({'status': 'STARTED', 'isPublishing': True, 'playableStatus': 'PLAYABLE',
+                                             'trafficThrottling': -1, 'callPeriodMilliSecond': 10000}),
+        'userAdultStatus': None,
+        'chatDonationRankingExposure': True,
+        'adParameter': {'tag': ''}
+    }
+    return json.dumps({'code': 200, 'message': None, 'content': content}, ensure_ascii=False).encode()
+
+
+def load_payloads(directory: str) -> list:
+    payloads = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        with open(path, 'rb') as f:
+            payloads.append(f.read())
+    if not payloads:
+        sys.exit(f'No *.json payloads found in {directory}')
+    return payloads
+
+
+def legacy_decode(body: bytes):
+    # 原实现：先解码为 str（r.text），再构建完整字典
+    return json.loads(body.decode('utf-8'))['content']
+
+
+def run(decode, bodies: list, rounds: int):
+    """返回 (每轮耗时秒, 每轮峰值内存字节, 解析结果常驻内存字节)"""
+    decode(bodies[0])  # 预热
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        results = [decode(body) for body in bodies]
+    elapsed = (time.perf_counter() - start) / rounds
+    del results
+
+    tracemalloc.start()
+    results = [decode(body) for body in bodies]
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    return elapsed, peak, retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Chzzk response decoding benchmark')
+    parser.add_argument('--payloads', help='保存了真实响应体的目录（*.json）')
+    parser.add_argument('--channels', type=int, default=300, help='每轮轮询的频道数')
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    payloads = load_payloads(args.payloads) if args.payloads else [sample_payload(i) for i in range(32)]
+    bodies = [payloads[i % len(payloads)] for i in range(args.channels)]
+    avg_size = sum(len(body) for body in bodies) / len(bodies)
+
+    print(f"{len(bodies)} channels/poll, avg payload {avg_size / 1024:.1f} KiB, "
+          f"parser: {'orjson' if decoding.orjson is not None else 'json'}")
+    print(f"{'decoder':>10} {'ms/poll':>8} {'us/resp':>8} {'peak KiB':>9} {'kept KiB':>9}")
+    for name, decode in (('legacy', legacy_decode), ('projected', decode_live_detail)):
+        elapsed, peak, retained = run(decode, bodies, args.rounds)
+        print(f"{name:>10} {elapsed * 1000:>8.2f} {elapsed / len(bodies) * 1e6:>8.1f} "
+              f"{peak / 1024:>9.0f} {retained / 1024:>9.0f}")
+
+
+if __name__ == '__main__':
+    main()
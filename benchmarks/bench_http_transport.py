@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP传输层基准测试
+在本地启动一个模拟 api.chzzk.naver.com 的 HTTPS 服务（自签名证书，需要 openssl），
+对比每次新建连接的 requests.get 与共享连接池会话的单次请求延迟
+"""
+
+import argparse
+import http.server
+import json
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import requests
+import urllib3
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from api.http_transport import create_session
+from core.channel_poller import percentile
+
+urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+PAYLOAD = json.dumps({
+    'code': 200,
+    'message': None,
+    'content': {'channelId': '0' * 32, 'channelName': 'bench', 'channelImageUrl': '', 'openLive': False}
+}).encode()
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # 支持 keep-alive
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(workdir: str) -> int:
+    """生成自签名证书并启动本地HTTPS服务，返回端口"""
+    cert = os.path.join(workdir, 'cert.pem')
+    key = os.path.join(workdir, 'key.pem')
+    subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                    '-subj', '/CN=localhost', '-keyout', key, '-out', cert],
+                   check=True, capture_output=True)
+
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(cert, key)
+    server.socket = context.wrap_socket(server.socket, server_side=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+def measure(get, url: str, count: int):
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        with get(url, timeout=(5, 15), verify=False) as r:
+            r.content
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP transport benchmark')
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        port = start_server(workdir)
+        url = f'https://127.0.0.1:{port}/service/v1/channels/{"0" * 32}/live-detail'
+
+        session = create_session()
+        results = {
+            'requests.get (new connection)': measure(requests.get, url, args.requests),
+            'pooled session (keep-alive)': measure(session.get, url, args.requests),
+        }
+
+    print(f"{'mode':<32} {'avg(ms)':>8} {'p50(ms)':>8} {'p95(ms)':>8}")
+    for mode, latencies in results.items():
+        avg = sum(latencies) / len(latencies)
+        print(f"{mode:<32} {avg * 1000:>8.2f} {percentile(latencies, 0.5) * 1000:>8.2f} "
+              f"{percentile(latencies, 0.95) * 1000:>8.2f}")
+
+
+if __name__ == '__main__':
+    main()
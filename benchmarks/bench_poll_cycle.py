@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+轮询周期基准测试
+使用模拟延迟的状态检查函数，对比串行与并发轮询在不同频道数下的单轮耗时
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from core.channel_poller import ChannelPoller
+
+
+def fake_check(latency: float, jitter: float):
+    """构造一个模拟网络延迟的状态检查函数"""
+    def check(channel_id):
+        time.sleep(max(0.0, random.gauss(latency, jitter)))
+        return {'isLive': False, 'liveTitle': '', 'viewerCount': 0}
+    return check
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Channel poll cycle benchmark')
+    parser.add_argument('--channels', type=int, nargs='+', default=[10, 50, 100, 300])
+    parser.add_argument('--latency', type=float, default=0.05, help='模拟单次请求延迟（秒）')
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--skip-serial', action='store_true', help='跳过串行基线')
+    args = parser.parse_args()
+
+    check = fake_check(args.latency, args.jitter)
+    poller = ChannelPoller(check, max_workers=args.workers)
+
+    print(f"{'channels':>8} {'serial(s)':>10} {'concurrent(s)':>14} {'p50(ms)':>8} {'p95(ms)':>8}")
+    for count in args.channels:
+        channel_ids = [f"{i:032x}" for i in range(count)]
+
+        serial = float('nan')
+        if not args.skip_serial:
+            start = time.monotonic()
+            for channel_id in channel_ids:
+                check(channel_id)
+            serial = time.monotonic() - start
+
+        poller.poll(channel_ids)
+        stats = poller.last_stats
+        print(f"{count:>8} {serial:>10.2f} {stats['wall_time']:>14.2f} "
+              f"{stats['latency_p50'] * 1000:>8.0f} {stats['latency_p95'] * 1000:>8.0f}")
+
+    poller.shutdown()
+
+
+if __name__ == '__main__':
+    main()
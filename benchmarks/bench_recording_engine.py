@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+录制引擎基准测试
+对本地 HLS 模拟服务器同时录制 N 路直播，对比 CLI 引擎（每路一个 streamlink 进程）
+与进程内引擎（工作进程池）的启动延迟（启动到录制文件写入第一个字节）与常驻内存总量
+需要安装 streamlink；psutil 可选（没有时从 /proc 读取 RSS，仅限 Linux）
+"""
+
+import argparse
+import math
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from core.streamlink_engine import StreamlinkSessionEngine
+from hls_standin import HLSStandIn
+
+try:
+    import psutil
+except ImportError:  # 可选依赖
+    psutil = None
+
+
+def rss_bytes(pid: int) -> int:
+    """进程常驻内存（字节）"""
+    if psutil is not None:
+        try:
+            return psutil.Process(pid).memory_info().rss
+        except psutil.Error:
+            return 0
+    try:
+        with open(f'/proc/{pid}/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def wait_first_bytes(paths, started, timeout: float):
+    """等待每个录制文件写入第一个字节，返回各路启动延迟（超时为None）"""
+    latencies = [None] * len(paths)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and any(latency is None for latency in latencies):
+        for index, path in enumerate(paths):
+            if latencies[index] is None:
+                try:
+                    if os.path.getsize(path) > 0:
+                        latencies[index] = time.monotonic() - started[index]
+                except OSError:
+                    pass
+        time.sleep(0.05)
+    return latencies
+
+
+def run_cli(urls, paths, timeout: float):
+    processes, started = [], []
+    for url, path in zip(urls, paths):
+        started.append(time.monotonic())
+        processes.append(subprocess.Popen(['streamlink', f'hls://{url}', 'best', '-o', path],
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+    latencies = wait_first_bytes(paths, started, timeout)
+    rss = sum(rss_bytes(process.pid) for process in processes)
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+    return latencies, rss, len(processes)
+
+
+def run_session(urls, paths, timeout: float, workers: int):
+    engine = StreamlinkSessionEngine(max_workers=workers, streams_per_worker=math.ceil(len(urls) / workers))
+    recordings, started = [], []
+    for index, (url, path) in enumerate(zip(urls, paths)):
+        started.append(time.monotonic())
+        recordings.append(engine.start(f'bench{index}', f'hls://{url}', 'best', path))
+    latencies = wait_first_bytes(paths, started, timeout)
+    worker_pids = [worker['pid'] for worker in engine.snapshot()]
+    rss = sum(rss_bytes(pid) for pid in worker_pids)
+    for recording in recordings:
+        recording.terminate()
+    engine.shutdown()
+    return latencies, rss, len(worker_pids)
+
+
+def report(name: str, latencies, rss: int, processes: int):
+    started = sorted(latency for latency in latencies if latency is not None)
+    p50 = statistics.median(started) if started else float('nan')
+    p95 = started[min(len(started) - 1, int(len(started) * 0.95))] if started else float('nan')
+    print(f"{name:>8} {len(started):>4}/{len(latencies):<4} {p50 * 1000:>9.0f} {p95 * 1000:>9.0f} "
+          f"{processes:>6} {rss / 2 ** 20:>10.1f} {rss / 2 ** 20 / max(len(latencies), 1):>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recording engine benchmark')
+    parser.add_argument('--recordings', type=int, default=50)
+    parser.add_argument('--workers', type=int, default=4, help='进程内引擎的工作进程数')
+    parser.add_argument('--segment-duration', type=float, default=1.0)
+    parser.add_argument('--segment-size', type=int, default=188 * 2048, help='分段大小（字节）')
+    parser.add_argument('--timeout', type=float, default=60, help='等待首字节的最长时间（秒）')
+    parser.add_argument('--engines', nargs='+', default=['cli', 'session'], choices=['cli', 'session'])
+    args = parser.parse_args()
+
+    if shutil.which('streamlink') is None and 'cli' in args.engines:
+        parser.error("streamlink CLI not found")
+    if not StreamlinkSessionEngine.available() and 'session' in args.engines:
+        parser.error("streamlink Python package not found")
+
+    print(f"{'engine':>8} {'started':>9} {'p50(ms)':>9} {'p95(ms)':>9} {'procs':>6} {'RSS(MiB)':>10} "
+          f"{'MiB/rec':>10}")
+    with HLSStandIn(segment_duration=args.segment_duration, segment_size=args.segment_size) as standin:
+        urls = [standin.playlist_url(f'ch{index}') for index in range(args.recordings)]
+        for engine in args.engines:
+            with tempfile.TemporaryDirectory() as tmp:
+                paths = [os.path.join(tmp, f'{index}.ts') for index in range(args.recordings)]
+                if engine == 'cli':
+                    report(engine, *run_cli(urls, paths, args.timeout))
+                else:
+                    report(engine, *run_session(urls, paths, args.timeout, args.workers))
+
+
+if __name__ == '__main__':
+    main()
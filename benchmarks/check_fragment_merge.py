@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+续录片段合并校验
+生成与 HLS 分段结构相同的合成数据（MPEG-TS：PAT/PMT + H.264/AAC PES；fMP4：ftyp/moov 初始化信息 + moof/mdat 分片），
+把“前一个文件”和与之重叠、有缺口或时间轴不同的续录片段交给 merge_fragments，
+校验合并结果与直接连续录制的字节完全一致（或按预期保留为独立文件）。不依赖 ffmpeg
+
+运行: python benchmarks/check_fragment_merge.py
+"""
+
+import os
+import struct
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from utils.ts_merge import merge_fragments, TS_PACKET_SIZE
+
+VIDEO_PID, AUDIO_PID, PMT_PID = 0x100, 0x101, 0x1000
+FRAMES_PER_SEGMENT = 60
+FRAME_TICKS = 1500  # 90kHz 下 60fps
+
+
+# ---------- MPEG-TS ----------
+
+def _crc32_mpeg(data: bytes) -> int:
+    crc = 0xFFFFFFFF
+    for byte in data:
+        crc ^= byte << 24
+        for _ in range(8):
+            crc = (crc << 1) ^ 0x04C11DB7 if crc & 0x80000000 else crc << 1
+        crc &= 0xFFFFFFFF
+    return crc
+
+
+def _psi_packet(pid: int, table: bytes, cc: int) -> bytes:
+    section = table + struct.pack('>I', _crc32_mpeg(table))
+    payload = b'\x00' + section
+    return bytes([0x47, 0x40 | pid >> 8, pid & 0xFF, 0x10 | cc]) + payload + b'\xff' * (184 - len(payload))
+
+
+def _pat(cc: int) -> bytes:
+    body = struct.pack('>HBBB', 1, 0xC1, 0, 0) + struct.pack('>HH', 1, 0xE000 | PMT_PID)
+    return _psi_packet(0, bytes([0x00]) + struct.pack('>H', 0xB000 | (len(body) + 4)) + body, cc)
+
+
+def _pmt(cc: int) -> bytes:
+    streams = bytes([0x1B]) + struct.pack('>HH', 0xE000 | VIDEO_PID, 0xF000) + \
+        bytes([0x0F]) + struct.pack('>HH', 0xE000 | AUDIO_PID, 0xF000)
+    body = struct.pack('>HBBB', 1, 0xC1, 0, 0) + struct.pack('>HH', 0xE000 | VIDEO_PID, 0xF000) + streams
+    return _psi_packet(PMT_PID, bytes([0x02]) + struct.pack('>H', 0xB000 | (len(body) + 4)) + body, cc)
+
+
+def _pts_bytes(pts: int) -> bytes:
+    return bytes([0x21 | (pts >> 29) & 0x0E, (pts >> 22) & 0xFF, 0x01 | (pts >> 14) & 0xFE,
+                  (pts >> 7) & 0xFF, 0x01 | (pts << 1) & 0xFE])
+
+
+def _pes_packets(pid: int, stream_id: int, pts: int, es: bytes, counters: dict) -> bytes:
+    pes = b'\x00\x00\x01' + bytes([stream_id]) + b'\x00\x00' + b'\x80\x80\x05' + _pts_bytes(pts) + es
+    out = bytearray()
+    first = True
+    while pes:
+        chunk, pes = pes[:184], pes[184:]
+        cc = counters[pid] = (counters[pid] + 1) & 0x0F
+        header = bytes([0x47, (0x40 if first else 0) | pid >> 8, pid & 0xFF])
+        if len(chunk) < 184:
+            stuffing = 184 - len(chunk) - 1
+            adaptation = bytes([stuffing]) + (b'\x00' + b'\xff' * (stuffing - 1) if stuffing else b'')
+            out += header + bytes([0x30 | cc]) + adaptation + chunk
+        else:
+            out += header + bytes([0x10 | cc]) + chunk
+        first = False
+    return bytes(out)
+
+
+def ts_segments(count: int, base_pts: int = 900000) -> list:
+    """连续的 TS 分段（连续计数器跨分段连续），每个分段以 PAT/PMT 与 IDR 帧开始"""
+    counters = {0: 15, PMT_PID: 15, VIDEO_PID: 15, AUDIO_PID: 15}
+    segments = []
+    for sequence in range(count):
+        data = bytearray()
+        for pid, make in ((0, _pat), (PMT_PID, _pmt)):
+            counters[pid] = (counters[pid] + 1) & 0x0F
+            data += make(counters[pid])
+        for frame in range(FRAMES_PER_SEGMENT):
+            pts = base_pts + (sequence * FRAMES_PER_SEGMENT + frame) * FRAME_TICKS
+            nal = b'\x00\x00\x00\x01' + (b'\x65' if frame == 0 else b'\x41')
+            data += _pes_packets(VIDEO_PID, 0xE0, pts, nal + bytes([sequence & 0xFF, frame]) * 200, counters)
+            if frame % 2 == 0:
+                data += _pes_packets(AUDIO_PID, 0xC0, pts, b'\xff\xf1' + bytes([frame]) * 300, counters)
+        segments.append(bytes(data))
+    return segments
+
+
+# ---------- fMP4 ----------
+
+def _box(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack('>I4s', 8 + len(payload), kind) + payload
+
+
+def _full_box(kind: bytes, version: int, payload: bytes) -> bytes:
+    return _box(kind, bytes([version, 0, 0, 0]) + payload)
+
+
+def fmp4_init(timescale: int = 90000) -> bytes:
+    traks = b''
+    for track_id, scale in ((1, timescale), (2, 48000)):
+        tkhd = _full_box(b'tkhd', 0, struct.pack('>III', 0, 0, track_id) + bytes(68))
+        mdhd = _full_box(b'mdhd', 0, struct.pack('>IIII', 0, 0, scale, 0) + bytes(4))
+        traks += _box(b'trak', tkhd + _box(b'mdia', mdhd))
+    return _box(b'ftyp', b'iso6\x00\x00\x02\x00iso6mp41') + _box(b'moov', _full_box(b'mvhd', 0, bytes(96)) + traks)
+
+
+def fmp4_segments(count: int, first: int = 0) -> list:
+    """连续的 fMP4 分片：每个分片一个 moof（两条轨道的 tfdt）与一个 mdat"""
+    segments = []
+    for sequence in range(first, first + count):
+        trafs = b''
+        for track_id, duration in ((1, 2 * 90000), (2, 2 * 48000)):
+            tfhd = _full_box(b'tfhd', 0, struct.pack('>I', track_id))
+            tfdt = _full_box(b'tfdt', 1, struct.pack('>Q', sequence * duration))
+            trafs += _box(b'traf', tfhd + tfdt)
+        moof = _box(b'moof', _full_box(b'mfhd', 0, struct.pack('>I', sequence + 1)) + trafs)
+        segments.append(moof + _box(b'mdat', bytes([sequence & 0xFF]) * 4000))
+    return segments
+
+
+# ---------- 校验 ----------
+
+def strip_bridges(data: bytes) -> bytes:
+    """去掉合并时插入的过渡包（只有适配字段、设置 discontinuity_indicator）"""
+    packets = [data[i:i + TS_PACKET_SIZE] for i in range(0, len(data), TS_PACKET_SIZE)]
+    return b''.join(packet for packet in packets if not (packet[3] & 0x30 == 0x20 and packet[5] == 0x80))
+
+
+def run_case(name: str, target: bytes, fragment: bytes, expected: bytes = None, separate: bool = False) -> bool:
+    with tempfile.TemporaryDirectory() as tmp:
+        target_path = os.path.join(tmp, 'rec.ts')
+        fragment_path = os.path.join(tmp, 'rec_resume_1700000000.ts')
+        with open(target_path, 'wb') as f:
+            f.write(target)
+        with open(fragment_path, 'wb') as f:
+            f.write(fragment)
+        outputs = merge_fragments([target_path, fragment_path])
+        with open(target_path, 'rb') as f:
+            merged = f.read()
+    if separate:
+        ok = len(outputs) == 2 and merged == target
+    elif expected is None:
+        # 有缺口的 TS：除插入的过渡包外与两个文件直接相接一致
+        ok = len(outputs) == 1 and merged.startswith(target) and \
+            strip_bridges(merged[len(target):]) == fragment and len(merged) > len(target) + len(fragment)
+    else:
+        ok = len(outputs) == 1 and merged == expected
+    print(f"{'PASS' if ok else 'FAIL'}  {name}")
+    return ok
+
+
+def main():
+    results = []
+    ts = ts_segments(16)
+    results.append(run_case('ts: overlapping fragment joins at the shared keyframe',
+                            b''.join(ts[:10]), b''.join(ts[7:16]), b''.join(ts)))
+    results.append(run_case('ts: half-written packet at the end of the target',
+                            b''.join(ts[:10]) + ts[10][:1000], b''.join(ts[8:16]), b''.join(ts)))
+    results.append(run_case('ts: fragment after a gap is appended with bridge packets',
+                            b''.join(ts[:10]), b''.join(ts[12:16])))
+
+    init = fmp4_init()
+    fm = fmp4_segments(16)
+    results.append(run_case('fmp4: overlapping fragment drops repeated fragments',
+                            init + b''.join(fm[:10]), init + b''.join(fm[7:16]), init + b''.join(fm)))
+    results.append(run_case('fmp4: incomplete fragment at the end of the target is cut',
+                            init + b''.join(fm[:10]) + fm[10][:1500], init + b''.join(fm[9:16]),
+                            init + b''.join(fm)))
+    results.append(run_case('fmp4: fragment after a gap is appended',
+                            init + b''.join(fm[:10]), init + b''.join(fm[12:16]),
+                            init + b''.join(fm[:10]) + b''.join(fm[12:16])))
+    results.append(run_case('fmp4: restarted timeline is kept separate',
+                            init + b''.join(fmp4_segments(4, first=1000)), init + b''.join(fm[:4]),
+                            separate=True))
+    results.append(run_case('fmp4: different initialization segment is kept separate',
+                            init + b''.join(fm[:10]), fmp4_init(1000) + b''.join(fm[7:16]), separate=True))
+    results.append(run_case('mixed containers are kept separate',
+                            b''.join(ts[:10]), init + b''.join(fm[7:16]), separate=True))
+
+    print(f"{sum(results)}/{len(results)} passed")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地 HLS 直播模拟服务器
+按时间滑动窗口生成直播播放列表与固定大小的 TS 分段，可模拟请求延迟与分段失败，
+供录制引擎基准测试与录制后端的本地测试使用。
+指定 token 时模拟 Chzzk 的鉴权：播放列表地址带 hdnts 令牌，分段为 .m4v，不带 __bgda__ 令牌的分段请求返回 403
+
+单独运行: python benchmarks/hls_standin.py --port 8089
+播放列表: http://127.0.0.1:8089/live/<任意名称>/playlist.m3u8
+"""
+
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, quote_plus, urlencode, urlparse
+
+TS_PACKET_SIZE = 188
+
+
+def make_segment(sequence: int, size: int) -> bytes:
+    """生成由 188 字节 TS 包组成的分段，每个包带同步字节与分段序号，便于校验顺序"""
+    packets = max(1, size // TS_PACKET_SIZE)
+    header = b'\x47\x01\x00\x10' + sequence.to_bytes(8, 'big')
+    packet = header + bytes(TS_PACKET_SIZE - len(header))
+    return packet * packets
+
+
+def segment_sequence(segment: bytes) -> int:
+    """读取 make_segment 生成的分段序号"""
+    return int.from_bytes(segment[4:12], 'big')
+
+
+class HLSStandIn:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, segment_duration: float = 2.0,
+                 segment_size: int = 188 * 1024, window: int = 6, latency: float = 0.0,
+                 fail_rate: float = 0.0, end_after: int = None, token: str = None):
+        self.segment_duration = segment_duration
+        self.segment_size = segment_size
+        self.window = window
+        self.latency = latency  # 每个请求的附加延迟（秒）
+        self.fail_rate = fail_rate  # 分段请求返回 503 的概率
+        self.end_after = end_after  # 生成多少个分段后结束直播（EXT-X-ENDLIST）
+        self.token = token  # 分段请求需要的 __bgda__ 令牌
+        self.segment_suffix = '.m4v' if token else '.ts'
+        self.rejected = 0  # 缺少令牌被拒绝的分段请求数
+        self.started_at = time.time()
+        self.requests = 0
+        self.failures = 0
+        self._segments = {}
+        self._lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def playlist_url(self, name: str = 'stream') -> str:
+        url = f"{self.url}/live/{name}/playlist.m3u8"
+        return f"{url}?{urlencode({'hdnts': self.token}, quote_via=quote_plus)}" if self.token else url
+
+    def current_sequence(self) -> int:
+        sequence = int((time.time() - self.started_at) / self.segment_duration) + self.window
+        return sequence if self.end_after is None else min(sequence, self.end_after)
+
+    def playlist(self) -> str:
+        last = self.current_sequence()
+        first = max(0, last - self.window)
+        lines = ['#EXTM3U', '#EXT-X-VERSION:3', f'#EXT-X-TARGETDURATION:{int(self.segment_duration + 0.999)}',
+                 f'#EXT-X-MEDIA-SEQUENCE:{first}']
+        for sequence in range(first, last):
+            lines += [f'#EXTINF:{self.segment_duration:.3f},', f'{sequence}{self.segment_suffix}']
+        if self.end_after is not None and last >= self.end_after:
+            lines.append('#EXT-X-ENDLIST')
+        return '\n'.join(lines) + '\n'
+
+    def segment(self, sequence: int) -> bytes:
+        with self._lock:
+            data = self._segments.get(sequence)
+            if data is None:
+                data = self._segments[sequence] = make_segment(sequence, self.segment_size)
+                # 只保留窗口附近的分段
+                for old in [key for key in self._segments if key < sequence - self.window * 2]:
+                    del self._segments[old]
+            return data
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status: int, body: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                standin.requests += 1
+                if standin.latency:
+                    time.sleep(standin.latency)
+                url = urlparse(self.path)
+                parts = url.path.strip('/').split('/')
+                if len(parts) == 3 and parts[0] == 'live' and parts[2] == 'playlist.m3u8':
+                    self._send(200, standin.playlist().encode(), 'application/vnd.apple.mpegurl')
+                    return
+                if len(parts) == 3 and parts[0] == 'live' and parts[2].endswith(standin.segment_suffix):
+                    try:
+                        sequence = int(parts[2][:-len(standin.segment_suffix)])
+                    except ValueError:
+                        self._send(404, b'', 'text/plain')
+                        return
+                    if standin.token and dict(parse_qsl(url.query)).get('__bgda__') != standin.token:
+                        standin.rejected += 1
+                        self._send(403, b'', 'text/plain')
+                        return
+                    if sequence >= standin.current_sequence():
+                        self._send(404, b'', 'text/plain')
+                        return
+                    if standin.fail_rate and random.random() < standin.fail_rate:
+                        standin.failures += 1
+                        self._send(503, b'', 'text/plain')
+                        return
+                    self._send(200, standin.segment(sequence), 'video/mp2t')
+                    return
+                self._send(404, b'', 'text/plain')
+
+        return Handler
+
+    def start(self) -> 'HLSStandIn':
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self) -> 'HLSStandIn':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local HLS live stand-in server')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--segment-duration', type=float, default=2.0)
+    parser.add_argument('--segment-size', type=int, default=188 * 1024, help='分段大小（字节）')
+    parser.add_argument('--window', type=int, default=6)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--token', default=None, help='模拟 Chzzk 分段鉴权的 hdnts 令牌')
+    args = parser.parse_args()
+
+    standin = HLSStandIn(port=args.port, segment_duration=args.segment_duration, segment_size=args.segment_size,
+                         window=args.window, latency=args.latency, fail_rate=args.fail_rate, token=args.token)
+    print(f"Serving {standin.playlist_url()}")
+    try:
+        standin.server.serve_forever()
+    except KeyboardInterrupt:
+        standin.stop()
+
+
+if __name__ == '__main__':
+    main()
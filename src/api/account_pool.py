@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多账号 Cookie 池
+在多组 NID_AUT/NID_SES 之间按轮询或最少在途请求选择账号，每个账号使用独立的限流桶；
+Cookie 失效的账号自动隔离一段时间，成人直播频道固定使用可观看成人内容的账号
+"""
+
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set
+
+from api.cookie_health import cookie_fingerprint
+
+logger = logging.getLogger(__name__)
+
+ROUND_ROBIN = 'round_robin'
+LEAST_LOADED = 'least_loaded'
+
+PLACEHOLDER_COOKIES = {'YOUR_NID_AUT_HERE', 'YOUR_NID_SES_HERE'}
+
+
+class ChzzkAccount:
+    def __init__(self, name: str, nid_aut: str, nid_ses: str, adult: bool = False):
+        self.name = name
+        self.nid_aut = nid_aut
+        self.nid_ses = nid_ses
+        self.adult = adult  # 账号已完成成人认证
+        self.fingerprint = cookie_fingerprint(nid_aut, nid_ses)
+        self.in_flight = 0
+        self.total_requests = 0
+        self.quarantined_until = 0.0
+        self.quarantine_reason = ''
+
+    @property
+    def cookies(self) -> Dict[str, str]:
+        if not self.nid_aut or not self.nid_ses:
+            return {}
+        return {'NID_AUT': self.nid_aut, 'NID_SES': self.nid_ses}
+
+    def is_quarantined(self, now: float = None) -> bool:
+        return (time.time() if now is None else now) < self.quarantined_until
+
+
+def accounts_from_config(recording_config: Dict) -> List[ChzzkAccount]:
+    """从配置的 recording 段读取账号：优先使用 accounts 列表，否则使用单组 nid_aut/nid_ses"""
+    entries = recording_config.get('accounts') or [{
+        'name': 'default',
+        'nid_aut': recording_config.get('nid_aut', ''),
+        'nid_ses': recording_config.get('nid_ses', ''),
+        'adult': recording_config.get('adult', False)
+    }]
+    accounts = []
+    for index, entry in enumerate(entries):
+        nid_aut, nid_ses = entry.get('nid_aut', ''), entry.get('nid_ses', '')
+        if not nid_aut or not nid_ses or nid_aut in PLACEHOLDER_COOKIES or nid_ses in PLACEHOLDER_COOKIES:
+            logger.warning(f"Skipping account {entry.get('name', index)}: cookie missing or placeholder")
+            continue
+        accounts.append(ChzzkAccount(entry.get('name') or f'account{index}', nid_aut, nid_ses,
+                                     adult=bool(entry.get('adult', False))))
+    return accounts
+
+
+class AccountPool:
+    def __init__(self, accounts: List[ChzzkAccount], strategy: str = LEAST_LOADED,
+                 quarantine_seconds: float = 600):
+        # 未配置有效账号时以未登录状态请求
+        self.accounts = list(accounts) or [ChzzkAccount('anonymous', '', '')]
+        self.strategy = strategy if strategy in (ROUND_ROBIN, LEAST_LOADED) else LEAST_LOADED
+        self.quarantine_seconds = quarantine_seconds
+        self._lock = threading.Lock()
+        self._cycle = itertools.count()
+        self._adult_channels: Set[str] = set()  # 需要成人认证账号才能查看的频道
+
+    @classmethod
+    def from_config(cls, recording_config: Dict) -> 'AccountPool':
+        return cls(accounts_from_config(recording_config),
+                   strategy=recording_config.get('account_selection', LEAST_LOADED),
+                   quarantine_seconds=recording_config.get('account_quarantine_seconds', 600))
+
+    @classmethod
+    def single(cls, nid_aut: str, nid_ses: str) -> 'AccountPool':
+        return cls([ChzzkAccount('default', nid_aut, nid_ses)])
+
+    def _select(self, adult: bool) -> Optional[ChzzkAccount]:
+        now = time.time()
+        candidates = [account for account in self.accounts
+                      if not account.is_quarantined(now) and (account.adult or not adult)]
+        if not candidates:
+            return None
+        if len(candidates) == 1:
+            return candidates[0]
+        if self.strategy == ROUND_ROBIN:
+            return candidates[next(self._cycle) % len(candidates)]
+        return min(candidates, key=lambda account: (account.in_flight, account.total_requests))
+
+    @contextmanager
+    def acquire(self, channel_id: str = None, adult: bool = False) -> Iterator[ChzzkAccount]:
+        """选出一个可用账号并在使用期间计入在途请求；成人频道只使用成人认证账号"""
+        with self._lock:
+            adult = adult or channel_id in self._adult_channels
+            account = self._select(adult)
+            if account is None and adult:
+                # 没有可用的成人认证账号时退回普通账号，至少能得到开播状态
+                account = self._select(False)
+            if account is None:
+                # 全部被隔离时使用最早解除隔离的账号，请求结果同时用于判断 Cookie 是否已恢复
+                account = min(self.accounts, key=lambda item: item.quarantined_until)
+            account.in_flight += 1
+            account.total_requests += 1
+        try:
+            yield account
+        finally:
+            with self._lock:
+                account.in_flight -= 1
+
+    def has_adult_account(self) -> bool:
+        return any(account.adult and not account.is_quarantined() for account in self.accounts)
+
+    def pin_adult(self, channel_id: str) -> bool:
+        """记录成人频道，之后的请求固定使用成人认证账号；返回是否为新记录"""
+        with self._lock:
+            if channel_id in self._adult_channels:
+                return False
+            self._adult_channels.add(channel_id)
+        logger.info(f"Channel {channel_id} is adult-gated, pinning it to adult-verified accounts")
+        return True
+
+    def quarantine(self, account: ChzzkAccount, reason: str):
+        """隔离 Cookie 失效的账号"""
+        with self._lock:
+            already = account.is_quarantined()
+            account.quarantined_until = time.time() + self.quarantine_seconds
+            account.quarantine_reason = reason
+        if not already:
+            logger.warning(f"Account {account.name} quarantined for {self.quarantine_seconds:.0f}s: {reason}")
+
+    def release(self, account: ChzzkAccount):
+        """解除隔离（Cookie 重新验证有效后）"""
+        with self._lock:
+            was_quarantined = account.is_quarantined()
+            account.quarantined_until = 0.0
+            account.quarantine_reason = ''
+        if was_quarantined:
+            logger.info(f"Account {account.name} released from quarantine")
+
+    def available_count(self) -> int:
+        now = time.time()
+        return sum(1 for account in self.accounts if not account.is_quarantined(now))
+
+    def snapshot(self) -> List[Dict]:
+        """账号池状态（不包含 Cookie 值）"""
+        now = time.time()
+        with self._lock:
+            return [{
+                'name': account.name,
+                'adult': account.adult,
+                'in_flight': account.in_flight,
+                'total_requests': account.total_requests,
+                'quarantined': account.is_quarantined(now),
+                'quarantine_reason': account.quarantine_reason if account.is_quarantined(now) else '',
+                'retry_in': round(max(0.0, account.quarantined_until - now), 1)
+            } for account in self.accounts]
@@ -1,31 +1,20 @@
 import requests
-import json
 import logging
 import re
 
 from typing import Union, Dict, TypedDict, List
 from fake_useragent import UserAgent
 
-REQUEST_TIMEOUT = 15
+from api.account_pool import AccountPool, ChzzkAccount
+from api.circuit_breaker import CircuitBreaker, get_breaker
+from api.decoding import ChzzkChannel, ChzzkStream, decode_channel, decode_live_detail, decode_playback_url, loads
+from api.http_transport import get_session, get_timeout
+
 ua = UserAgent()
 request_header = {"User-Agent": ua.chrome}
 logger = logging.getLogger(__name__)
 
 
-class ChzzkChannel(TypedDict):
-    channelId: str
-    channelName: str
-    channelImageUrl: str
-    openLive: bool
-
-
-class ChzzkStream(TypedDict):
-    liveTitle: str
-    liveImageUrl: str
-    openDate: str
-    adult: bool
-
-
 class ChzzkVideo(TypedDict):
     videoTitle: str
     publishDate: str
@@ -35,68 +24,173 @@ class ChzzkVideo(TypedDict):
     liveOpenDate: str
 
 
+def record_endpoint_result(breaker: CircuitBreaker, status_code: int):
+    """按响应状态码更新熔断器：5xx 视为接口故障，其余视为接口可用"""
+    if status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+def stream_from_channel_info(channel_info: ChzzkChannel) -> Union[ChzzkStream, None]:
+    """从频道信息构造直播数据（live-detail 不可用时的备选），未开播返回None"""
+    if not channel_info['openLive']:
+        return None
+    return {
+        'liveTitle': channel_info['liveTitle'],
+        'liveImageUrl': channel_info['liveImageUrl'],
+        'openDate': channel_info['liveOpenDate'],
+        'adult': False,
+        'userAdultStatus': '',
+        'status': 'OPEN',
+        'concurrentUserCount': channel_info['concurrentUserCount'],
+        'channelId': channel_info['channelId'],
+        'channelName': channel_info['channelName'],
+        'channelImageUrl': channel_info['channelImageUrl']
+    }
+
+
+API_BASE = 'https://api.chzzk.naver.com/service/v1'
+
+
 class ChzzkAPI:
-    def __init__(self, nid_aut: str, nid_ses: str):
-        self._cookies = {'NID_AUT': nid_aut, 'NID_SES': nid_ses}
+    def __init__(self, nid_aut: str = None, nid_ses: str = None, session: requests.Session = None,
+                 account_pool: AccountPool = None, failure_tracker=None):
+        self._pool = account_pool or AccountPool.single(nid_aut, nid_ses)
+        self._session = session or get_session()
+        # 可选的失效频道追踪器（需提供 record_failure / record_success）
+        self._failure_tracker = failure_tracker
+
+    @property
+    def account_pool(self) -> AccountPool:
+        return self._pool
+
+    def _get(self, url: str, channel_id: str = None, adult: bool = False) -> (requests.Response, ChzzkAccount):
+        """从账号池选取账号发送请求；响应显示 Cookie 过期或被拒绝时隔离该账号"""
+        with self._pool.acquire(channel_id, adult=adult) as account:
+            r = self._session.get(url, headers=request_header, cookies=account.cookies, timeout=get_timeout())
+        if 'expired' in str(r.cookies):
+            self._pool.quarantine(account, 'expired cookie marker')
+        elif r.status_code in (401, 403):
+            self._pool.quarantine(account, f'HTTP {r.status_code}')
+        return r, account
+
+    def _record_channel_error(self, channel_id: str, status_code: int):
+        """记录与频道本身相关的错误：404 直接进入退避，其他 4xx 累计；5xx/429/认证错误属于接口或账号问题，不计入"""
+        if self._failure_tracker is None:
+            return
+        if status_code == 404:
+            self._failure_tracker.record_failure(channel_id, 'HTTP 404', definitive=True)
+        elif 400 <= status_code < 500 and status_code not in (401, 403, 429):
+            self._failure_tracker.record_failure(channel_id, f'HTTP {status_code}')
 
     def get_channel_info(self, channel_id: str) -> Union[ChzzkChannel, None]:
         """Get channel info from chzzk API.
         :param channel_id: Channel ID.
         :return: Channel info dict if channel exists, None otherwise."""
-        with requests.get(f'https://api.chzzk.naver.com/service/v1/channels/{channel_id}',
-                          headers=request_header, cookies=self._cookies, timeout=REQUEST_TIMEOUT) as r:
+        breaker = get_breaker('channel-info')
+        if not breaker.allow_request():
+            logger.debug(f'Channel info circuit open, skipping request for {channel_id}')
+            return None
+
+        try:
+            r, account = self._get(f'{API_BASE}/channels/{channel_id}', channel_id)
+        except requests.exceptions.RequestException:
+            breaker.record_failure()
+            raise
+        record_endpoint_result(breaker, r.status_code)
+
+        with r:
             try:
                 # 检查cookie是否过期
                 if 'expired' in str(r.cookies):
-                    logger.error(f'Cookies have expired for channel {channel_id}')
+                    logger.error(f'Cookies of account {account.name} have expired for channel {channel_id}')
                     logger.error('Please update your NID_AUT and NID_SES cookies in config.json')
                     return None
                 
                 r.raise_for_status()
-                data = json.loads(r.text)['content']
-
-                return data
+                channel = decode_channel(r.content)
+                if self._failure_tracker is not None:
+                    if channel is None or not channel['channelId']:
+                        self._failure_tracker.record_failure(channel_id, 'empty content', definitive=True)
+                        return None
+                    self._failure_tracker.record_success(channel_id)
+                return channel
             except requests.exceptions.HTTPError:
+                self._record_channel_error(channel_id, r.status_code)
                 logger.error(f'HTTP Error while getting channel {channel_id}')
                 logger.error(f'HTTP Status code {r.status_code}')
                 if r.status_code == 500:
                     logger.error('This might be due to expired cookies. Please check your NID_AUT and NID_SES values.')
                 return None
-            except requests.exceptions.Timeout:
-                logger.error(f'Timeout while getting channel {channel_id}')
-                return None
 
-    def check_live(self, channel_id: str) -> (bool, Union[ChzzkStream, None]):
-        # 首先尝试使用直播详情API
+    def check_live(self, channel_id: str, adult: bool = False) -> (bool, Union[ChzzkStream, None]):
+        # 首先尝试使用直播详情API；熔断期间直接使用备选接口
+        breaker = get_breaker('live-detail')
+        if not breaker.allow_request():
+            return self._check_live_fallback(channel_id)
+
+        try:
+            r, account = self._get(f'{API_BASE}/channels/{channel_id}/live-detail', channel_id, adult=adult)
+        except requests.exceptions.Timeout:
+            breaker.record_failure()
+            logger.error(f'Timeout while checking channel {channel_id}')
+            return False, None
+        except requests.exceptions.RequestException as e:
+            breaker.record_failure()
+            logger.error(f'Error checking live status for {channel_id}: {e}')
+            return False, None
+        record_endpoint_result(breaker, r.status_code)
+
         try:
-            with requests.get(f'https://api.chzzk.naver.com/service/v1/channels/{channel_id}/live-detail',
-                              headers=request_header, cookies=self._cookies, timeout=REQUEST_TIMEOUT) as r:
+            with r:
                 # 检查cookie是否过期
                 if 'expired' in str(r.cookies):
-                    logger.error(f'Cookies have expired for channel {channel_id}')
+                    logger.error(f'Cookies of account {account.name} have expired for channel {channel_id}')
                     logger.error('Please update your NID_AUT and NID_SES cookies in config.json')
                     return False, None
                 
                 if r.status_code == 200:
-                    data = json.loads(r.text)
-                    if data['content'] is None:
+                    stream = decode_live_detail(r.content)
+                    if stream is None:
                         return False, None
-                    else:
-                        return data['content']['status'] == 'OPEN', data['content']
+                    if self._failure_tracker is not None:
+                        self._failure_tracker.record_success(channel_id)
+                    if stream['adult'] and stream['userAdultStatus'] != 'ADULT' and not account.adult \
+                            and self._pool.has_adult_account():
+                        # 成人直播：固定到成人认证账号并重新获取完整信息
+                        self._pool.pin_adult(channel_id)
+                        return self.check_live(channel_id, adult=True)
+                    return stream['status'] == 'OPEN', stream
                 elif r.status_code == 500:
                     # 直播详情API返回500，尝试使用频道信息API作为备选
                     logger.warning(f'Live detail API returned 500 for {channel_id}, trying channel info API as fallback')
                     return self._check_live_fallback(channel_id)
                 else:
                     logger.error(f'HTTP Error while checking channel {channel_id}: {r.status_code}')
+                    self._record_channel_error(channel_id, r.status_code)
                     return False, None
-        except requests.exceptions.Timeout:
-            logger.error(f'Timeout while checking channel {channel_id}')
-            return False, None
         except Exception as e:
             logger.error(f'Error checking live status for {channel_id}: {e}')
             return False, None
 
+    def get_hls_playlist_url(self, channel_id: str) -> Union[str, None]:
+        """获取正在直播的频道的 HLS 主播放列表地址（原生 HLS 录制使用），未开播或请求失败时返回None"""
+        try:
+            r, _ = self._get(f'{API_BASE}/channels/{channel_id}/live-detail', channel_id)
+        except requests.exceptions.RequestException as e:
+            logger.error(f'Error getting playlist for {channel_id}: {e}')
+            return None
+        with r:
+            if r.status_code != 200:
+                logger.error(f'HTTP Error while getting playlist for {channel_id}: {r.status_code}')
+                return None
+            try:
+                return decode_playback_url(r.content)
+            except ValueError as e:
+                logger.error(f'Invalid playback data for {channel_id}: {e}')
+                return None
+
     def _check_live_fallback(self, channel_id: str) -> (bool, Union[ChzzkStream, None]):
         """使用频道信息API作为备选方案检查直播状态"""
         try:
@@ -105,21 +199,8 @@ class ChzzkAPI:
                 return False, None
             
             # 检查是否在直播
-            is_live = channel_info.get('openLive', False)
-            if is_live:
-                # 构造直播数据
-                stream_data = {
-                    'liveTitle': channel_info.get('liveTitle', ''),
-                    'liveImageUrl': channel_info.get('liveImageUrl', ''),
-                    'openDate': channel_info.get('liveOpenDate', ''),
-                    'status': 'OPEN',
-                    'concurrentUserCount': channel_info.get('concurrentUserCount', 0),
-                    'channelName': channel_info.get('channelName', ''),
-                    'channelImageUrl': channel_info.get('channelImageUrl', '')
-                }
-                return True, stream_data
-            else:
-                return False, None
+            stream_data = stream_from_channel_info(channel_info)
+            return stream_data is not None, stream_data
         except Exception as e:
             logger.error(f'Error in fallback live check for {channel_id}: {e}')
             return False, None
@@ -132,8 +213,8 @@ class ChzzkAPI:
 
         video_id = match.group(1)
 
-        with requests.get(f'https://api.chzzk.naver.com/service/v1/videos/{video_id}',
-                          headers=request_header, cookies=self._cookies, timeout=REQUEST_TIMEOUT) as r:
+        r, _ = self._get(f'{API_BASE}/videos/{video_id}')
+        with r:
             try:
                 r.raise_for_status()
             except requests.exceptions.HTTPError:
@@ -144,11 +225,11 @@ class ChzzkAPI:
                 logger.error(f'Timeout while getting video {video_id}')
                 return None
 
-            return json.loads(r.text)['content']
+            return loads(r.content)['content']
 
     def _search_channel(self, channel_name, offset=0, size=5):
-        with requests.get(f'https://api.chzzk.naver.com/service/v1/search/channels?keyword={channel_name}&offset={offset}&size={size}',
-                          headers=request_header, cookies=self._cookies, timeout=REQUEST_TIMEOUT) as r:
+        r, _ = self._get(f'{API_BASE}/search/channels?keyword={channel_name}&offset={offset}&size={size}')
+        with r:
             try:
                 r.raise_for_status()
             except requests.exceptions.HTTPError:
@@ -159,7 +240,7 @@ class ChzzkAPI:
                 logger.error(f'Timeout while searching channel {channel_name}')
                 return None
 
-            return json.loads(r.text)['content']['data']
+            return loads(r.content)['content']['data']
 
     def _get_channel_by_name(self, channel_name, size=1):
         channels = self._search_channel(channel_name, size=size)
@@ -0,0 +1,236 @@
+import asyncio
+import logging
+import re
+
+from typing import Dict, Iterable, Tuple, Union
+
+import aiohttp
+
+from api.chzzk import (ChzzkChannel, ChzzkStream, ChzzkVideo, record_endpoint_result, request_header,
+                       stream_from_channel_info)
+from api.circuit_breaker import get_breaker
+from api.decoding import decode_channel, decode_live_detail, loads
+from api.http_transport import get_cookie_health, get_rate_limiter, get_timeout
+
+API_BASE = 'https://api.chzzk.naver.com/service/v1'
+logger = logging.getLogger(__name__)
+
+
+class AsyncChzzkAPI:
+    """ChzzkAPI 的 asyncio 版本，接口与返回结构保持一致。
+
+    单个事件循环内通过信号量限制并发请求数，相同的在途请求会被合并；
+    取消调用方任务时该调用立即结束，仍被其他调用方共享的请求会继续完成。
+    使用 ``async with AsyncChzzkAPI(...) as api:`` 或在结束时调用 ``await api.close()``。
+    """
+
+    def __init__(self, nid_aut: str, nid_ses: str, max_concurrency: int = 64):
+        self._cookies = {'NID_AUT': nid_aut, 'NID_SES': nid_ses}
+        self._max_concurrency = max(1, int(max_concurrency))
+        self._semaphore = None
+        self._session: Union[aiohttp.ClientSession, None] = None
+        self._rate_limiter = get_rate_limiter(nid_aut, nid_ses)
+        self._cookie_health = get_cookie_health()
+        self._inflight: Dict[Tuple, asyncio.Task] = {}  # 合并相同的在途请求
+        self._waiters: Dict[asyncio.Task, int] = {}  # 每个在途请求的调用方数量
+
+    async def __aenter__(self) -> 'AsyncChzzkAPI':
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connect_timeout, read_timeout = get_timeout()
+            self._session = aiohttp.ClientSession(
+                headers=request_header,
+                connector=aiohttp.TCPConnector(limit=self._max_concurrency, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout),
+                # 不保存服务端下发的 Cookie，只使用本实例的认证 Cookie
+                cookie_jar=aiohttp.DummyCookieJar()
+            )
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._session
+
+    async def close(self):
+        """关闭底层连接池"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def _get(self, path: str, params: Dict = None) -> Tuple[int, bytes, str]:
+        """发送GET请求，返回 (状态码, 响应体, Cookie字符串)；相同的在途请求只发一次"""
+        key = (path, tuple(sorted((params or {}).items())))
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch(path, params))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._inflight.pop(key, None) if self._inflight.get(key) is done
+                                   else None)
+        self._waiters[task] = self._waiters.get(task, 0) + 1
+        try:
+            # shield: 某个调用方被取消时不影响共享同一请求的其他调用方
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # 最后一个调用方被取消时取消请求本身，释放并发名额
+            if self._waiters[task] == 1:
+                task.cancel()
+            raise
+        finally:
+            self._waiters[task] -= 1
+            if not self._waiters[task]:
+                del self._waiters[task]
+
+    async def _fetch(self, path: str, params: Dict = None) -> Tuple[int, bytes, str]:
+        session = self._get_session()
+        async with self._semaphore:
+            await self._rate_limiter.acquire_async()
+            async with session.get(f'{API_BASE}{path}', params=params, cookies=self._cookies) as r:
+                body, cookies = await r.read(), str(r.cookies)
+        self._cookie_health.record_response(self._cookies['NID_AUT'], self._cookies['NID_SES'], r.status, cookies,
+                                            count_500=not path.endswith('/live-detail'))
+        return r.status, body, cookies
+
+    async def get_channel_info(self, channel_id: str) -> Union[ChzzkChannel, None]:
+        """Get channel info from chzzk API.
+        :param channel_id: Channel ID.
+        :return: Channel info dict if channel exists, None otherwise."""
+        breaker = get_breaker('channel-info')
+        if not breaker.allow_request():
+            logger.debug(f'Channel info circuit open, skipping request for {channel_id}')
+            return None
+
+        try:
+            status, body, cookies = await self._get(f'/channels/{channel_id}')
+        except asyncio.TimeoutError:
+            breaker.record_failure()
+            logger.error(f'Timeout while getting channel {channel_id}')
+            return None
+        except aiohttp.ClientError as e:
+            breaker.record_failure()
+            logger.error(f'Error while getting channel {channel_id}: {e}')
+            return None
+        record_endpoint_result(breaker, status)
+
+        # 检查cookie是否过期
+        if 'expired' in cookies:
+            logger.error(f'Cookies have expired for channel {channel_id}')
+            logger.error('Please update your NID_AUT and NID_SES cookies in config.json')
+            return None
+
+        if status != 200:
+            logger.error(f'HTTP Error while getting channel {channel_id}')
+            logger.error(f'HTTP Status code {status}')
+            if status == 500:
+                logger.error('This might be due to expired cookies. Please check your NID_AUT and NID_SES values.')
+            return None
+
+        return decode_channel(body)
+
+    async def check_live(self, channel_id: str) -> (bool, Union[ChzzkStream, None]):
+        # 首先尝试使用直播详情API；熔断期间直接使用备选接口
+        breaker = get_breaker('live-detail')
+        if not breaker.allow_request():
+            return await self._check_live_fallback(channel_id)
+
+        try:
+            try:
+                status, body, cookies = await self._get(f'/channels/{channel_id}/live-detail')
+            except (asyncio.TimeoutError, aiohttp.ClientError):
+                breaker.record_failure()
+                raise
+            record_endpoint_result(breaker, status)
+
+            # 检查cookie是否过期
+            if 'expired' in cookies:
+                logger.error(f'Cookies have expired for channel {channel_id}')
+                logger.error('Please update your NID_AUT and NID_SES cookies in config.json')
+                return False, None
+
+            if status == 200:
+                stream = decode_live_detail(body)
+                if stream is None:
+                    return False, None
+                return stream['status'] == 'OPEN', stream
+            elif status == 500:
+                # 直播详情API返回500，尝试使用频道信息API作为备选
+                logger.warning(f'Live detail API returned 500 for {channel_id}, trying channel info API as fallback')
+                return await self._check_live_fallback(channel_id)
+            else:
+                logger.error(f'HTTP Error while checking channel {channel_id}: {status}')
+                return False, None
+        except asyncio.TimeoutError:
+            logger.error(f'Timeout while checking channel {channel_id}')
+            return False, None
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f'Error checking live status for {channel_id}: {e}')
+            return False, None
+
+    async def _check_live_fallback(self, channel_id: str) -> (bool, Union[ChzzkStream, None]):
+        """使用频道信息API作为备选方案检查直播状态"""
+        channel_info = await self.get_channel_info(channel_id)
+        if not channel_info:
+            return False, None
+        stream_data = stream_from_channel_info(channel_info)
+        return stream_data is not None, stream_data
+
+    async def check_live_many(self, channel_ids: Iterable[str]) -> Dict[str, Tuple[bool, Union[ChzzkStream, None]]]:
+        """并发检查多个频道，返回 channel_id -> (is_live, stream)"""
+        channel_ids = list(dict.fromkeys(channel_ids))
+        results = await asyncio.gather(*(self.check_live(channel_id) for channel_id in channel_ids))
+        return dict(zip(channel_ids, results))
+
+    async def get_video(self, video_url: str) -> Union[ChzzkVideo, None]:
+        match = re.match(r'https://chzzk.naver.com/video/(\d+)', video_url)
+
+        if not match:
+            return None
+
+        video_id = match.group(1)
+
+        try:
+            status, body, _ = await self._get(f'/videos/{video_id}')
+        except asyncio.TimeoutError:
+            logger.error(f'Timeout while getting video {video_id}')
+            return None
+
+        if status != 200:
+            logger.error(f'HTTP Error while getting video {video_id}')
+            logger.error(f'HTTP Status code {status}')
+            return None
+
+        return loads(body)['content']
+
+    async def _search_channel(self, channel_name, offset=0, size=5):
+        try:
+            status, body, _ = await self._get('/search/channels',
+                                              params={'keyword': channel_name, 'offset': offset, 'size': size})
+        except asyncio.TimeoutError:
+            logger.error(f'Timeout while searching channel {channel_name}')
+            return None
+
+        if status != 200:
+            logger.error(f'HTTP Error while searching channel {channel_name}')
+            logger.error(f'HTTP Status code {status}')
+            return None
+
+        return loads(body)['content']['data']
+
+    async def _get_channel_by_name(self, channel_name, size=1):
+        channels = await self._search_channel(channel_name, size=size)
+
+        if not channels:
+            return None
+
+        for channel in channels:
+            channel = channel['channel']
+            if channel['channelName'] == channel_name:
+                return channel
+        return None
+
+    async def get_channel_id(self, channel_name) -> str:
+        channel = await self._get_channel_by_name(channel_name)
+        return channel['channelId'] if channel else None
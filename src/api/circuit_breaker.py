@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+接口熔断器
+按接口统计最近请求的失败率：失败率超过阈值时熔断（OPEN），冷却后进入半开状态（HALF_OPEN）
+放行少量探测请求，探测成功则恢复（CLOSED），失败则以更长的冷却时间重新熔断
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: float = 0.5, window_size: int = 20, min_requests: int = 5,
+                 open_seconds: float = 60, max_open_seconds: float = 600, half_open_probes: int = 1):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.min_requests = min_requests
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.half_open_probes = max(1, half_open_probes)
+
+        self._lock = threading.Lock()
+        self._outcomes = deque(maxlen=window_size)  # True 表示失败
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._open_seconds = open_seconds
+        self._probes_in_flight = 0
+        self.total_requests = 0
+        self.total_failures = 0
+        self.short_circuited = 0  # 熔断期间被直接拒绝的请求数
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.time() - self._opened_at >= self._open_seconds:
+            self._state = HALF_OPEN
+            self._probes_in_flight = 0
+            logger.info(f"Circuit breaker '{self.name}' half-open, probing")
+        return self._state
+
+    def allow_request(self) -> bool:
+        """是否允许请求通过（半开状态只放行有限的探测请求）"""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._probes_in_flight < self.half_open_probes:
+                self._probes_in_flight += 1
+                return True
+            self.short_circuited += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.total_requests += 1
+            self._outcomes.append(False)
+            if self._state == HALF_OPEN:
+                self._state = CLOSED
+                self._open_seconds = self.base_open_seconds
+                self._outcomes.clear()
+                logger.info(f"Circuit breaker '{self.name}' closed, endpoint recovered")
+
+    def record_failure(self):
+        with self._lock:
+            self.total_requests += 1
+            self.total_failures += 1
+            self._outcomes.append(True)
+            if self._state == HALF_OPEN:
+                # 探测失败，加倍冷却时间
+                self._open_seconds = min(self.max_open_seconds, self._open_seconds * 2)
+                self._trip()
+            elif self._state == CLOSED and len(self._outcomes) >= self.min_requests \
+                    and self._failure_rate() >= self.failure_threshold:
+                self._trip()
+
+    def _trip(self):
+        self._state = OPEN
+        self._opened_at = time.time()
+        logger.warning(f"Circuit breaker '{self.name}' opened for {self._open_seconds:.0f}s "
+                       f"(failure rate {self._failure_rate():.0%})")
+
+    def _failure_rate(self) -> float:
+        return sum(self._outcomes) / len(self._outcomes) if self._outcomes else 0.0
+
+    def snapshot(self) -> Dict:
+        """熔断器状态与健康度，用于Web面板展示"""
+        with self._lock:
+            state = self._current_state()
+            failure_rate = self._failure_rate()
+            return {
+                'name': self.name,
+                'state': state,
+                'failure_rate': round(failure_rate, 3),
+                'health': round(1 - failure_rate, 3),
+                'window': len(self._outcomes),
+                'total_requests': self.total_requests,
+                'total_failures': self.total_failures,
+                'short_circuited': self.short_circuited,
+                'retry_in': round(max(0.0, self._opened_at + self._open_seconds - time.time()), 1)
+                if state == OPEN else 0
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    """获取（或创建）指定接口的熔断器"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name)
+        return _breakers[name]
+
+
+def breaker_snapshots() -> Dict[str, Dict]:
+    """所有熔断器的状态快照"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.snapshot() for breaker in breakers}
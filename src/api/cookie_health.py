@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+被动 Cookie 健康检测
+从 Chzzk API 的正常响应中推断认证 Cookie 是否有效（过期标记、401/403、连续的 500），
+结果按 Cookie 指纹保存在带文件锁的状态文件中，录制端、Web 面板、系统监控共用；
+只有一段时间内没有任何流量时才需要调用方主动探测
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from api.rate_limiter import locked_file
+
+logger = logging.getLogger(__name__)
+
+# 连续多少次 500（中间没有成功响应）视为 Cookie 失效；live-detail 的 500 多为接口故障，不计入
+EXPIRED_500_THRESHOLD = 3
+# 最近流量时间戳的最小落盘间隔（秒），判定结果变化时立即写入
+TRAFFIC_WRITE_INTERVAL = 10
+
+
+def cookie_fingerprint(nid_aut: str, nid_ses: str) -> str:
+    """Cookie 指纹（不在状态文件中保存原始 Cookie）"""
+    return hashlib.sha256(f'{nid_aut}\n{nid_ses}'.encode('utf-8')).hexdigest()[:16]
+
+
+class CookieHealth:
+    def __init__(self, state_path: str):
+        self.state_path = state_path
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}  # 本进程已知的状态
+        self._written: Dict[str, float] = {}  # 各指纹上次落盘时间
+        os.makedirs(os.path.dirname(os.path.abspath(state_path)), exist_ok=True)
+
+    def _update_file(self, fingerprint: str, entry: Dict):
+        """在文件锁内合并写入单个指纹的状态"""
+        fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            with locked_file(fd):
+                os.lseek(fd, 0, os.SEEK_SET)
+                raw = os.read(fd, 1024 * 1024)
+                try:
+                    state = json.loads(raw) if raw else {}
+                except ValueError:
+                    state = {}
+                previous = state.get(fingerprint, {})
+                # 其他进程有更新的判定时保留其判定，只合并流量时间
+                if previous.get('updated', 0) > entry['updated']:
+                    entry = {**previous, 'last_traffic': max(previous.get('last_traffic', 0), entry['last_traffic'])}
+                state[fingerprint] = entry
+                data = json.dumps(state).encode()
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def _read_file(self) -> Dict:
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def record_response(self, nid_aut: str, nid_ses: str, status_code: int, response_cookies: str = '',
+                        count_500: bool = True):
+        """根据一次 API 响应更新 Cookie 状态（count_500=False 时该接口的 500 不作为失效依据）"""
+        fingerprint = cookie_fingerprint(nid_aut, nid_ses)
+        now = time.time()
+        with self._lock:
+            entry = dict(self._entries.get(fingerprint) or
+                         {'valid': None, 'reason': '', 'updated': 0.0, 'last_traffic': 0.0, 'consecutive_500': 0})
+            previous_valid = entry['valid']
+            entry['last_traffic'] = now
+
+            if 'expired' in response_cookies:
+                entry.update(valid=False, reason='expired cookie marker', updated=now)
+            elif status_code in (401, 403):
+                entry.update(valid=False, reason=f'HTTP {status_code}', updated=now)
+            elif status_code == 500 and count_500:
+                entry['consecutive_500'] += 1
+                if entry['consecutive_500'] >= EXPIRED_500_THRESHOLD:
+                    entry.update(valid=False, reason=f"{entry['consecutive_500']} consecutive HTTP 500", updated=now)
+            elif status_code < 400:
+                entry.update(valid=True, reason='', updated=now, consecutive_500=0)
+
+            self._entries[fingerprint] = entry
+            changed = entry['valid'] != previous_valid
+            if not changed and now - self._written.get(fingerprint, 0) < TRAFFIC_WRITE_INTERVAL:
+                return
+            self._written[fingerprint] = now
+
+        if changed and entry['valid'] is False:
+            logger.warning(f"Cookie marked invalid from API traffic: {entry['reason']}")
+        try:
+            self._update_file(fingerprint, entry)
+        except OSError as e:
+            logger.warning(f"Failed to write cookie health state {self.state_path}: {e}")
+
+    def verdict(self, nid_aut: str, nid_ses: str, max_age: float) -> Optional[bool]:
+        """返回最近 max_age 秒内由流量得出的有效性；没有近期流量或尚无判定时返回None（需要主动探测）"""
+        fingerprint = cookie_fingerprint(nid_aut, nid_ses)
+        entry = self._read_file().get(fingerprint)
+        with self._lock:
+            local = self._entries.get(fingerprint)
+        if local is not None and (entry is None or local['updated'] >= entry.get('updated', 0)):
+            entry = {**local, 'last_traffic': max(local['last_traffic'], (entry or {}).get('last_traffic', 0))}
+        if not entry or entry.get('valid') is None:
+            return None
+        if time.time() - entry.get('last_traffic', 0) > max_age:
+            return None
+        return entry['valid']
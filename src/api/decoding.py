@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Chzzk API 响应解码
+直接解析响应字节（安装了 orjson 时使用 orjson，否则回退到标准库 json），
+只取出轮询与录制用到的字段，丢弃 livePlaybackJson 等大字段，避免长期持有整份响应
+"""
+
+import json
+from typing import Any, Dict, Optional, TypedDict
+
+try:
+    import orjson
+except ImportError:  # 可选依赖
+    orjson = None
+
+
+class ChzzkChannel(TypedDict):
+    channelId: str
+    channelName: str
+    channelImageUrl: str
+    openLive: bool
+    liveTitle: str
+    liveImageUrl: str
+    liveOpenDate: str
+    concurrentUserCount: int
+
+
+class ChzzkStream(TypedDict):
+    liveTitle: str
+    liveImageUrl: str
+    openDate: str
+    adult: bool
+    userAdultStatus: str
+    status: str
+    concurrentUserCount: int
+    channelId: str
+    channelName: str
+    channelImageUrl: str
+
+
+def loads(data) -> Any:
+    """解析 JSON（bytes 或 str）"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _content(data) -> Optional[Dict]:
+    content = loads(data).get('content')
+    return content if isinstance(content, dict) else None
+
+
+def decode_channel(data) -> Optional[ChzzkChannel]:
+    """解码 /channels/{id} 响应，content 为空时返回None"""
+    content = _content(data)
+    if content is None:
+        return None
+    return {
+        'channelId': content.get('channelId') or '',
+        'channelName': content.get('channelName') or '',
+        'channelImageUrl': content.get('channelImageUrl') or '',
+        'openLive': bool(content.get('openLive', False)),
+        'liveTitle': content.get('liveTitle') or '',
+        'liveImageUrl': content.get('liveImageUrl') or '',
+        'liveOpenDate': content.get('liveOpenDate') or '',
+        'concurrentUserCount': content.get('concurrentUserCount') or 0
+    }
+
+
+def decode_live_detail(data) -> Optional[ChzzkStream]:
+    """解码 /channels/{id}/live-detail 响应，未开过播（content 为空）时返回None"""
+    content = _content(data)
+    if content is None:
+        return None
+    channel = content.get('channel') or {}
+    return {
+        'liveTitle': content.get('liveTitle') or '',
+        'liveImageUrl': content.get('liveImageUrl') or '',
+        'openDate': content.get('openDate') or '',
+        'adult': bool(content.get('adult', False)),
+        'userAdultStatus': content.get('userAdultStatus') or '',
+        'status': content.get('status') or '',
+        'concurrentUserCount': content.get('concurrentUserCount') or 0,
+        'channelId': channel.get('channelId') or '',
+        'channelName': channel.get('channelName') or '',
+        'channelImageUrl': channel.get('channelImageUrl') or ''
+    }
+
+
+def decode_playback_url(data, media_id: str = 'HLS') -> Optional[str]:
+    """从 /channels/{id}/live-detail 响应的 livePlaybackJson 中取出指定媒体（默认 HLS）的主播放列表地址"""
+    content = _content(data)
+    if content is None or not content.get('livePlaybackJson'):
+        return None
+    playback = loads(content['livePlaybackJson'])
+    for media in playback.get('media') or []:
+        if media.get('mediaId') == media_id and media.get('path'):
+            return media['path']
+    return None
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享HTTP传输层
+为 ChzzkAPI、Web 面板、CookieManager 和系统监控提供带连接池与 keep-alive 的 requests.Session，
+支持带抖动的指数退避重试、独立的连接/读取超时、跨进程共享限流、在途请求合并，
+并从带认证 Cookie 的 API 响应中被动记录 Cookie 健康状态
+"""
+
+import http.cookiejar
+import logging
+import os
+import random
+import tempfile
+import threading
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from api.cookie_health import CookieHealth, cookie_fingerprint
+from api.rate_limiter import SharedTokenBucket, SingleFlight
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HTTP_CONFIG = {
+    'pool_connections': 4,
+    'pool_maxsize': 32,
+    'connect_timeout': 5,
+    'read_timeout': 15,
+    'max_retries': 2,
+    'backoff_factor': 0.5,
+    'backoff_jitter': 0.5,
+    'rate_limit_per_second': 5.0,
+    'rate_limit_burst': 10,
+    'rate_limit_state': os.path.join(tempfile.gettempdir(), 'chzzk_api_rate_limit.json'),
+    'cookie_health_state': os.path.join(tempfile.gettempdir(), 'chzzk_cookie_health.json'),
+}
+
+# 受共享限流约束的主机
+RATE_LIMITED_HOSTS = {'api.chzzk.naver.com'}
+
+
+class JitteredRetry(Retry):
+    """在 urllib3 指数退避的基础上增加随机抖动，避免多个请求同时重试"""
+
+    backoff_jitter_max = 0.5
+
+    def new(self, **kw) -> 'JitteredRetry':
+        retry = super().new(**kw)
+        retry.backoff_jitter_max = self.backoff_jitter_max
+        return retry
+
+    def get_backoff_time(self) -> float:
+        backoff = super().get_backoff_time()
+        if backoff <= 0:
+            return backoff
+        return backoff + random.uniform(0, self.backoff_jitter_max)
+
+
+class NoStoreCookiePolicy(http.cookiejar.DefaultCookiePolicy):
+    """共享会话不保存服务端下发的 Cookie，各组件的认证 Cookie 按请求单独传入"""
+
+    def set_ok(self, cookie, request) -> bool:
+        return False
+
+
+def _freeze(value) -> Tuple:
+    """将请求参数/Cookie 转换为可哈希的合并键"""
+    if not value:
+        return ()
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), str(v)) for k, v in value.items()))
+    return (repr(value),)
+
+
+class ChzzkSession(requests.Session):
+    """在每个请求前取共享令牌，合并相同的在途GET请求，并用响应更新 Cookie 健康状态"""
+
+    def __init__(self, rate_limiter: SharedTokenBucket = None, single_flight: SingleFlight = None,
+                 cookie_health: CookieHealth = None,
+                 account_rate_limiter: Callable[[str, str], SharedTokenBucket] = None):
+        super().__init__()
+        self.rate_limiter = rate_limiter
+        self.single_flight = single_flight
+        self.cookie_health = cookie_health
+        self.account_rate_limiter = account_rate_limiter  # 带认证 Cookie 的请求按账号使用独立的令牌桶
+
+    def request(self, method, url, *args, **kwargs):
+        if method.upper() != 'GET' or self.single_flight is None or kwargs.get('stream') or args:
+            return self._limited_request(method, url, *args, **kwargs)
+        key = (url, _freeze(kwargs.get('params')), _freeze(kwargs.get('cookies')))
+        return self.single_flight.do(key, lambda: self._limited_request(method, url, **kwargs))
+
+    def _limited_request(self, method, url, *args, **kwargs):
+        is_api = urlparse(url).hostname in RATE_LIMITED_HOSTS
+        cookies = kwargs.get('cookies')
+        has_account = isinstance(cookies, dict) and 'NID_AUT' in cookies
+        if is_api:
+            rate_limiter = self.rate_limiter
+            if has_account and self.account_rate_limiter is not None:
+                rate_limiter = self.account_rate_limiter(cookies['NID_AUT'], cookies.get('NID_SES', ''))
+            if rate_limiter is not None:
+                rate_limiter.acquire()
+        response = super().request(method, url, *args, **kwargs)
+        if not kwargs.get('stream'):
+            # 预先读取响应体，合并的调用方共享同一个响应对象
+            response.content
+
+        if self.cookie_health is not None and is_api and has_account:
+            self.cookie_health.record_response(cookies['NID_AUT'], cookies.get('NID_SES', ''),
+                                               response.status_code, str(response.cookies),
+                                               count_500=not urlparse(url).path.endswith('/live-detail'))
+        return response
+
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_rate_limiter: Optional[SharedTokenBucket] = None
+_account_rate_limiters: Dict[str, SharedTokenBucket] = {}
+_cookie_health: Optional[CookieHealth] = None
+_http_config: Dict = dict(DEFAULT_HTTP_CONFIG)
+
+
+def configure_transport(http_config: Dict = None):
+    """根据配置文件的 http 段设置连接池参数（已创建的会话会被替换）"""
+    global _session, _rate_limiter, _cookie_health, _http_config
+    with _lock:
+        _http_config = {**DEFAULT_HTTP_CONFIG, **(http_config or {})}
+        _rate_limiter = None
+        _account_rate_limiters.clear()
+        _cookie_health = None
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def get_timeout() -> Tuple[float, float]:
+    """返回 (连接超时, 读取超时)"""
+    return _http_config['connect_timeout'], _http_config['read_timeout']
+
+
+def create_session(http_config: Dict = None, rate_limiter: SharedTokenBucket = None,
+                   cookie_health: CookieHealth = None) -> requests.Session:
+    """创建带连接池和重试策略的会话"""
+    http_config = {**DEFAULT_HTTP_CONFIG, **(http_config or {})}
+
+    retry = JitteredRetry(
+        total=http_config['max_retries'],
+        connect=http_config['max_retries'],
+        read=http_config['max_retries'],
+        backoff_factor=http_config['backoff_factor'],
+        # 500 在 Chzzk 上通常表示 Cookie 失效或 live-detail 故障，由调用方处理，不重试
+        status_forcelist=(429, 502, 503, 504),
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    retry.backoff_jitter_max = http_config['backoff_jitter']
+
+    adapter = HTTPAdapter(
+        pool_connections=http_config['pool_connections'],
+        pool_maxsize=http_config['pool_maxsize'],
+        max_retries=retry
+    )
+    if rate_limiter is None:
+        rate_limiter = SharedTokenBucket(http_config['rate_limit_state'],
+                                         rate=http_config['rate_limit_per_second'],
+                                         burst=http_config['rate_limit_burst'])
+    if cookie_health is None:
+        cookie_health = CookieHealth(http_config['cookie_health_state'])
+    session = ChzzkSession(rate_limiter=rate_limiter, single_flight=SingleFlight(), cookie_health=cookie_health)
+    session.cookies.set_policy(NoStoreCookiePolicy())
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_rate_limiter(nid_aut: str = None, nid_ses: str = None) -> SharedTokenBucket:
+    """获取跨进程共享的令牌桶（同步与异步客户端共用）；传入账号 Cookie 时返回该账号独立的令牌桶"""
+    global _rate_limiter
+    with _lock:
+        if nid_aut:
+            fingerprint = cookie_fingerprint(nid_aut, nid_ses or '')
+            if fingerprint not in _account_rate_limiters:
+                base, ext = os.path.splitext(_http_config['rate_limit_state'])
+                _account_rate_limiters[fingerprint] = SharedTokenBucket(
+                    f'{base}.{fingerprint}{ext}',
+                    rate=_http_config['rate_limit_per_second'],
+                    burst=_http_config['rate_limit_burst'])
+            return _account_rate_limiters[fingerprint]
+        if _rate_limiter is None:
+            _rate_limiter = SharedTokenBucket(_http_config['rate_limit_state'],
+                                              rate=_http_config['rate_limit_per_second'],
+                                              burst=_http_config['rate_limit_burst'])
+        return _rate_limiter
+
+
+def get_cookie_health() -> CookieHealth:
+    """获取跨进程共享的 Cookie 健康状态"""
+    global _cookie_health
+    with _lock:
+        if _cookie_health is None:
+            _cookie_health = CookieHealth(_http_config['cookie_health_state'])
+        return _cookie_health
+
+
+def get_session() -> requests.Session:
+    """获取进程内共享的会话"""
+    global _session
+    rate_limiter = get_rate_limiter()
+    cookie_health = get_cookie_health()
+    with _lock:
+        if _session is None:
+            _session = create_session(_http_config, rate_limiter=rate_limiter, cookie_health=cookie_health)
+            _session.account_rate_limiter = get_rate_limiter
+            logger.info(f"HTTP transport initialized (pool_maxsize={_http_config['pool_maxsize']}, "
+                        f"retries={_http_config['max_retries']})")
+        return _session
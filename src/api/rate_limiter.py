@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+跨进程共享的API限流与请求合并
+- SharedTokenBucket: 令牌桶状态保存在带文件锁的状态文件中，录制端、Web面板、系统监控等进程共用一个预算
+- SingleFlight: 同一进程内相同的在途请求只发出一次上游调用，其余调用方等待并共享结果
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def locked_file(fd: int):
+    """对状态文件加排他锁"""
+    if fcntl is not None:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class SharedTokenBucket:
+    def __init__(self, state_path: str, rate: float = 5.0, burst: int = 10):
+        self.state_path = state_path
+        self.rate = max(0.01, float(rate))
+        self.burst = max(1, int(burst))
+        self._thread_lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(state_path)), exist_ok=True)
+
+    def _take(self) -> float:
+        """尝试取一个令牌，成功返回0，否则返回需要等待的秒数"""
+        fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            with self._thread_lock, locked_file(fd):
+                os.lseek(fd, 0, os.SEEK_SET)
+                raw = os.read(fd, 4096)
+                now = time.time()
+                try:
+                    state = json.loads(raw) if raw else {}
+                    tokens = float(state['tokens'])
+                    updated = float(state['updated'])
+                except (ValueError, KeyError, TypeError):
+                    tokens, updated = float(self.burst), now
+
+                tokens = min(float(self.burst), tokens + max(0.0, now - updated) * self.rate)
+                wait = 0.0
+                if tokens >= 1:
+                    tokens -= 1
+                else:
+                    wait = (1 - tokens) / self.rate
+
+                data = json.dumps({'tokens': tokens, 'updated': now}).encode()
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, data)
+                return wait
+        finally:
+            os.close(fd)
+
+    def acquire(self, timeout: float = None) -> bool:
+        """阻塞直到取得令牌；超时返回False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                wait = self._take()
+            except OSError as e:
+                # 状态文件不可用时不阻塞请求
+                logger.warning(f"Rate limiter state unavailable, skipping limit: {e}")
+                return True
+            if wait <= 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """acquire 的 asyncio 版本；取令牌需要线程锁与文件锁，放到默认线程池执行，等待期间不阻塞事件循环"""
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                wait = await loop.run_in_executor(None, self._take)
+            except OSError as e:
+                logger.warning(f"Rate limiter state unavailable, skipping limit: {e}")
+                return
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.coalesced = 0  # 被合并的调用次数
+
+    def do(self, key: Hashable, func: Callable[[], Any]) -> Any:
+        """执行 func；若相同 key 的调用正在进行则等待其结果"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
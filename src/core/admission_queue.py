@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+录制准入控制
+同时进行的录制数量达到上限（recording.max_concurrent_recordings）时，新开播的频道进入等待队列，
+按优先级（频道列表中指定，数值越大越优先）再按排队先后排序，有录制结束时依次开始。
+已在录制的频道（包括进程重启、续录与切换分段）不受影响。队列快照发布给 Web 面板显示排队位置与原因
+"""
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+REASON_CAPACITY = 'capacity'  # 录制数已达上限，下一个空位属于该频道
+REASON_PRIORITY = 'priority'  # 排在优先级更高的频道之后
+REASON_ORDER = 'order'  # 排在同优先级、更早开播的频道之后
+
+
+class AdmissionQueue:
+    def __init__(self, max_concurrent: int = 0, priority: Callable[[str], Optional[int]] = None,
+                 default_priority: int = 0):
+        self.max_concurrent = max_concurrent
+        self.default_priority = default_priority
+        self._priority = priority
+        self._lock = threading.Lock()
+        self._waiting: Dict[str, float] = {}  # 频道ID -> 开始排队的时间
+        self._active = 0
+
+    @classmethod
+    def from_config(cls, recording_config: Dict, **kwargs) -> 'AdmissionQueue':
+        """max_concurrent_recordings 为0时不限制"""
+        return cls(max_concurrent=recording_config.get('max_concurrent_recordings', 0), **kwargs)
+
+    def priority(self, channel_id: str) -> int:
+        value = self._priority(channel_id) if self._priority else None
+        return self.default_priority if value is None else value
+
+    def request(self, channel_id: str, active: int) -> bool:
+        """频道开播：有空位且没有排在前面的频道时返回 True（由调用方开始录制），否则进入队列"""
+        with self._lock:
+            self._active = active
+            if self.max_concurrent <= 0:
+                return True
+            free = self.max_concurrent - active
+            if channel_id not in self._waiting and free > 0 and not self._waiting:
+                return True
+            if channel_id not in self._waiting:
+                self._waiting[channel_id] = time.time()
+                logger.info(f"Queued recording for {channel_id} (priority {self.priority(channel_id)}, "
+                            f"{active}/{self.max_concurrent} slots in use, {len(self._waiting)} waiting)")
+            return False
+
+    def pop_ready(self, active: int) -> List[str]:
+        """按空位数取出排在最前面的频道（调用方开始录制，失败的频道下次开播检查时会重新排队）"""
+        with self._lock:
+            self._active = active
+            if not self._waiting:
+                return []
+            free = len(self._waiting) if self.max_concurrent <= 0 else self.max_concurrent - active
+            ready = self._ordered()[:max(free, 0)]
+            for channel_id in ready:
+                del self._waiting[channel_id]
+            return ready
+
+    def discard(self, channel_id: str):
+        """频道已下播或已从列表移除"""
+        with self._lock:
+            self._waiting.pop(channel_id, None)
+
+    @property
+    def channel_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._waiting)
+
+    def snapshot(self) -> Dict:
+        now = time.time()
+        with self._lock:
+            ordered = self._ordered()
+            waiting = []
+            for position, channel_id in enumerate(ordered, start=1):
+                priority = self.priority(channel_id)
+                if position == 1:
+                    reason = REASON_CAPACITY
+                elif self.priority(ordered[0]) > priority:
+                    reason = REASON_PRIORITY
+                else:
+                    reason = REASON_ORDER
+                waiting.append({
+                    'channel_id': channel_id,
+                    'position': position,
+                    'priority': priority,
+                    'reason': reason,
+                    'waiting': round(now - self._waiting[channel_id], 1)
+                })
+            return {'max_concurrent': self.max_concurrent, 'active': self._active, 'waiting': waiting}
+
+    def _ordered(self) -> List[str]:
+        """优先级从高到低，同优先级按排队先后"""
+        return sorted(self._waiting, key=lambda channel_id: (-self.priority(channel_id), self._waiting[channel_id]))
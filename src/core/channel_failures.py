@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+失效频道追踪
+记录返回 404、内容为空或连续出错的频道，按指数退避推迟对它们的请求，
+并标记为疑似失效（suspect）。状态保存在带文件锁的文件中，录制端与 Web 面板共用
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from api.rate_limiter import locked_file
+
+logger = logging.getLogger(__name__)
+
+
+class ChannelFailureTracker:
+    def __init__(self, state_path: str, suspect_after: int = 3, base_backoff: float = 600,
+                 max_backoff: float = 86400):
+        self.state_path = state_path
+        self.suspect_after = max(1, int(suspect_after))
+        self.base_backoff = float(base_backoff)
+        self.max_backoff = max(float(max_backoff), self.base_backoff)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = {}
+        self._signature = None
+        os.makedirs(os.path.dirname(os.path.abspath(state_path)), exist_ok=True)
+        self._sync()
+
+    @classmethod
+    def from_config(cls, config: Dict, state_path: str) -> 'ChannelFailureTracker':
+        recording = config.get('recording', {})
+        return cls(state_path,
+                   suspect_after=recording.get('suspect_after_failures', 3),
+                   base_backoff=recording.get('suspect_backoff', 600),
+                   max_backoff=recording.get('suspect_max_backoff', 86400))
+
+    def _sync(self):
+        """其他进程修改了状态文件时重新读取"""
+        try:
+            st = os.stat(self.state_path)
+            signature = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            return
+        if signature == self._signature:
+            return
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        with self._lock:
+            self._entries = entries
+            self._signature = signature
+
+    def _modify(self, channel_id: str, update: Callable[[Optional[Dict]], Optional[Dict]]) -> Optional[Dict]:
+        """在文件锁内读取最新状态、修改单个频道并写回"""
+        fd = os.open(self.state_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            with self._lock, locked_file(fd):
+                os.lseek(fd, 0, os.SEEK_SET)
+                raw = b''
+                while True:
+                    chunk = os.read(fd, 65536)
+                    if not chunk:
+                        break
+                    raw += chunk
+                try:
+                    entries = json.loads(raw) if raw else {}
+                except ValueError:
+                    entries = {}
+                entry = update(entries.get(channel_id))
+                if entry is None:
+                    entries.pop(channel_id, None)
+                else:
+                    entries[channel_id] = entry
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, json.dumps(entries, ensure_ascii=False).encode('utf-8'))
+                self._entries = entries
+                st = os.fstat(fd)
+                self._signature = (st.st_mtime_ns, st.st_size)
+                return entry
+        finally:
+            os.close(fd)
+
+    def record_failure(self, channel_id: str, reason: str, definitive: bool = False):
+        """记录一次失败；definitive（404、内容为空）时立即进入退避"""
+        def update(entry):
+            now = time.time()
+            entry = dict(entry or {'failures': 0, 'first_failure': now})
+            failures = entry['failures'] + 1
+            if definitive:
+                failures = max(failures, self.suspect_after)
+            entry.update(failures=failures, reason=reason, last_failure=now, next_retry=0)
+            if failures >= self.suspect_after:
+                backoff = min(self.max_backoff, self.base_backoff * 2 ** (failures - self.suspect_after))
+                entry['next_retry'] = now + backoff
+            return entry
+
+        try:
+            entry = self._modify(channel_id, update)
+        except OSError as e:
+            logger.warning(f"Failed to update channel failure state {self.state_path}: {e}")
+            return
+        if entry['next_retry']:
+            logger.warning(f"Channel {channel_id} is suspect ({reason}, {entry['failures']} failures), "
+                           f"retrying in {entry['next_retry'] - time.time():.0f}s")
+
+    def record_success(self, channel_id: str):
+        """请求成功时清除失败记录"""
+        self._sync()
+        if channel_id not in self._entries:
+            return
+        try:
+            self._modify(channel_id, lambda entry: None)
+        except OSError as e:
+            logger.warning(f"Failed to update channel failure state {self.state_path}: {e}")
+            return
+        logger.info(f"Channel {channel_id} recovered, no longer suspect")
+
+    def retry_at(self, channel_id: str, now: float = None) -> Optional[float]:
+        """频道处于退避期时返回下次允许请求的时间，否则返回None"""
+        now = time.time() if now is None else now
+        self._sync()
+        with self._lock:
+            entry = self._entries.get(channel_id)
+            if entry and entry.get('next_retry', 0) > now:
+                return entry['next_retry']
+        return None
+
+    def should_skip(self, channel_id: str) -> bool:
+        return self.retry_at(channel_id) is not None
+
+    def suspects(self) -> Dict[str, Dict]:
+        """疑似失效的频道（连续失败达到阈值）"""
+        self._sync()
+        with self._lock:
+            return {channel_id: dict(entry) for channel_id, entry in self._entries.items()
+                    if entry.get('failures', 0) >= self.suspect_after}
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+频道状态并发轮询
+使用有界线程池同时检查所有监控频道的直播状态，并统计每轮耗时与单次请求延迟
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, TypedDict
+
+logger = logging.getLogger(__name__)
+
+OFFLINE_STATUS = {'isLive': False, 'liveTitle': '', 'viewerCount': 0}
+
+
+class PollCycleStats(TypedDict):
+    channel_count: int
+    wall_time: float
+    latency_avg: float
+    latency_p50: float
+    latency_p95: float
+    latency_max: float
+    errors: int
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """计算已排序序列的百分位数（最近秩法）"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+class ChannelPoller:
+    def __init__(self, check_func: Callable[[str], Dict], max_workers: int = 16):
+        self.check_func = check_func
+        self.max_workers = max(1, int(max_workers))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix='channel-poller')
+        self.last_stats: Optional[PollCycleStats] = None
+        self.latencies: Dict[str, float] = {}  # 每个频道最近一次请求的延迟（秒）
+
+    def _timed_check(self, channel_id: str):
+        """执行单个频道检查并记录耗时"""
+        start = time.monotonic()
+        try:
+            status = self.check_func(channel_id)
+            return status, time.monotonic() - start, False
+        except Exception as e:
+            logger.error(f"Error polling channel {channel_id}: {e}")
+            return dict(OFFLINE_STATUS), time.monotonic() - start, True
+
+    def poll(self, channel_ids: List[str]) -> Dict[str, Dict]:
+        """并发检查所有频道状态，返回 channel_id -> status"""
+        cycle_start = time.monotonic()
+        futures = {channel_id: self._executor.submit(self._timed_check, channel_id)
+                   for channel_id in dict.fromkeys(channel_ids)}
+
+        results: Dict[str, Dict] = {}
+        latencies: List[float] = []
+        errors = 0
+        for channel_id, future in futures.items():
+            status, latency, failed = future.result()
+            results[channel_id] = status if status else dict(OFFLINE_STATUS)
+            self.latencies[channel_id] = latency
+            latencies.append(latency)
+            errors += int(failed)
+
+        latencies.sort()
+        self.last_stats = {
+            'channel_count': len(futures),
+            'wall_time': time.monotonic() - cycle_start,
+            'latency_avg': sum(latencies) / len(latencies) if latencies else 0.0,
+            'latency_p50': percentile(latencies, 0.5),
+            'latency_p95': percentile(latencies, 0.95),
+            'latency_max': latencies[-1] if latencies else 0.0,
+            'errors': errors
+        }
+        return results
+
+    def format_stats(self) -> str:
+        """格式化最近一轮的统计信息用于日志"""
+        stats = self.last_stats
+        if not stats:
+            return "no poll cycle yet"
+        return (f"{stats['channel_count']} channels in {stats['wall_time']:.2f}s "
+                f"(workers={self.max_workers}, latency avg={stats['latency_avg'] * 1000:.0f}ms "
+                f"p50={stats['latency_p50'] * 1000:.0f}ms p95={stats['latency_p95'] * 1000:.0f}ms "
+                f"max={stats['latency_max'] * 1000:.0f}ms, errors={stats['errors']})")
+
+    def shutdown(self):
+        """关闭线程池"""
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+频道注册表
+监视 record_list.txt 的变化（Linux 使用 inotify，其他平台按 mtime/size 轮询），
+在内存中保存解析后的频道集合，并向监听者推送新增/移除的差异。
+每行一个频道ID，其后可跟录制优先级（"频道ID 优先级"，数值越大越优先）
+"""
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import sys
+import threading
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# inotify 事件掩码
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+def _open_inotify(directory: str) -> Optional[int]:
+    """在Linux上为目录创建inotify监视，失败时返回None"""
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+class ChannelRegistry:
+    def __init__(self, record_list_path: str, poll_interval: float = 1.0):
+        self.record_list_path = record_list_path
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._channel_ids: List[str] = []
+        self._priorities: Dict[str, int] = {}
+        self._signature = None
+        self._listeners: List[Callable[[Set[str], Set[str]], None]] = []
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.reload()
+
+    @property
+    def channel_ids(self) -> List[str]:
+        """当前频道ID列表（保持文件中的顺序）"""
+        with self._lock:
+            return list(self._channel_ids)
+
+    def priority(self, channel_id: str) -> Optional[int]:
+        """频道在列表中指定的优先级，未指定时返回None"""
+        with self._lock:
+            return self._priorities.get(channel_id)
+
+    def add_listener(self, callback: Callable[[Set[str], Set[str]], None]):
+        """注册变化回调 callback(added, removed)"""
+        self._listeners.append(callback)
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.record_list_path)
+            return st.st_mtime_ns, st.st_size, st.st_ino
+        except FileNotFoundError:
+            return None
+
+    def _parse(self) -> Tuple[List[str], Dict[str, int]]:
+        if not os.path.exists(self.record_list_path):
+            return [], {}
+        channel_ids = []
+        priorities = {}
+        with open(self.record_list_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                fields = line.split()
+                if not fields:
+                    continue
+                channel_ids.append(fields[0])
+                if len(fields) > 1:
+                    try:
+                        priorities[fields[0]] = int(fields[1])
+                    except ValueError:
+                        logger.warning(f"Invalid priority for {fields[0]} in {self.record_list_path}: {fields[1]}")
+        return list(dict.fromkeys(channel_ids)), priorities
+
+    def reload(self, force: bool = True) -> Tuple[Set[str], Set[str]]:
+        """重新解析文件（force=False 时仅在文件签名变化时解析），返回 (新增, 移除)"""
+        signature = self._stat_signature()
+        if not force and signature == self._signature:
+            return set(), set()
+
+        try:
+            channel_ids, priorities = self._parse()
+        except Exception as e:
+            logger.error(f"Failed to parse channel list {self.record_list_path}: {e}")
+            return set(), set()
+
+        with self._lock:
+            previous = set(self._channel_ids)
+            self._channel_ids = channel_ids
+            self._priorities = priorities
+            self._signature = signature
+
+        added = set(channel_ids) - previous
+        removed = previous - set(channel_ids)
+        if added or removed:
+            logger.info(f"Channel list changed: +{len(added)} -{len(removed)} ({len(channel_ids)} total)")
+            for callback in self._listeners:
+                try:
+                    callback(added, removed)
+                except Exception as e:
+                    logger.error(f"Channel registry listener error: {e}")
+        return added, removed
+
+    def start(self):
+        """启动后台监视线程"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._watch, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止后台监视线程"""
+        self._stop_event.set()
+
+    def _watch(self):
+        directory = os.path.dirname(os.path.abspath(self.record_list_path))
+        fd = _open_inotify(directory)
+        logger.info(f"Watching {self.record_list_path} ({'inotify' if fd is not None else 'stat polling'})")
+        try:
+            while not self._stop_event.is_set():
+                if fd is not None:
+                    # 等待inotify事件，超时后仍做一次stat检查作为兜底
+                    readable, _, _ = select.select([fd], [], [], self.poll_interval)
+                    if readable:
+                        try:
+                            os.read(fd, 64 * 1024)
+                        except BlockingIOError:
+                            pass
+                else:
+                    self._stop_event.wait(self.poll_interval)
+                self.reload(force=False)
+        finally:
+            if fd is not None:
+                os.close(fd)
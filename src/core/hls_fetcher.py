@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原生 HLS 录制
+直接请求 Chzzk 的 HLS 播放列表并自行下载分段：每路录制使用少量并发连接，新出现的分段立即预取，
+单个分段失败时独立重试，下载完成的分段经重排缓冲区按序写入录制文件；
+并发数与缓冲区大小可按频道调整。录制句柄的接口与 subprocess.Popen 一致
+"""
+
+import logging
+import os
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, quote_plus, urlencode, urljoin, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.live_remux import RemuxSink
+
+logger = logging.getLogger(__name__)
+
+ENGINE_NATIVE = 'native'
+
+DEFAULT_OPTIONS = {
+    'concurrency': 3,        # 每路录制的并发连接数
+    'buffer': 12,            # 写入位置之后最多预取/缓存的分段数（重排缓冲区大小）
+    'live_edge': 3,          # 开始录制时从倒数第几个分段开始
+    'segment_retries': 3,    # 单个分段的重试次数
+    'timeout': 10,           # 单次请求超时（秒）
+    'playlist_failures': 10, # 连续多少次播放列表请求失败后结束录制
+    'retry_streams': 5,      # 获取不到播放列表时的重试间隔（秒），与 --retry-streams 相同
+    'retry_max': 10          # 获取播放列表的最大重试次数，与 --retry-max 相同
+}
+
+# Chzzk 的 .m4v 分段需要带上主播放列表地址中的 hdnts 令牌（参数名 __bgda__），否则返回 403
+SEGMENT_TOKEN_PARAM = '__bgda__'
+MASTER_TOKEN_PARAM = 'hdnts'
+
+ATTRIBUTE_RE = re.compile(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)')
+
+
+def parse_attributes(text: str) -> Dict[str, str]:
+    return {key: value.strip('"') for key, value in ATTRIBUTE_RE.findall(text)}
+
+
+def parse_master_playlist(text: str, base_url: str) -> List[Dict]:
+    """解析主播放列表中的各清晰度，媒体播放列表本身返回空列表"""
+    variants = []
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    for index, line in enumerate(lines):
+        if not line.startswith('#EXT-X-STREAM-INF:'):
+            continue
+        uri = next((item for item in lines[index + 1:] if not item.startswith('#')), None)
+        if uri is None:
+            continue
+        attributes = parse_attributes(line.split(':', 1)[1])
+        resolution = attributes.get('RESOLUTION', '')
+        height = int(resolution.split('x')[1]) if 'x' in resolution else 0
+        variants.append({
+            'uri': urljoin(base_url, uri),
+            'bandwidth': int(attributes.get('BANDWIDTH', 0) or 0),
+            'height': height,
+            'name': f'{height}p' if height else attributes.get('NAME', '')
+        })
+    return variants
+
+
+def segment_token(master_url: str) -> Optional[str]:
+    """主播放列表地址中的 hdnts 令牌"""
+    return dict(parse_qsl(urlparse(master_url).query)).get(MASTER_TOKEN_PARAM)
+
+
+def add_segment_token(url: str, token: Optional[str]) -> str:
+    """与 streamlink 的 chzzk 插件相同：只给 .m4v 分段加上 __bgda__ 参数（已有时不重复添加）"""
+    if not token or '.m4v' not in url or SEGMENT_TOKEN_PARAM in url:
+        return url
+    parsed = urlparse(url)
+    query = dict(parse_qsl(parsed.query, keep_blank_values=True))
+    query[SEGMENT_TOKEN_PARAM] = token
+    return parsed._replace(query=urlencode(query, safe='=', quote_via=quote_plus)).geturl()
+
+
+def parse_media_playlist(text: str, base_url: str, token: str = None) -> Dict:
+    """解析媒体播放列表：分段序号、地址、时长、初始化分段（EXT-X-MAP）与是否结束；token 为分段地址需要的 hdnts 令牌"""
+    playlist = {'media_sequence': 0, 'target_duration': 2.0, 'segments': [], 'map': None,
+                'endlist': False, 'encrypted': False}
+    sequence, duration = None, 0.0
+    for line in (line.strip() for line in text.splitlines()):
+        if not line:
+            continue
+        if line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            playlist['media_sequence'] = int(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-TARGETDURATION:'):
+            playlist['target_duration'] = float(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-MAP:'):
+            uri = parse_attributes(line.split(':', 1)[1]).get('URI')
+            playlist['map'] = urljoin(base_url, uri) if uri else None
+        elif line.startswith('#EXT-X-KEY:'):
+            playlist['encrypted'] = parse_attributes(line.split(':', 1)[1]).get('METHOD', 'NONE') != 'NONE'
+        elif line.startswith('#EXTINF:'):
+            duration = float(line.split(':', 1)[1].split(',')[0] or 0)
+        elif line == '#EXT-X-ENDLIST':
+            playlist['endlist'] = True
+        elif not line.startswith('#'):
+            if sequence is None:
+                sequence = playlist['media_sequence']
+            playlist['segments'].append((sequence, add_segment_token(urljoin(base_url, line), token), duration))
+            sequence += 1
+    return playlist
+
+
+def select_variant(variants: List[Dict], quality: str) -> Optional[Dict]:
+    """按清晰度名称选择（逗号分隔的备选列表依次尝试），best/worst 按码率选择；与 CLI 一致，都找不到时返回None"""
+    by_bandwidth = sorted(variants, key=lambda variant: variant['bandwidth'])
+    for name in quality.split(','):
+        name = name.strip()
+        if name == 'worst':
+            return by_bandwidth[0]
+        if name == 'best':
+            return by_bandwidth[-1]
+        for variant in reversed(by_bandwidth):
+            if variant['name'] == name:
+                return variant
+    return None
+
+
+class NativeHLSRecording:
+    """原生 HLS 录制句柄，接口与 subprocess.Popen 一致"""
+    stdout = None
+    stderr = None
+
+    def __init__(self, channel_id: str, url: Optional[str], quality: str, path: str, options: Dict,
+                 remux: Dict = None,
+                 resolver: Callable[[str], Optional[str]] = None,
+                 on_log: Callable[[str, str], None] = None,
+                 on_progress: Callable[[str, int, float], None] = None):
+        self.channel_id = channel_id
+        self.url = url
+        self.quality = quality
+        self.path = path
+        self.options = options
+        self.remux = remux
+        self.resolver = resolver
+        self.on_log = on_log
+        self.on_progress = on_progress
+        self.args = ['hls', url or channel_id, quality, '-o', path]
+        self.pid = os.getpid()
+        self.returncode: Optional[int] = None
+        self.missing_segments = 0
+        self._token: Optional[str] = None
+        self._stop = threading.Event()
+        self._done = threading.Event()
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=options['concurrency'] + 1, max_retries=0)
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._thread = threading.Thread(target=self._run, name=f"hls-{channel_id[:8]}", daemon=True)
+        self._thread.start()
+
+    def poll(self) -> Optional[int]:
+        return self.returncode
+
+    def wait(self, timeout: float = None) -> int:
+        if not self._done.wait(timeout):
+            raise subprocess.TimeoutExpired(self.args, timeout)
+        return self.returncode
+
+    def terminate(self):
+        self._stop.set()
+
+    def kill(self):
+        self._stop.set()
+        if self.returncode is None:
+            self.returncode = -9
+        self._done.set()
+
+    def _log(self, line: str):
+        if self.on_log:
+            self.on_log(self.channel_id, line)
+
+    def _get(self, url: str) -> requests.Response:
+        r = self._session.get(url, timeout=self.options['timeout'])
+        r.raise_for_status()
+        return r
+
+    def _run(self):
+        returncode = 0
+        try:
+            media_url = self._open()
+            if media_url is not None:
+                self._record(media_url)
+        except Exception as e:
+            self._log(f"[stream.hls][error] {e}")
+            returncode = 1
+        finally:
+            self._session.close()
+            if self.returncode is None:
+                self.returncode = 0 if self._stop.is_set() else returncode
+            self._done.set()
+
+    def _open(self) -> Optional[str]:
+        """获取主播放列表并选择清晰度，返回媒体播放列表地址；获取不到时按 retry_streams/retry_max 重试"""
+        for attempt in range(self.options['retry_max'] + 1):
+            url = self.url if self.url and '.m3u8' in self.url else (self.resolver(self.channel_id) if self.resolver else None)
+            if url:
+                self._token = segment_token(url)
+                text = self._get(url).text
+                variants = parse_master_playlist(text, url)
+                if not variants:
+                    self._log(f"[cli][info] Opening stream: {self.quality} (hls)")
+                    return url
+                variant = select_variant(variants, self.quality)
+                if variant is None:
+                    names = ', '.join(variant['name'] for variant in variants if variant['name'])
+                    raise RuntimeError(f"The specified stream(s) '{self.quality}' could not be found "
+                                       f"(available: {names})")
+                self._log(f"[cli][info] Opening stream: {variant['name'] or self.quality} (hls)")
+                return variant['uri']
+            if attempt < self.options['retry_max']:
+                self._log(f"[cli][info] Waiting for streams, retrying every {self.options['retry_streams']} second(s)")
+                if self._stop.wait(self.options['retry_streams']):
+                    return None
+        raise RuntimeError(f"No playable streams found for {self.channel_id}")
+
+    def _fetch_segment(self, sequence: int, url: str) -> Optional[bytes]:
+        """下载单个分段，失败时按指数退避重试，最终失败返回None"""
+        retries = self.options['segment_retries']
+        for attempt in range(retries + 1):
+            try:
+                return self._get(url).content
+            except requests.RequestException as e:
+                status = getattr(getattr(e, 'response', None), 'status_code', None)
+                if attempt == retries or status in (403, 404, 410) or self._stop.is_set():
+                    self._log(f"[stream.hls][warning] Failed to fetch segment {sequence}: {e}")
+                    return None
+                self._log(f"[stream.hls][debug] Retrying segment {sequence} ({attempt + 1}/{retries}): {e}")
+                self._stop.wait(0.5 * 2 ** attempt)
+        return None
+
+    def _record(self, media_url: str):
+        options = self.options
+        pending: Dict[int, Future] = {}  # 重排缓冲区：分段序号 -> 下载任务
+        next_write: Optional[int] = None
+        last_scheduled = -1
+        current_map = None
+        written, last_report, last_written = 0, time.monotonic(), 0
+        playlist_failures = 0
+        self._log(f"[cli][info] Writing output to\n{self.path}")
+
+        output = RemuxSink(self.path, self.remux.get('ffmpeg', 'ffmpeg'), on_log=self._log) if self.remux else open(self.path, 'wb')
+        with output, ThreadPoolExecutor(options['concurrency']) as pool:
+            while not self._stop.is_set():
+                reload_at = time.monotonic()
+                try:
+                    playlist = parse_media_playlist(self._get(media_url).text, media_url, self._token)
+                    playlist_failures = 0
+                except requests.RequestException as e:
+                    playlist_failures += 1
+                    if playlist_failures >= options['playlist_failures']:
+                        raise RuntimeError(f"Playlist unavailable after {playlist_failures} attempts: {e}")
+                    self._log(f"[stream.hls][warning] Failed to reload playlist: {e}")
+                    playlist = None
+                if playlist is not None:
+                    if playlist['encrypted']:
+                        raise RuntimeError("Encrypted HLS streams are not supported by the native engine")
+                    segments = playlist['segments']
+                    if playlist['map'] and playlist['map'] != current_map:
+                        # fMP4 初始化分段
+                        current_map = playlist['map']
+                        data = self._get(current_map).content
+                        output.write(data)
+                        written += len(data)
+                    if next_write is None and segments:
+                        next_write = segments[max(0, len(segments) - options['live_edge'])][0]
+                        last_scheduled = next_write - 1
+                    if segments and next_write is not None and next_write < segments[0][0] and next_write not in pending:
+                        # 写入落后于播放列表窗口，跳过已过期的分段
+                        self._log(f"[stream.hls][warning] Skipped segments {next_write}-{segments[0][0] - 1}")
+                        self.missing_segments += segments[0][0] - next_write
+                        next_write = segments[0][0]
+                        last_scheduled = max(last_scheduled, next_write - 1)
+                    # 新出现的分段立即提交下载，受重排缓冲区大小限制
+                    for sequence, url, _ in segments:
+                        if sequence > last_scheduled and sequence - next_write < options['buffer']:
+                            pending[sequence] = pool.submit(self._fetch_segment, sequence, url)
+                            last_scheduled = sequence
+                    interval = playlist['target_duration'] if segments and last_scheduled == segments[-1][0] \
+                        else playlist['target_duration'] / 2
+                else:
+                    interval = 1.0
+
+                # 等待下载完成并按序写入，直到下一次刷新播放列表
+                while not self._stop.is_set():
+                    if next_write is not None and next_write not in pending and pending \
+                            and min(pending) > next_write:
+                        # 分段序号不连续（播放列表跳号），从下一个已提交的分段继续
+                        self.missing_segments += min(pending) - next_write
+                        next_write = min(pending)
+                    while next_write in pending and pending[next_write].done():
+                        data = pending.pop(next_write).result()
+                        if data is None:
+                            self.missing_segments += 1
+                        else:
+                            output.write(data)
+                            written += len(data)
+                            self._log(f"[stream.hls][debug] Segment {next_write} complete")
+                        next_write += 1
+                    now = time.monotonic()
+                    if self.on_progress and now - last_report >= 1.0:
+                        self.on_progress(self.channel_id, written, (written - last_written) / (now - last_report))
+                        last_report, last_written = now, written
+                    if playlist is not None and playlist['endlist'] and not pending \
+                            and (not playlist['segments'] or next_write > playlist['segments'][-1][0]):
+                        self._log("[cli][info] Stream ended")
+                        self._stop.set()
+                        break
+                    remaining = reload_at + interval - now
+                    if remaining <= 0:
+                        break
+                    futures = [future for future in pending.values() if not future.done()]
+                    if futures:
+                        wait(futures, timeout=remaining, return_when=FIRST_COMPLETED)
+                    else:
+                        self._stop.wait(remaining)
+            for future in pending.values():
+                future.cancel()
+        if self.on_progress:
+            self.on_progress(self.channel_id, written, 0.0)
+        if self.missing_segments:
+            self._log(f"[stream.hls][warning] {self.missing_segments} segment(s) missing from {self.path}")
+
+
+class NativeHLSEngine:
+    def __init__(self, resolver: Callable[[str], Optional[str]] = None, options: Dict = None,
+                 channel_options: Dict[str, Dict] = None,
+                 on_log: Callable[[str, str], None] = None,
+                 on_progress: Callable[[str, int, float], None] = None):
+        self.resolver = resolver
+        self.options = {**DEFAULT_OPTIONS, **(options or {})}
+        self.channel_options = channel_options or {}
+        self.on_log = on_log
+        self.on_progress = on_progress
+        self._lock = threading.Lock()
+        self._recordings: List[NativeHLSRecording] = []
+
+    @classmethod
+    def from_config(cls, recording_config: Dict, resolver: Callable[[str], Optional[str]] = None,
+                    on_log=None, on_progress=None) -> 'NativeHLSEngine':
+        native = dict(recording_config.get('native_hls') or {})
+        channel_options = native.pop('channels', {})
+        return cls(resolver, options=native, channel_options=channel_options, on_log=on_log, on_progress=on_progress)
+
+    def options_for(self, channel_id: str) -> Dict:
+        """频道的录制参数（全局参数叠加 native_hls.channels 中的频道设置）"""
+        return {**self.options, **self.channel_options.get(channel_id, {})}
+
+    def start(self, channel_id: str, url: Optional[str], quality: str, path: str,
+              remux: Dict = None) -> NativeHLSRecording:
+        """开始一路录制；url 不是 m3u8 地址时通过 resolver 获取频道的播放列表地址，remux 不为空时实时封装为分片 MP4"""
+        recording = NativeHLSRecording(channel_id, url, quality, path, self.options_for(channel_id), remux=remux,
+                                       resolver=self.resolver, on_log=self.on_log, on_progress=self.on_progress)
+        with self._lock:
+            self._recordings = [item for item in self._recordings if item.poll() is None] + [recording]
+        return recording
+
+    def shutdown(self, timeout: float = 10):
+        with self._lock:
+            recordings = list(self._recordings)
+        for recording in recordings:
+            recording.terminate()
+        for recording in recordings:
+            try:
+                recording.wait(timeout)
+            except subprocess.TimeoutExpired:
+                recording.kill()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+开播录制延迟统计
+- detection: live-detail 的 openDate 到轮询观察到开播的延迟
+- spawn: 观察到开播到 streamlink 进程启动的延迟
+- first_byte: 进程启动到录制文件写入第一个字节的延迟
+按频道保存直方图，供 ZMQ、Web 面板和日志使用
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List
+
+from core.channel_poller import percentile
+from core.poll_scheduler import parse_open_date
+
+logger = logging.getLogger(__name__)
+
+METRICS = ('detection', 'spawn', 'first_byte')
+
+# 直方图桶上界（秒），最后一个桶为 +inf
+BUCKET_BOUNDS = [0.5, 1, 2, 5, 10, 20, 30, 60, 120, 300, 600, 1800]
+
+
+class LatencyHistogram:
+    def __init__(self, recent_size: int = 200):
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._recent = deque(maxlen=recent_size)  # 最近样本，用于计算百分位数
+
+    def observe(self, value: float):
+        value = max(0.0, value)
+        self.buckets[bisect.bisect_left(BUCKET_BOUNDS, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self._recent.append(value)
+
+    def merge(self, other: 'LatencyHistogram'):
+        for i, count in enumerate(other.buckets):
+            self.buckets[i] += count
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+        self._recent.extend(other._recent)
+
+    def snapshot(self) -> Dict:
+        recent = sorted(self._recent)
+        return {
+            'count': self.count,
+            'avg': round(self.total / self.count, 3) if self.count else 0.0,
+            'p50': round(percentile(recent, 0.5), 3),
+            'p95': round(percentile(recent, 0.95), 3),
+            'max': round(self.max, 3),
+            'buckets': dict(zip([str(bound) for bound in BUCKET_BOUNDS] + ['inf'], self.buckets))
+        }
+
+
+class GoLiveLatencyTracker:
+    def __init__(self, first_byte_timeout: float = 300, first_byte_check_interval: float = 0.2):
+        self.first_byte_timeout = first_byte_timeout
+        self.first_byte_check_interval = first_byte_check_interval
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Dict[str, LatencyHistogram]] = {}
+        self._was_live: Dict[str, bool] = {}
+        self._observed_at: Dict[str, float] = {}  # 本场直播首次观察到开播的时间
+        self._current: Dict[str, Dict[str, float]] = {}  # 本场直播已测得的延迟
+        self._waiting_first_byte: Dict[str, str] = {}  # 正在等待第一个字节的频道 -> 最新的录制文件
+        self._pending: List[Dict] = []  # 尚未发布的新样本
+
+    def _observe(self, channel_id: str, metric: str, value: float):
+        with self._lock:
+            histograms = self._histograms.setdefault(channel_id, {name: LatencyHistogram() for name in METRICS})
+            histograms[metric].observe(value)
+            self._current.setdefault(channel_id, {})[metric] = value
+            self._pending.append({'channel_id': channel_id, 'metric': metric, 'value': round(value, 3),
+                                  'timestamp': time.time()})
+
+    def observe_status(self, channel_id: str, is_live: bool, open_date: str = None, observed_at: float = None):
+        """记录一次轮询结果；仅对本进程观察到的下播->开播转换统计检测延迟"""
+        observed_at = time.time() if observed_at is None else observed_at
+        was_live = self._was_live.get(channel_id)
+        self._was_live[channel_id] = is_live
+        if not is_live:
+            self._observed_at.pop(channel_id, None)
+            return
+        if channel_id in self._observed_at:
+            return
+
+        self._observed_at[channel_id] = observed_at
+        with self._lock:
+            self._current[channel_id] = {}
+        # 启动时已在直播的频道无法得知真实的检测延迟
+        if was_live is False:
+            started = parse_open_date(open_date)
+            if started is not None:
+                self._observe(channel_id, 'detection', observed_at - started.timestamp())
+
+    def process_started(self, channel_id: str, rec_file_path: str, started_at: float = None):
+        """
+        记录录制进程启动，统计启动延迟并在后台等待录制文件的第一个字节。
+        同一场直播中的进程重启、切换分段、卡顿重启与降档都会再次启动进程，只有第一次计入
+        """
+        started_at = time.time() if started_at is None else started_at
+        observed_at = self._observed_at.get(channel_id)
+        with self._lock:
+            current = self._current.get(channel_id, {})
+            measure_spawn = observed_at is not None and 'spawn' not in current
+            # 第一个字节之前进程就重启时，已有的等待线程改为检查新的录制文件
+            measure_first_byte = 'first_byte' not in current and channel_id not in self._waiting_first_byte
+            if 'first_byte' not in current:
+                self._waiting_first_byte[channel_id] = rec_file_path
+        if measure_spawn:
+            self._observe(channel_id, 'spawn', started_at - observed_at)
+        if not measure_first_byte:
+            return
+
+        thread = threading.Thread(target=self._wait_first_byte, args=(channel_id, started_at), daemon=True)
+        thread.start()
+
+    def _wait_first_byte(self, channel_id: str, started_at: float):
+        try:
+            self._poll_first_byte(channel_id, started_at)
+        finally:
+            with self._lock:
+                self._waiting_first_byte.pop(channel_id, None)
+
+    def _poll_first_byte(self, channel_id: str, started_at: float):
+        deadline = started_at + self.first_byte_timeout
+        rec_file_path = None
+        while time.time() < deadline:
+            with self._lock:
+                rec_file_path = self._waiting_first_byte.get(channel_id, rec_file_path)
+            try:
+                if os.path.getsize(rec_file_path) > 0:
+                    self._observe(channel_id, 'first_byte', time.time() - started_at)
+                    logger.info(f"Go-live latency for {channel_id}: {self.format_channel(channel_id)}")
+                    return
+            except OSError:
+                pass
+            time.sleep(self.first_byte_check_interval)
+        logger.warning(f"No data written to {rec_file_path} within {self.first_byte_timeout:.0f}s")
+
+    def pop_events(self) -> List[Dict]:
+        """取出自上次调用以来新增的样本"""
+        with self._lock:
+            events, self._pending = self._pending, []
+        return events
+
+    def snapshot(self) -> Dict:
+        """按频道与汇总的直方图快照"""
+        with self._lock:
+            overall = {name: LatencyHistogram(recent_size=1000) for name in METRICS}
+            channels = {}
+            for channel_id, histograms in self._histograms.items():
+                channels[channel_id] = {name: histogram.snapshot() for name, histogram in histograms.items()}
+                for name, histogram in histograms.items():
+                    overall[name].merge(histogram)
+            return {
+                'overall': {name: histogram.snapshot() for name, histogram in overall.items()},
+                'channels': channels
+            }
+
+    def format_channel(self, channel_id: str) -> str:
+        """单个频道本场直播的延迟摘要"""
+        with self._lock:
+            current = self._current.get(channel_id, {})
+            return ', '.join(f"{name} {current[name]:.1f}s" if name in current else f"{name} n/a"
+                             for name in METRICS)
+
+    def format_summary(self) -> str:
+        """所有频道的汇总摘要，用于日志"""
+        overall = self.snapshot()['overall']
+        return ', '.join(f"{name} p50={stats['p50']:.1f}s p95={stats['p95']:.1f}s (n={stats['count']})"
+                         for name, stats in overall.items())
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+streamlink 输出读取
+所有录制进程的 stdout/stderr 由同一个线程通过 selectors 非阻塞读取，避免管道写满后 streamlink 阻塞；
+解析进度行与分段日志，按频道统计写入字节数、码率与分段数，供Web面板展示
+Windows 上 select 不支持管道，回退为每个管道一个读取线程
+输出写入日志文件的录制进程（录制端重启后仍需继续运行的进程）由同一个线程定时读取文件新增的内容
+"""
+
+import collections
+import copy
+import logging
+import os
+import re
+import selectors
+import threading
+import time
+from typing import Callable, Deque, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# [download] Written 12.34 MiB to /path/file.ts (1m02s @ 1.23 MiB/s)，刚开始时没有速度
+PROGRESS_RE = re.compile(r'Written (?P<written>[\d.]+ ?[KMGT]?i?B)\b(?:.*?@ (?P<speed>[\d.]+ ?[KMGT]?i?B)/s)?')
+# [stream.hls][debug] Segment 1234 complete / Writing segment 1234 to output
+SEGMENT_RE = re.compile(r'[Ss]egment (?P<num>\d+)\b.*\b(?:complete|completed|written|to output)\b')
+# [cli][info] Opening stream: 1080p (hls)
+OPENING_RE = re.compile(r'Opening stream: (?P<quality>\S+) \((?P<type>[\w-]+)\)')
+# [cli][info] ... / [stream.hls][warning] ...
+LEVEL_RE = re.compile(r'^\[[\w.\-]+\]\[(?P<level>\w+)\]')
+
+SIZE_UNITS = {'B': 1, 'KB': 1000, 'MB': 1000 ** 2, 'GB': 1000 ** 3, 'TB': 1000 ** 4,
+              'KIB': 1024, 'MIB': 1024 ** 2, 'GIB': 1024 ** 3, 'TIB': 1024 ** 4}
+
+# streamlink 参数：强制输出进度（stderr 不是终端时默认不输出）并打印分段日志
+STREAMLINK_ARGS = ["--progress", "force", "--loglevel", "debug"]
+FILE_POLL_INTERVAL = 1.0  # 读取日志文件的间隔（秒）
+
+
+def parse_size(text: str) -> int:
+    """解析 streamlink 的大小字符串（如 '1.23 MiB'）"""
+    match = re.match(r'([\d.]+) ?([KMGT]?i?B)', text.strip())
+    if not match:
+        return 0
+    return int(float(match.group(1)) * SIZE_UNITS.get(match.group(2).upper(), 1))
+
+
+class RecordingStats:
+    def __init__(self, channel_id: str, tail_lines: int = 20):
+        self.channel_id = channel_id
+        self.path = ''
+        self.started_at = time.time()
+        self.process_started_at = self.started_at
+        self.restarts = 0
+        self.parts = 1  # 按时长/大小分段录制时的分段数
+        self.bytes_base = 0  # 之前的录制进程写入的字节数
+        self.bytes_written = 0  # 当前录制进程写入的字节数
+        self.speed = 0.0  # streamlink 报告的当前写入速度（字节/秒）
+        self.segments = 0
+        self.last_segment: Optional[int] = None
+        self.quality = ''
+        self.stream_type = ''
+        self.warnings = 0
+        self.errors = 0
+        self.last_output_at = 0.0
+        self.tail: Deque[str] = collections.deque(maxlen=tail_lines)
+
+    def start_process(self, path: str):
+        """录制进程（重新）启动，进度从0开始计"""
+        if self.path:
+            self.restarts += 1
+        self.path = path
+        self.bytes_base += self.bytes_written
+        self.bytes_written = 0
+        self.speed = 0.0
+        self.process_started_at = time.time()
+
+    def next_part(self, path: str) -> 'RecordingStats':
+        """切换到下一个分段：返回继承累计统计的新对象，交接期间旧进程的输出仍写入旧对象，不再计入"""
+        stats = copy.copy(self)
+        stats.tail = collections.deque(self.tail, maxlen=self.tail.maxlen)
+        stats.parts += 1
+        stats.path = path
+        stats.bytes_base += self.bytes_written
+        stats.bytes_written = 0
+        stats.speed = 0.0
+        stats.process_started_at = time.time()
+        return stats
+
+    def feed(self, line: str):
+        self.last_output_at = time.time()
+        progress = PROGRESS_RE.search(line)
+        if progress:
+            self.bytes_written = parse_size(progress.group('written'))
+            if progress.group('speed'):
+                self.speed = float(parse_size(progress.group('speed')))
+            return
+
+        segment = SEGMENT_RE.search(line)
+        if segment:
+            num = int(segment.group('num'))
+            if num != self.last_segment:
+                self.segments += 1
+                self.last_segment = num
+            return
+        level = LEVEL_RE.match(line)
+        level = level.group('level') if level else ''
+        if level == 'debug':
+            return
+        self.tail.append(line)
+        opening = OPENING_RE.search(line)
+        if opening:
+            self.quality, self.stream_type = opening.group('quality'), opening.group('type')
+        if level == 'warning':
+            self.warnings += 1
+        elif level in ('error', 'critical'):
+            self.errors += 1
+
+    def snapshot(self, now: float) -> Dict:
+        total = self.bytes_base + self.bytes_written
+        elapsed = max(now - self.started_at, 1e-6)
+        return {
+            'path': self.path,
+            'started_at': self.started_at,
+            'restarts': self.restarts,
+            'parts': self.parts,
+            'bytes_written': total,
+            'speed': round(self.speed, 1),
+            'average_speed': round(total / elapsed, 1),
+            'segments': self.segments,
+            'last_segment': self.last_segment,
+            'quality': self.quality,
+            'stream_type': self.stream_type,
+            'warnings': self.warnings,
+            'errors': self.errors,
+            'idle': round(now - self.last_output_at, 1) if self.last_output_at else None
+        }
+
+
+class StreamlinkLogPump:
+    def __init__(self, on_snapshot: Callable[[Dict], None] = None, publish_interval: float = 5):
+        self.on_snapshot = on_snapshot
+        self.publish_interval = publish_interval
+        self._lock = threading.Lock()
+        self._stats: Dict[str, RecordingStats] = {}
+        self._use_selector = os.name != 'nt'
+        self._selector = None
+        self._pending: List = []  # 等待注册到 selector 的管道
+        self._files: List = []  # 跟踪中的日志文件 [file, stats, buffer, process]
+        self._thread = None
+        self._published_empty = False
+        if self._use_selector:
+            self._selector = selectors.DefaultSelector()
+            self._wake_r, self._wake_w = os.pipe()
+            os.set_blocking(self._wake_r, False)
+            self._selector.register(self._wake_r, selectors.EVENT_READ, None)
+
+    def attach(self, channel_id: str, process, path: str, new_part: bool = False, log_path: str = None,
+               from_end: bool = False):
+        """开始读取一个录制进程的输出；同一频道重启录制或切换分段时继续累计统计
+        log_path 不为空时读取进程写入的日志文件而不是管道，from_end 时跳过已有内容（接管的进程）"""
+        with self._lock:
+            stats = self._stats.get(channel_id)
+            if stats is not None and new_part:
+                stats = stats.next_part(path)
+            else:
+                stats = stats or RecordingStats(channel_id)
+                stats.start_process(path)
+            self._stats[channel_id] = stats
+        if log_path:
+            log_file = open(log_path, 'rb')
+            if from_end:
+                log_file.seek(0, os.SEEK_END)
+            with self._lock:
+                self._files.append([log_file, stats, bytearray(), process])
+            if self._use_selector:
+                os.write(self._wake_w, b'\0')
+            self._ensure_thread()
+            return
+        # 组合管道（streamlink | ffmpeg）通过 pipes 提供所有需要读取的输出
+        for stream in getattr(process, 'pipes', None) or (process.stdout, process.stderr):
+            if stream is None:
+                continue
+            if self._use_selector:
+                os.set_blocking(stream.fileno(), False)
+                with self._lock:
+                    self._pending.append((stream, stats))
+                os.write(self._wake_w, b'\0')
+            else:
+                threading.Thread(target=self._read_blocking, args=(stream, stats),
+                                 name=f"streamlink-log-{channel_id[:8]}", daemon=True).start()
+        self._ensure_thread()
+
+    def feed_line(self, channel_id: str, line: str):
+        """直接写入一行输出（进程内录制引擎转发的日志）"""
+        with self._lock:
+            stats = self._stats.get(channel_id)
+            if stats is not None:
+                stats.feed(line)
+
+    def report_progress(self, channel_id: str, bytes_written: int, speed: float):
+        """直接更新写入进度（进程内录制引擎没有进度行）"""
+        with self._lock:
+            stats = self._stats.get(channel_id)
+            if stats is not None:
+                stats.bytes_written = bytes_written
+                stats.speed = speed
+                stats.last_output_at = time.time()
+
+    def remove(self, channel_id: str):
+        """录制结束后移除统计（管道在进程退出、读到EOF时自动注销）"""
+        with self._lock:
+            self._stats.pop(channel_id, None)
+
+    def tail(self, channel_id: str, lines: int = 5) -> List[str]:
+        """最近的输出行（不含进度与调试行），用于记录进程退出原因"""
+        with self._lock:
+            stats = self._stats.get(channel_id)
+            return list(stats.tail)[-lines:] if stats else []
+
+    def snapshot(self) -> Dict[str, Dict]:
+        now = time.time()
+        with self._lock:
+            return {channel_id: stats.snapshot(now) for channel_id, stats in self._stats.items()}
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            target = self._run_selector if self._use_selector else self._run_publisher
+            self._thread = threading.Thread(target=target, name="streamlink-log-pump", daemon=True)
+        self._thread.start()
+
+    def _feed(self, stats: RecordingStats, buffer: bytearray, data: bytes):
+        """按行（\\r 或 \\n）拆分并解析，不完整的行保留在缓冲区"""
+        buffer.extend(data)
+        *lines, rest = re.split(rb'[\r\n]', bytes(buffer))
+        buffer[:] = rest
+        with self._lock:
+            for line in lines:
+                if line.strip():
+                    stats.feed(line[:1000].decode('utf-8', errors='replace').rstrip())
+
+    def _run_selector(self):
+        last_publish = 0.0
+        while True:
+            try:
+                timeout = FILE_POLL_INTERVAL if self._files else self.publish_interval
+                for key, _ in self._selector.select(timeout=timeout):
+                    if key.data is None:
+                        self._register_pending()
+                        continue
+                    stream, stats, buffer = key.data
+                    try:
+                        data = os.read(key.fd, 65536)
+                    except BlockingIOError:
+                        continue
+                    except OSError:
+                        data = b''
+                    if data:
+                        self._feed(stats, buffer, data)
+                    else:
+                        # 进程退出，管道关闭
+                        self._feed(stats, buffer, b'\n')
+                        self._selector.unregister(key.fd)
+                        stream.close()
+                self._poll_files()
+            except Exception as e:
+                logger.error(f"Streamlink log pump error: {e}")
+                time.sleep(1)
+            if time.time() - last_publish >= self.publish_interval:
+                last_publish = time.time()
+                self._publish()
+
+    def _register_pending(self):
+        try:
+            while os.read(self._wake_r, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        with self._lock:
+            pending, self._pending = self._pending, []
+        for stream, stats in pending:
+            self._selector.register(stream.fileno(), selectors.EVENT_READ, (stream, stats, bytearray()))
+
+    def _read_blocking(self, stream, stats: RecordingStats):
+        buffer = bytearray()
+        fd = stream.fileno()
+        try:
+            for data in iter(lambda: os.read(fd, 65536), b''):
+                self._feed(stats, buffer, data)
+        except OSError:
+            pass
+        self._feed(stats, buffer, b'\n')
+        stream.close()
+
+    def _poll_files(self):
+        """读取日志文件新写入的内容；进程退出后读完剩余内容即停止跟踪并删除日志文件"""
+        with self._lock:
+            files = list(self._files)
+        for entry in files:
+            log_file, stats, buffer, process = entry
+            exited = process.poll() is not None
+            data = log_file.read()
+            if data:
+                self._feed(stats, buffer, data)
+            if exited:
+                self._feed(stats, buffer, b'\n')
+                log_file.close()
+                with self._lock:
+                    self._files.remove(entry)
+                try:
+                    os.remove(log_file.name)
+                except OSError:
+                    pass
+
+    def _run_publisher(self):
+        last_publish = 0.0
+        while True:
+            time.sleep(FILE_POLL_INTERVAL if self._files else self.publish_interval)
+            try:
+                self._poll_files()
+            except Exception as e:
+                logger.error(f"Streamlink log pump error: {e}")
+            if time.time() - last_publish >= self.publish_interval:
+                last_publish = time.time()
+                self._publish()
+
+    def _publish(self):
+        if self.on_snapshot is None:
+            return
+        snapshot = self.snapshot()
+        # 没有录制时只发布一次空状态
+        if not snapshot and self._published_empty:
+            return
+        self._published_empty = not snapshot
+        try:
+            self.on_snapshot(snapshot)
+        except Exception as e:
+            logger.warning(f"Failed to publish recording stats: {e}")
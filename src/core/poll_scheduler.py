@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+自适应频道轮询调度器
+根据每个频道历史开播时间（星期 x 小时分布）动态调整轮询间隔，并受全局请求速率预算约束
+"""
+
+import datetime
+import heapq
+import json
+import logging
+import os
+import time
+from typing import Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+HOURS_PER_WEEK = 168
+KST = datetime.timezone(datetime.timedelta(hours=9))  # Chzzk openDate 使用韩国时间
+
+
+def parse_open_date(open_date: str) -> Optional[datetime.datetime]:
+    """解析 live-detail 返回的 openDate 并转换为本地时间"""
+    if not open_date:
+        return None
+    try:
+        parsed = datetime.datetime.strptime(open_date, '%Y-%m-%d %H:%M:%S')
+        return parsed.replace(tzinfo=KST).astimezone().replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return None
+
+
+def hour_of_week(dt: datetime.datetime) -> int:
+    """返回 0-167 的星期小时槽位"""
+    return dt.weekday() * 24 + dt.hour
+
+
+class PollScheduler:
+    def __init__(self, base_interval: float = 600, min_interval: float = 30, max_interval: float = 1800,
+                 requests_per_second: float = 1.0, burst: int = 10, dormant_days: int = 30,
+                 adaptive: bool = True, history_path: str = None):
+        self.base_interval = float(base_interval)
+        self.min_interval = min(float(min_interval), self.base_interval)
+        self.max_interval = max(float(max_interval), self.base_interval)
+        self.requests_per_second = max(0.01, float(requests_per_second))
+        self.burst = max(1, int(burst))
+        self.dormant_days = dormant_days
+        self.adaptive = adaptive
+        self.history_path = history_path
+
+        # 优先队列: (下次轮询时间, 序号, channel_id)，过期条目惰性丢弃
+        self._heap: List = []
+        self._seq = 0
+        self._due: Dict[str, float] = {}
+        self._is_live: Dict[str, bool] = {}
+
+        # 令牌桶（全局请求预算）
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+
+        # 开播历史: channel_id -> {'bins': [168], 'last_live': ts, 'last_open_date': str, 'first_polled': ts}
+        self.history: Dict[str, Dict] = self.load_history()
+
+    @classmethod
+    def from_config(cls, config: Dict, history_path: str = None) -> 'PollScheduler':
+        """从配置文件的 recording / scheduler 段创建调度器"""
+        scheduler_config = config.get('scheduler', {})
+        return cls(
+            base_interval=config['recording']['interval'],
+            min_interval=scheduler_config.get('min_interval', 30),
+            max_interval=scheduler_config.get('max_interval', 1800),
+            requests_per_second=scheduler_config.get('requests_per_second', 1.0),
+            burst=scheduler_config.get('burst', 10),
+            dormant_days=scheduler_config.get('dormant_days', 30),
+            adaptive=scheduler_config.get('adaptive', True),
+            history_path=history_path
+        )
+
+    def load_history(self) -> Dict[str, Dict]:
+        """加载开播历史"""
+        if not self.history_path or not os.path.exists(self.history_path):
+            return {}
+        try:
+            with open(self.history_path, 'r', encoding='utf-8') as f:
+                history = json.load(f)
+            logger.info(f"Loaded go-live history for {len(history)} channels")
+            return history
+        except Exception as e:
+            logger.warning(f"Failed to load go-live history: {e}")
+            return {}
+
+    def save_history(self):
+        """保存开播历史（先写临时文件再替换）"""
+        if not self.history_path:
+            return
+        try:
+            tmp_path = f"{self.history_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.history, f)
+            os.replace(tmp_path, self.history_path)
+        except Exception as e:
+            logger.warning(f"Failed to save go-live history: {e}")
+
+    def _push(self, channel_id: str, due: float):
+        self._seq += 1
+        self._due[channel_id] = due
+        heapq.heappush(self._heap, (due, self._seq, channel_id))
+
+    def defer(self, channel_id: str, until: float):
+        """推迟已取出但未轮询的频道（例如处于退避期的疑似失效频道），并退还其占用的令牌"""
+        self._tokens = min(float(self.burst), self._tokens + 1)
+        self._push(channel_id, until)
+
+    def sync(self, channel_ids: Iterable[str], now: float = None):
+        """同步监控频道集合：新频道立即轮询，已移除频道出队"""
+        now = time.time() if now is None else now
+        channel_ids = set(channel_ids)
+        for channel_id in channel_ids - self._due.keys():
+            self._push(channel_id, now)
+        for channel_id in self._due.keys() - channel_ids:
+            del self._due[channel_id]
+            self._is_live.pop(channel_id, None)
+
+    def _refill(self):
+        current = time.monotonic()
+        self._tokens = min(float(self.burst),
+                           self._tokens + (current - self._last_refill) * self.requests_per_second)
+        self._last_refill = current
+
+    def pop_due(self, now: float = None) -> List[str]:
+        """取出已到期且在速率预算内的频道"""
+        now = time.time() if now is None else now
+        self._refill()
+        due_channels = []
+        while self._heap and self._heap[0][0] <= now and self._tokens >= 1:
+            due, _, channel_id = heapq.heappop(self._heap)
+            if self._due.get(channel_id) != due:
+                continue
+            del self._due[channel_id]
+            self._tokens -= 1
+            due_channels.append(channel_id)
+        return due_channels
+
+    def seconds_until_next(self, now: float = None) -> float:
+        """距离下一次可轮询的秒数"""
+        now = time.time() if now is None else now
+        while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return self.base_interval
+        wait = max(0.0, self._heap[0][0] - now)
+        self._refill()
+        if self._tokens < 1:
+            wait = max(wait, (1 - self._tokens) / self.requests_per_second)
+        return wait
+
+    def record_result(self, channel_id: str, is_live: bool, open_date: str = None, now: float = None) -> float:
+        """记录一次轮询结果，学习开播时间并重新入队，返回下次轮询间隔"""
+        now = time.time() if now is None else now
+        was_live = self._is_live.get(channel_id, False)
+        self._is_live[channel_id] = is_live
+
+        entry = self._history_entry(channel_id)
+        if not entry.get('first_polled'):
+            # 从第一次轮询开始计算一直未开播的时长
+            entry['first_polled'] = now
+            self.save_history()
+
+        if is_live and not was_live:
+            self._record_go_live(channel_id, open_date, now)
+
+        interval = self.next_interval(channel_id, now)
+        self._push(channel_id, now + interval)
+        return interval
+
+    def _history_entry(self, channel_id: str) -> Dict:
+        return self.history.setdefault(channel_id, {'bins': [0.0] * HOURS_PER_WEEK,
+                                                    'last_live': 0, 'last_open_date': ''})
+
+    def _record_go_live(self, channel_id: str, open_date: str, now: float):
+        entry = self._history_entry(channel_id)
+        # 同一场直播只计一次（例如录制端重启后再次观察到）
+        if open_date and entry.get('last_open_date') == open_date:
+            return
+
+        started = parse_open_date(open_date) or datetime.datetime.fromtimestamp(now)
+        entry['bins'][hour_of_week(started)] += 1
+        entry['last_live'] = max(entry.get('last_live', 0), now)
+        entry['last_open_date'] = open_date or ''
+
+        # 样本过多时衰减旧数据，使分布能跟随作息变化
+        if sum(entry['bins']) > 200:
+            entry['bins'] = [count / 2 for count in entry['bins']]
+
+        logger.info(f"Recorded go-live for {channel_id} at {started.strftime('%a %H:00')}")
+        self.save_history()
+
+    def next_interval(self, channel_id: str, now: float = None) -> float:
+        """根据开播概率计算下次轮询间隔"""
+        now = time.time() if now is None else now
+        if not self.adaptive or self._is_live.get(channel_id, False):
+            return self.base_interval
+
+        entry = self.history.get(channel_id)
+        if not entry:
+            return self.base_interval
+
+        bins = entry['bins']
+        total = sum(bins)
+        slot = hour_of_week(datetime.datetime.fromtimestamp(now))
+        # 观察窗口：上一小时、当前小时、下一小时
+        window = [(slot + offset) % HOURS_PER_WEEK for offset in (-1, 0, 1)]
+        window_count = sum(bins[i] for i in window)
+
+        # 加入均匀先验，样本少时接近基础间隔
+        prior = 2.0
+        uniform_share = len(window) / HOURS_PER_WEEK
+        share = (window_count + prior * uniform_share) / (total + prior)
+        lift = share / uniform_share
+
+        interval = self.base_interval / max(lift, 1e-6)
+
+        # 最后一次开播（从未开播时为第一次轮询）以来一直未开播的频道视为休眠
+        offline_since = entry.get('last_live') or entry.get('first_polled')
+        if self.dormant_days and offline_since and now - offline_since > self.dormant_days * 86400:
+            interval = self.max_interval
+
+        return min(self.max_interval, max(self.min_interval, interval))
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+录制进程监督
+每个 streamlink 子进程由一个后台线程 wait()，进程退出后立即分类退出原因并唤醒主循环；
+仍在直播的频道按指数退避重启录制，避免进程反复崩溃时频繁重启
+"""
+
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    import psutil
+except ImportError:  # 可选依赖，没有时从 /proc 读取进程启动时间（仅限 Linux）
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+EXIT_STOPPED = 'stopped'                # 录制端主动停止
+EXIT_COMPLETED = 'completed'            # 返回码0（直播结束或 streamlink 重试耗尽）
+EXIT_STARTUP_FAILED = 'startup_failed'  # 启动后很快退出（无可用流、参数错误、认证失败等）
+EXIT_CRASHED = 'crashed'                # 非0返回码
+EXIT_KILLED = 'killed'                  # 被信号终止（OOM killer、外部 kill 等）
+EXIT_STALLED = 'stalled'                # 进程仍在运行但录制文件不再增长，由录制端结束
+
+
+def classify_exit(returncode: int, runtime: float, requested: bool, startup_window: float) -> str:
+    """根据返回码、运行时长以及是否为主动停止判断退出原因"""
+    if requested:
+        return EXIT_STOPPED
+    if returncode < 0:
+        return EXIT_KILLED
+    if returncode != 0 and runtime < startup_window:
+        return EXIT_STARTUP_FAILED
+    if returncode != 0:
+        return EXIT_CRASHED
+    return EXIT_COMPLETED
+
+
+def describe_returncode(returncode: int) -> str:
+    if returncode < 0:
+        try:
+            return f"signal {signal.Signals(-returncode).name}"
+        except ValueError:
+            return f"signal {-returncode}"
+    return f"exit code {returncode}"
+
+
+class ProcessExit:
+    def __init__(self, channel_id: str, process, returncode: int, runtime: float, reason: str):
+        self.channel_id = channel_id
+        self.process = process
+        self.returncode = returncode
+        self.runtime = runtime
+        self.reason = reason
+        self.exited_at = time.time()
+
+    def describe(self) -> str:
+        return f"{self.reason}, {describe_returncode(self.returncode)} after {self.runtime:.0f}s"
+
+
+class ProcessSupervisor:
+    def __init__(self, on_exit: Callable[[ProcessExit], None] = None, startup_window: float = 15,
+                 base_delay: float = 2, max_delay: float = 30, max_attempts: int = 5,
+                 stable_seconds: float = 300):
+        self.on_exit = on_exit
+        self.startup_window = startup_window
+        self.base_delay = base_delay
+        self.max_delay = max(max_delay, base_delay)
+        self.max_attempts = max_attempts
+        self.stable_seconds = stable_seconds  # 运行超过该时长后退出时重置重启计数
+        self._lock = threading.Lock()
+        self._exits: List[ProcessExit] = []
+        self._requested: Set[int] = set()  # 主动停止的进程（id()，进程内录制句柄共用工作进程PID）
+        self._attempts: Dict[str, int] = {}
+        self._stalled: Set[str] = set()  # 最近一次重启原因为停滞的频道
+
+    @classmethod
+    def from_config(cls, config: Dict, on_exit: Callable[[ProcessExit], None] = None) -> 'ProcessSupervisor':
+        system = config.get('system', {})
+        return cls(on_exit,
+                   startup_window=system.get('restart_startup_window', 15),
+                   base_delay=system.get('restart_base_delay', 2),
+                   max_delay=system.get('restart_delay', 30),
+                   max_attempts=system.get('max_restart_attempts', 5),
+                   stable_seconds=system.get('restart_stable_seconds', 300))
+
+    def watch(self, channel_id: str, process, started_at: float = None):
+        """开始监督一个录制进程，退出时记录并回调 on_exit"""
+        started_at = time.time() if started_at is None else started_at
+        thread = threading.Thread(target=self._wait, args=(channel_id, process, started_at),
+                                  name=f"supervise-{channel_id[:8]}", daemon=True)
+        thread.start()
+
+    def _wait(self, channel_id: str, process, started_at: float):
+        returncode = process.wait()
+        runtime = time.time() - started_at
+        with self._lock:
+            requested = id(process) in self._requested
+            self._requested.discard(id(process))
+        exit_info = ProcessExit(channel_id, process, returncode, runtime,
+                                classify_exit(returncode, runtime, requested, self.startup_window))
+        if exit_info.reason != EXIT_STOPPED:
+            logger.warning(f"Recording process for {channel_id} exited: {exit_info.describe()}")
+        with self._lock:
+            self._exits.append(exit_info)
+        if self.on_exit:
+            try:
+                self.on_exit(exit_info)
+            except Exception as e:
+                logger.error(f"Process exit callback failed for {channel_id}: {e}")
+
+    def expect_exit(self, process):
+        """标记即将主动停止的进程，退出时不会被当作异常"""
+        with self._lock:
+            self._requested.add(id(process))
+
+    def pop_exits(self) -> List[ProcessExit]:
+        """取出自上次调用以来退出的进程"""
+        with self._lock:
+            exits, self._exits = self._exits, []
+        return exits
+
+    def record_stall(self, channel_id: str, process, stalled_for: float) -> ProcessExit:
+        """录制停滞时生成一次退出记录，与异常退出共用重启计数；录制文件恢复增长后计数清零（见 stall_recovered）"""
+        with self._lock:
+            self._stalled.add(channel_id)
+        return ProcessExit(channel_id, process, 0, stalled_for, EXIT_STALLED)
+
+    def stall_recovered(self, channel_id: str):
+        """停滞后重启的录制已写入数据"""
+        with self._lock:
+            if channel_id in self._stalled:
+                self._stalled.discard(channel_id)
+                self._attempts.pop(channel_id, None)
+
+    def restart_delay(self, exit_info: ProcessExit) -> Optional[float]:
+        """异常退出后的重启等待时间；连续失败超过 max_attempts 次时返回None（不再快速重启）"""
+        with self._lock:
+            # 停滞的进程运行时长不代表正常录制，不因此清零计数
+            stable = exit_info.reason != EXIT_STALLED and exit_info.runtime >= self.stable_seconds
+            attempts = 0 if stable else self._attempts.get(exit_info.channel_id, 0)
+            if exit_info.reason != EXIT_STALLED:
+                self._stalled.discard(exit_info.channel_id)
+            if attempts >= self.max_attempts:
+                return None
+            self._attempts[exit_info.channel_id] = attempts + 1
+        # 正常运行了一段时间后才退出的进程立即重启，之后的连续失败按指数退避
+        if attempts == 0 and exit_info.reason != EXIT_STARTUP_FAILED:
+            return 0.0
+        return min(self.max_delay, self.base_delay * 2 ** attempts)
+
+    def reset(self, channel_id: str):
+        """录制正常结束（下播）时清除重启计数"""
+        with self._lock:
+            self._attempts.pop(channel_id, None)
+            self._stalled.discard(channel_id)
+
+
+def process_identity(pid: int) -> Optional[float]:
+    """进程的启动时间，与 PID 一起唯一标识一个进程（防止 PID 复用）；进程不存在、已成为僵尸进程或无法获取时返回None"""
+    if psutil is not None:
+        try:
+            process = psutil.Process(pid)
+            return None if process.status() == psutil.STATUS_ZOMBIE else process.create_time()
+        except psutil.Error:
+            return None
+    try:
+        with open(f'/proc/{pid}/stat', 'rb') as f:
+            # 进程名可能包含空格，右括号之后依次为状态、……、第20个字段为启动时间
+            fields = f.read().rsplit(b')', 1)[1].split()
+        return None if fields[0] == b'Z' else float(fields[19])
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class AdoptedProcess:
+    """录制端重启后接管的、上次运行启动的录制进程（不是本进程的子进程），接口与 subprocess.Popen 一致
+    退出码无法获取，进程结束后 returncode 记为0"""
+    stdout = None
+    stderr = None
+
+    def __init__(self, pids: List[Tuple[int, float]], args: List[str] = None):
+        self.processes = pids  # [(pid, 启动时间)]，第一个为 streamlink
+        self.pid = pids[0][0] if pids else None
+        self.args = args or ['adopted', str(self.pid)]
+        self.returncode: Optional[int] = None
+
+    @property
+    def pids(self) -> List[int]:
+        return [pid for pid, _ in self.processes]
+
+    def _alive(self) -> List[int]:
+        return [pid for pid, identity in self.processes if identity is not None and process_identity(pid) == identity]
+
+    def poll(self) -> Optional[int]:
+        if self.returncode is None and not self._alive():
+            self.returncode = 0
+        return self.returncode
+
+    def wait(self, timeout: float = None) -> int:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.poll() is None:
+            if deadline is not None and time.monotonic() >= deadline:
+                raise subprocess.TimeoutExpired(self.args, timeout)
+            time.sleep(0.5)
+        return self.returncode
+
+    def _signal(self, pids: List[int], force: bool):
+        for pid in pids:
+            if psutil is not None:
+                try:
+                    process = psutil.Process(pid)
+                    process.kill() if force else process.terminate()
+                except psutil.Error:
+                    pass
+            else:
+                try:
+                    os.kill(pid, signal.SIGKILL if force else signal.SIGTERM)
+                except OSError:
+                    pass
+
+    def terminate(self):
+        """只结束 streamlink，实时封装的 ffmpeg 读到输入结束后自行退出"""
+        self._signal([pid for pid in self._alive() if pid == self.pid], force=False)
+
+    def kill(self):
+        self._signal(self._alive(), force=True)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+录制质量分配
+所有录制共享下行带宽与磁盘写入带宽（录制写入磁盘的数据量与下载量基本相同，两者取较小值作为预算）。
+每路新录制按清晰度阶梯的估计码率在剩余预算内选择不超过请求质量的最高清晰度；已测得的实际写入速率
+高于估计值时按实际值计算占用。预算不足且允许降级时，依次把优先级更低的录制降一档，
+保证高优先级的录制不会因为带宽饱和而丢失分段
+"""
+
+import logging
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 各清晰度的估计码率（Mbps），从高到低
+DEFAULT_LADDER = {
+    '1080p': 8.0,
+    '720p': 5.0,
+    '480p': 2.0,
+    '360p': 1.0,
+    '144p': 0.3
+}
+
+
+class _Allocation:
+    def __init__(self, requested: str, ceiling: int, rung: int, priority: int):
+        self.requested = requested  # 请求的质量（配置或订阅决定的上限）
+        self.ceiling = ceiling
+        self.rung = rung
+        self.priority = priority
+
+
+class QualityAllocator:
+    def __init__(self, bandwidth_mbps: float = 0, disk_write_mbps: float = 0, ladder: Dict[str, float] = None,
+                 priorities: Dict[str, int] = None, default_priority: int = 0, step_down: bool = False,
+                 priority_source: Callable[[str], Optional[int]] = None):
+        self.bandwidth_mbps = bandwidth_mbps
+        self.disk_write_mbps = disk_write_mbps
+        ladder = ladder or DEFAULT_LADDER
+        self.rungs: List[Tuple[str, float]] = sorted(ladder.items(), key=lambda item: item[1], reverse=True)
+        self.priorities = priorities or {}
+        self.default_priority = default_priority
+        self.priority_source = priority_source  # 配置中没有指定时使用的优先级（频道列表中的优先级）
+        self.step_down = step_down
+        self.step_downs = 0
+        self._lock = threading.Lock()
+        self._allocations: Dict[str, _Allocation] = {}
+        self._measured: Dict[str, float] = {}
+
+    @classmethod
+    def from_config(cls, recording_config: Dict, **kwargs) -> 'QualityAllocator':
+        """recording.quality_allocation；两项预算都为0时不限制，始终使用请求的质量"""
+        allocation = recording_config.get('quality_allocation') or {}
+        priorities = {channel_id: options.get('priority', 0)
+                      for channel_id, options in (allocation.get('channels') or {}).items()}
+        return cls(bandwidth_mbps=allocation.get('bandwidth_mbps', 0),
+                   disk_write_mbps=allocation.get('disk_write_mbps', 0),
+                   ladder=allocation.get('ladder'),
+                   priorities=priorities,
+                   default_priority=allocation.get('default_priority', 0),
+                   step_down=allocation.get('step_down', False), **kwargs)
+
+    @property
+    def budget(self) -> Optional[float]:
+        """可用的总码率（Mbps），None 表示不限制"""
+        budgets = [value for value in (self.bandwidth_mbps, self.disk_write_mbps) if value and value > 0]
+        return min(budgets) if budgets else None
+
+    def priority(self, channel_id: str) -> int:
+        if channel_id in self.priorities:
+            return self.priorities[channel_id]
+        value = self.priority_source(channel_id) if self.priority_source else None
+        return self.default_priority if value is None else value
+
+    def allocate(self, channel_id: str, requested: str,
+                 measured: Dict[str, float] = None) -> Tuple[str, List[Tuple[str, str]]]:
+        """
+        为频道的新录制（或重启、切换分段）选择质量；measured 为各录制实际的写入速率（字节/秒）。
+        返回 (质量, [(需要降级的频道, 新质量)])，降级已计入分配，由调用方切换这些录制
+        """
+        budget = self.budget
+        ceiling = self._rung_index(requested)
+        with self._lock:
+            if measured is not None:
+                self._measured = {key: value * 8 / 1e6 for key, value in measured.items()}
+            self._allocations.pop(channel_id, None)
+            if budget is None or ceiling is None:
+                return requested, []
+
+            priority = self.priority(channel_id)
+            free = budget - sum(self._usage(other) for other in self._channels() if other != channel_id)
+            step_downs = {}
+            if self.rungs[ceiling][1] > free and self.step_down:
+                # 从优先级最低、占用最多的录制开始逐档降级，直到请求的质量放得下
+                while self.rungs[ceiling][1] > free:
+                    candidates = [other for other, allocation in self._allocations.items()
+                                  if allocation.priority < priority and allocation.rung < len(self.rungs) - 1]
+                    if not candidates:
+                        break
+                    victim = min(candidates, key=lambda other: (self._allocations[other].priority,
+                                                                -self._usage(other)))
+                    before = self._usage(victim)
+                    self._allocations[victim].rung += 1
+                    self._measured.pop(victim, None)  # 降档后旧的实测速率不再适用
+                    free += before - self._usage(victim)
+                    step_downs[victim] = self._allocations[victim]
+
+            rung = next((index for index in range(ceiling, len(self.rungs)) if self.rungs[index][1] <= free),
+                        len(self.rungs) - 1)
+            if self.rungs[rung][1] > free:
+                logger.warning(f"Bandwidth budget exhausted ({budget - free:.1f}/{budget:.1f} Mbps in use), "
+                               f"recording {channel_id} at the lowest quality {self.rungs[rung][0]}")
+            self._allocations[channel_id] = _Allocation(requested, ceiling, rung, priority)
+            self.step_downs += len(step_downs)
+            for victim, allocation in step_downs.items():
+                logger.info(f"Stepping down {victim} (priority {allocation.priority}) to "
+                            f"{self.rungs[allocation.rung][0]} for {channel_id} (priority {priority})")
+            return (self._quality(requested, ceiling, rung),
+                    [(victim, self._quality(allocation.requested, allocation.ceiling, allocation.rung))
+                     for victim, allocation in step_downs.items()])
+
+    def assign(self, channel_id: str, requested: str, quality: str):
+        """登记已在录制的质量（接管上次运行留下的录制时），不做分配"""
+        ceiling = self._rung_index(requested)
+        rung = self._rung_index(quality.split(',')[0])
+        if ceiling is None or rung is None:
+            return
+        with self._lock:
+            self._allocations[channel_id] = _Allocation(requested, ceiling, max(rung, ceiling),
+                                                        self.priority(channel_id))
+
+    def release(self, channel_id: str):
+        with self._lock:
+            self._allocations.pop(channel_id, None)
+            self._measured.pop(channel_id, None)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            channels = {
+                channel_id: {
+                    'priority': allocation.priority,
+                    'requested': allocation.requested,
+                    'quality': self.rungs[allocation.rung][0],
+                    'stepped_down': allocation.rung > allocation.ceiling,
+                    'estimate_mbps': self.rungs[allocation.rung][1],
+                    'measured_mbps': round(self._measured.get(channel_id, 0.0), 2)
+                }
+                for channel_id, allocation in self._allocations.items()
+            }
+            used = sum(self._usage(channel_id) for channel_id in self._channels())
+        return {'budget_mbps': self.budget, 'used_mbps': round(used, 2), 'step_downs': self.step_downs,
+                'channels': channels}
+
+    def _rung_index(self, quality: str) -> Optional[int]:
+        """质量在阶梯中的位置；best/worst 对应最高/最低档，不在阶梯中的质量不参与分配"""
+        if quality == 'best':
+            return 0
+        if quality == 'worst':
+            return len(self.rungs) - 1
+        return next((index for index, (name, _) in enumerate(self.rungs) if name == quality), None)
+
+    def _quality(self, requested: str, ceiling: int, rung: int) -> str:
+        """未降档时原样使用请求的质量；降档后使用 streamlink 的备选列表，直播没有该清晰度时依次尝试更低的"""
+        if rung == ceiling:
+            return requested
+        return ','.join([name for name, _ in self.rungs[rung:]] + ['worst'])
+
+    def _channels(self):
+        return set(self._allocations) | set(self._measured)
+
+    def _usage(self, channel_id: str) -> float:
+        """录制占用的码率：分配的清晰度的估计值，实测更高时取实测值"""
+        allocation = self._allocations.get(channel_id)
+        estimate = self.rungs[allocation.rung][1] if allocation else 0.0
+        return max(estimate, self._measured.get(channel_id, 0.0))
@@ -6,6 +6,7 @@ Chzzk录制端主程序
 """
 
 import datetime
+import importlib.metadata
 import json
 import logging
 import os
@@ -21,7 +22,7 @@ import zmq
 import locale
 import urllib3
 import warnings
-from typing import Dict, TypedDict, Union, List
+from typing import Dict, TypedDict, Union, List, Set, Tuple
 from packaging import version
 
 # 禁用SSL警告
@@ -29,13 +30,37 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 warnings.filterwarnings('ignore', message='Unverified HTTPS request')
 
 # 导入本地模块
+from api.account_pool import AccountPool
 from api.chzzk import ChzzkAPI
+from api.circuit_breaker import breaker_snapshots
+from api.http_transport import configure_transport
 from utils.telegram_notifier import TelegramNotifier
 from utils.ffmpeg_converter import FFmpegConverter
 from utils.chat_recorder import ChatRecorder
 from utils.cookie_manager import CookieManager
+from utils.channel_cache import ChannelMetadataCache
+from utils.runtime_state import publish_state
+from utils.ts_merge import merge_fragments, group_fragments
+from utils.live_remux import (RemuxPipeline, open_remuxer, remux_output_path, recording_stem, finalize_remux,
+                              recover_partial_files, PART_SUFFIX)
+from core.channel_poller import ChannelPoller
+from core.poll_scheduler import PollScheduler
+from core.channel_registry import ChannelRegistry
+from core.channel_failures import ChannelFailureTracker
+from core.latency_metrics import GoLiveLatencyTracker
+from core.process_supervisor import ProcessSupervisor, AdoptedProcess, process_identity, EXIT_STOPPED
+from core.recording_journal import RecordingJournal
+from core.resume_index import ResumeIndex
+from core.stall_watcher import StallWatcher
+from core.quality_allocator import QualityAllocator
+from core.admission_queue import AdmissionQueue
+from core.log_pump import StreamlinkLogPump, STREAMLINK_ARGS
+from core.streamlink_engine import StreamlinkSessionEngine, ENGINE_CLI, ENGINE_SESSION
+from core.hls_fetcher import NativeHLSEngine, ENGINE_NATIVE
 
 STREAMLINK_MIN_VERSION = "6.7.4"
+SPLIT_CHECK_INTERVAL = 10  # 分段录制时检查文件时长/大小的间隔（秒）
+SPLIT_HANDOVER_TIMEOUT = 60  # 新分段迟迟没有数据时仍结束旧分段的等待上限（秒）
 
 # 设置locale
 try:
@@ -59,8 +84,16 @@ def truncate_long_name(s: str) -> str:
     """截断过长的名称"""
     return (s[:75] + '..') if len(s) > 77 else s
 
-def check_streamlink() -> bool:
-    """检查streamlink是否安装且版本符合要求"""
+def check_streamlink(engine: str = ENGINE_CLI) -> bool:
+    """检查streamlink是否安装且版本符合要求（进程内引擎直接读取包版本，不启动子进程）"""
+    if engine == ENGINE_SESSION:
+        try:
+            s_ver = version.parse(importlib.metadata.version('streamlink'))
+            logger.info(f"Streamlink version: {s_ver}")
+            return s_ver >= version.parse(STREAMLINK_MIN_VERSION)
+        except importlib.metadata.PackageNotFoundError:
+            logger.error("Streamlink package not found. Install streamlink first then launch again.")
+            sys.exit(1)
     try:
         ret = subprocess.check_output(["streamlink", "--version"], universal_newlines=True)
         re_ver = re.search(r"streamlink (\d+)\.(\d+)\.(\d+)", ret, flags=re.IGNORECASE)
@@ -80,25 +113,69 @@ class RecorderProcess(TypedDict):
     path: Union[None, str]
     time: Union[None, datetime.datetime]
     record_id: Union[None, int]  # 录制记录ID
+    fragments: List[str]  # 录制进程重启或分段前写入的文件
+    processed_parts: List[str]  # 已交给后处理的分段文件
+    part_started: float  # 当前文件开始写入的时间
+    rotation: Dict  # 正在交接的上一个分段（recorder、path、deadline）
+    requested_quality: str  # 请求的录制质量（上限）
+    quality: str  # 实际分配的录制质量
 
 class MultiChzzkRecorder:
     def __init__(self, config_path: str = "config_local.json") -> None:
         logger.info("Initializing Multi Chzzk Recorder...")
 
-        if not check_streamlink():
-            logger.error("Streamlink version check failed")
-            sys.exit(1)
-
         # 加载配置
         self.config = self.load_config(config_path)
         
+        # 录制引擎：cli（每路录制一个 streamlink 进程）、session（工作进程内通过 streamlink API 录制）
+        # 或 native（直接下载 HLS 分段）
+        self.engine = self.config['recording'].get('engine', ENGINE_CLI)
+        # 实时封装：录制时直接写成分片 MP4（.mp4.part），结束后无需再做 TS→MP4 转换
+        self.live_remux = self.config['recording'].get('live_remux', False)
+        # 分段录制：当前文件达到时长（秒）或大小（MB）上限时切换到下一个分段，0为不分段
+        self.split_duration = self.config['recording'].get('split_duration', 0)
+        self.split_size = self.config['recording'].get('split_size_mb', 0) * 1024 * 1024
+        if self.engine == ENGINE_SESSION and not StreamlinkSessionEngine.available():
+            logger.warning("Streamlink Python package not importable, falling back to the CLI engine")
+            self.engine = ENGINE_CLI
+
+        if not check_streamlink(self.engine):
+            logger.error("Streamlink version check failed")
+            sys.exit(1)
+        
+        # 共享HTTP连接池
+        configure_transport(self.config.get('http'))
+        
+        # 多账号 Cookie 池（未配置 accounts 时使用 nid_aut/nid_ses 单账号）
+        self.account_pool = AccountPool.from_config(self.config['recording'])
+        logger.info(f"Using {len(self.account_pool.accounts)} Chzzk account(s) "
+                    f"({self.account_pool.strategy} selection)")
+        
         # 初始化 Cookie 管理器
-        self.cookie_manager = CookieManager(config_path)
+        self.cookie_manager = CookieManager(config_path, account_pool=self.account_pool)
+        
+        # 失效频道追踪（404、内容为空、连续出错的频道按指数退避，与Web面板共用）
+        project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+        self.channel_failures = ChannelFailureTracker.from_config(
+            self.config,
+            state_path=os.path.join(project_root, 'src', 'config', 'channel_failures.json')
+        )
         
         # 初始化组件
-        self.chzzk_api = ChzzkAPI(
-            nid_aut=self.config['recording']['nid_aut'],
-            nid_ses=self.config['recording']['nid_ses']
+        self.chzzk_api = ChzzkAPI(account_pool=self.account_pool, failure_tracker=self.channel_failures)
+        
+        # 频道注册表：监视 record_list.txt，变化时唤醒主循环
+        self._wakeup = threading.Event()
+        self._channels_changed = threading.Event()
+        self.channel_registry = ChannelRegistry(os.path.join(project_root, 'src', 'config', 'record_list.txt'))
+        self.channel_registry.add_listener(lambda added, removed: self._on_channels_changed())
+        
+        # 频道元数据缓存（名称、头像）
+        self.channel_cache = ChannelMetadataCache(
+            self.chzzk_api.get_channel_info,
+            cache_path=os.path.join(project_root, 'src', 'config', 'channel_cache.json'),
+            ttl=self.config['recording'].get('metadata_cache_ttl', 86400),
+            max_entries=self.config['recording'].get('metadata_cache_size', 1000)
         )
         
         # 设置为本地模式
@@ -121,6 +198,72 @@ class MultiChzzkRecorder:
         self.record_dict: Dict[str, Dict] = {}
         self.chat_recorders: Dict[str, ChatRecorder] = {}  # 弹幕录制器
         
+        # 并发状态轮询
+        self.channel_poller = ChannelPoller(
+            self.check_channel_status,
+            max_workers=self.config['recording'].get('poll_concurrency', 16)
+        )
+        
+        # 自适应轮询调度（开播历史保存在配置目录）
+        self.poll_scheduler = PollScheduler.from_config(
+            self.config,
+            history_path=os.path.join(project_root, 'src', 'config', 'golive_history.json')
+        )
+        
+        # 开播检测/进程启动/首字节延迟统计
+        self.latency_tracker = GoLiveLatencyTracker()
+        
+        # 录制进程监督：进程退出时立即唤醒主循环，仍在直播的频道按退避重启
+        self.process_supervisor = ProcessSupervisor.from_config(self.config, on_exit=lambda exit_info: self._wakeup.set())
+        self._pending_restarts: Dict[str, float] = {}
+        
+        # 读取所有录制进程的输出（单线程），统计写入量与码率
+        self.log_pump = StreamlinkLogPump(on_snapshot=lambda snapshot: publish_state('recordings', snapshot))
+        self.recording_engine = None  # 为None时每路录制启动一个 streamlink 进程
+        if self.engine == ENGINE_SESSION:
+            self.recording_engine = StreamlinkSessionEngine.from_config(
+                self.config['recording'],
+                on_log=self.log_pump.feed_line,
+                on_progress=self.log_pump.report_progress
+            )
+            logger.info(f"Using in-process streamlink engine "
+                        f"({self.recording_engine.max_workers} workers x "
+                        f"{self.recording_engine.streams_per_worker} streams)")
+        elif self.engine == ENGINE_NATIVE:
+            self.recording_engine = NativeHLSEngine.from_config(
+                self.config['recording'],
+                resolver=self.chzzk_api.get_hls_playlist_url,
+                on_log=self.log_pump.feed_line,
+                on_progress=self.log_pump.report_progress
+            )
+            logger.info(f"Using native HLS engine ({self.recording_engine.options['concurrency']} connections "
+                        f"per recording, buffer {self.recording_engine.options['buffer']} segments)")
+        
+        # 已交给后处理（合并、转换、收尾实时封装）但尚未完成的文件，遗留文件的收尾不能碰这些文件
+        self._processing_paths: Set[str] = set()
+        
+        # 录制会话日志（SQLite），录制端重启后接管仍在运行的录制进程
+        self.journal = RecordingJournal.from_config(self.config['recording'])
+        # 按频道ID索引的续录候选文件（启动时扫描一次录制目录）
+        self.resume_index = ResumeIndex()
+        
+        # 录制停滞检测：文件长时间不增长时在主循环中重启录制
+        self._stalled: Dict[str, Tuple[str, float]] = {}
+        self.stall_watcher = StallWatcher.from_config(
+            self.config['recording'],
+            on_stall=self._on_stall,
+            on_growth=self.process_supervisor.stall_recovered,
+            on_snapshot=lambda snapshot: publish_state('stalls', snapshot)
+        )
+        
+        # 按带宽/磁盘写入预算与频道优先级分配录制质量，待降级的录制在主循环中切换到新分段
+        self.quality_allocator = QualityAllocator.from_config(self.config['recording'],
+                                                              priority_source=self.channel_registry.priority)
+        self._step_downs: Dict[str, str] = {}
+        
+        # 准入控制：同时录制数达到上限时开播的频道按优先级排队
+        self.admission = AdmissionQueue.from_config(self.config['recording'], priority=self.channel_registry.priority)
+        
         # ZMQ通信
         self.zmq_context = zmq.Context()
         self.zmq_socket = self.zmq_context.socket(zmq.PUB)
@@ -165,42 +308,27 @@ class MultiChzzkRecorder:
         return []
     
     def load_channels_from_file(self) -> List[Dict]:
-        """从本地record_list.txt文件加载频道列表"""
+        """从频道注册表（record_list.txt 的内存副本）加载频道列表"""
         try:
-            # 获取项目根目录
-            project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-            record_list_path = os.path.join(project_root, 'src', 'config', 'record_list.txt')
-            if not os.path.exists(record_list_path):
-                logger.warning("record_list.txt not found, using empty channel list")
-                return []
-            
             channels = []
-            with open(record_list_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    channel_id = line.strip()
-                    if channel_id:
-                        # 尝试从API获取频道信息
-                        try:
-                            channel_info = self.chzzk_api.get_channel_info(channel_id)
-                            if channel_info and 'channelName' in channel_info:
-                                channel_name = channel_info['channelName']
-                                channel_image = channel_info.get('channelImageUrl', '')
-                            else:
-                                # 如果API失败，使用频道ID前8位作为临时名称
-                                channel_name = f"Channel_{channel_id[:8]}"
-                                channel_image = ''
-                                logger.warning(f"Failed to get channel info for {channel_id}, using temporary name")
-                        except Exception as e:
-                            # API调用失败，使用临时名称
-                            channel_name = f"Channel_{channel_id[:8]}"
-                            channel_image = ''
-                            logger.warning(f"Failed to get channel info for {channel_id}: {e}")
-                        
-                        channels.append({
-                            'channel_id': channel_id,
-                            'channel_name': channel_name,
-                            'channel_image': channel_image
-                        })
+            for channel_id in self.channel_registry.channel_ids:
+                # 从元数据缓存获取频道信息（未命中时才请求API，疑似失效的频道在退避期内只读缓存）
+                channel_info = self.channel_cache.get(channel_id,
+                                                      fetch=not self.channel_failures.should_skip(channel_id))
+                if channel_info:
+                    channel_name = channel_info['channelName']
+                    channel_image = channel_info.get('channelImageUrl', '')
+                else:
+                    # 如果API失败，使用频道ID前8位作为临时名称
+                    channel_name = f"Channel_{channel_id[:8]}"
+                    channel_image = ''
+                    logger.warning(f"Failed to get channel info for {channel_id}, using temporary name")
+                
+                channels.append({
+                    'channel_id': channel_id,
+                    'channel_name': channel_name,
+                    'channel_image': channel_image
+                })
             
             return channels
         except Exception as e:
@@ -217,14 +345,17 @@ class MultiChzzkRecorder:
                 return {'isLive': False, 'liveTitle': '', 'viewerCount': 0}
             
             if is_live and stream_data:
+                # live-detail 自带频道信息，顺便刷新元数据缓存
+                self.channel_cache.update(channel_id, stream_data['channelName'], stream_data['channelImageUrl'])
                 return {
                     'isLive': True,
-                    'liveTitle': stream_data.get('liveTitle', ''),
-                    'viewerCount': stream_data.get('concurrentUserCount', 0),
-                    'channelName': stream_data.get('channelName', ''),
-                    'channelImageUrl': stream_data.get('channelImageUrl', ''),
-                    'liveImageUrl': stream_data.get('liveImageUrl', ''),
-                    'openDate': stream_data.get('openDate', '')
+                    'liveTitle': stream_data['liveTitle'],
+                    'viewerCount': stream_data['concurrentUserCount'],
+                    'channelName': stream_data['channelName'],
+                    'channelImageUrl': stream_data['channelImageUrl'],
+                    'liveImageUrl': stream_data['liveImageUrl'],
+                    'openDate': stream_data['openDate'],
+                    'observedAt': time.time()
                 }
             else:
                 return {'isLive': False, 'liveTitle': '', 'viewerCount': 0}
@@ -250,11 +381,12 @@ class MultiChzzkRecorder:
             logger.warning(f"Failed to get recording quality for user {user_id}: {e}")
             return self.config['recording']['quality']
 
-    def start_recording(self, channel_id: str, channel_data: Dict, user_id: int = None) -> bool:
+    def start_recording(self, channel_id: str, channel_data: Dict, user_id: int = None, status: Dict = None) -> bool:
         """开始录制"""
         try:
-            # 检查频道状态
-            status = self.check_channel_status(channel_id)
+            # 检查频道状态（轮询已获取时直接复用）
+            if status is None:
+                status = self.check_channel_status(channel_id)
             if not status['isLive']:
                 return False
             
@@ -264,8 +396,9 @@ class MultiChzzkRecorder:
                 logger.info(f"Found incomplete recording file for {channel_id}: {resume_file}")
                 return self.resume_recording(channel_id, resume_file, channel_data)
             
-            # 根据订阅状态确定录制质量
-            recording_quality = self.get_recording_quality(user_id)
+            # 根据订阅状态确定录制质量上限，再按带宽预算与频道优先级分配
+            requested_quality = self.get_recording_quality(user_id)
+            recording_quality = self.allocate_quality(channel_id, requested_quality)
             logger.info(f"Using recording quality: {recording_quality} for channel {channel_id}")
             
             # 创建录制记录
@@ -312,44 +445,30 @@ class MultiChzzkRecorder:
                 escaped_title=escaped_title
             )
             
-            rec_file_path = os.path.join(
+            rec_file_path = self.recording_output_path(os.path.join(
                 self.config['recording']['recording_save_root_dir'],
                 username,
                 filename
-            )
+            ))
             
             # 创建目录
             os.makedirs(os.path.dirname(rec_file_path), exist_ok=True)
             
-            # 构建streamlink命令
-            stream_url = f"https://chzzk.naver.com/live/{channel_id}"
-            command = [
-                "streamlink",
-                stream_url,
-                recording_quality,  # 使用动态质量
-                "-o", rec_file_path,
-                "--retry-streams", "5",
-                "--retry-max", "10"
-            ]
-            
             # 开始录制
             logger.info(f"Starting recording: {username} - {status['liveTitle']}")
-            logger.info(f"Command: {' '.join(command)}")
-            
-            recorder = subprocess.Popen(
-                command, 
-                stdout=subprocess.PIPE, 
-                stderr=subprocess.PIPE, 
-                text=True, 
-                encoding='utf-8'
-            )
+            recorder = self.spawn_recorder(channel_id, rec_file_path, recording_quality)
             
             # 保存录制信息
             self.recorder_processes[channel_id] = {
                 'recorder': recorder,
                 'path': rec_file_path,
                 'time': now,
-                'record_id': record_id
+                'record_id': record_id,
+                'fragments': [],
+                'processed_parts': [],
+                'part_started': time.time(),
+                'requested_quality': requested_quality,
+                'quality': recording_quality
             }
             
             self.record_dict[channel_id] = {
@@ -359,21 +478,11 @@ class MultiChzzkRecorder:
                 'viewerCount': status['viewerCount']
             }
             
+            self.journal_save(channel_id)
+            self.resume_index.add(channel_id, rec_file_path)
+            
             # 启动弹幕录制（如果启用）
-            if self.config['recording'].get('record_chat', False):
-                try:
-                    chat_output_dir = os.path.join(
-                        self.config['recording']['recording_save_root_dir'],
-                        username
-                    )
-                    chat_recorder = ChatRecorder(channel_id, chat_output_dir)
-                    if chat_recorder.start():
-                        self.chat_recorders[channel_id] = chat_recorder
-                        logger.info(f"Chat recording started for channel {channel_id}")
-                    else:
-                        logger.warning(f"Failed to start chat recording for channel {channel_id}")
-                except Exception as e:
-                    logger.warning(f"Error starting chat recording: {e}")
+            self.start_chat_recording(channel_id, os.path.dirname(rec_file_path))
             
             # 发送通知
             self.send_recording_start_notification(channel_id, status)
@@ -385,8 +494,83 @@ class MultiChzzkRecorder:
             
         except Exception as e:
             logger.error(f"Failed to start recording for {channel_id}: {e}")
+            if channel_id not in self.recorder_processes:
+                self.quality_allocator.release(channel_id)
             return False
 
+    def start_chat_recording(self, channel_id: str, chat_output_dir: str):
+        """启动弹幕录制（如果启用）"""
+        if not self.config['recording'].get('record_chat', False):
+            return
+        try:
+            chat_recorder = ChatRecorder(channel_id, chat_output_dir)
+            if chat_recorder.start():
+                self.chat_recorders[channel_id] = chat_recorder
+                logger.info(f"Chat recording started for channel {channel_id}")
+            else:
+                logger.warning(f"Failed to start chat recording for channel {channel_id}")
+        except Exception as e:
+            logger.warning(f"Error starting chat recording: {e}")
+
+    def recording_output_path(self, rec_file_path: str) -> str:
+        """录制文件的实际写入路径（实时封装时为 .mp4.part）"""
+        return remux_output_path(rec_file_path) if self.live_remux else rec_file_path
+
+    def spawn_recorder(self, channel_id: str, rec_file_path: str, quality: str,
+                       new_part: bool = False) -> subprocess.Popen:
+        """启动streamlink录制（CLI进程或进程内引擎的录制句柄）并交给进程监督"""
+        stream_url = f"https://chzzk.naver.com/live/{channel_id}"
+        remux = {'ffmpeg': 'ffmpeg'} if self.live_remux else None
+        if self.recording_engine is not None:
+            recorder = self.recording_engine.start(channel_id, stream_url, quality, rec_file_path, remux)
+        else:
+            command = [
+                "streamlink",
+                stream_url,
+                quality,
+                *(["-O"] if remux else ["-o", rec_file_path]),
+                "--retry-streams", "5",
+                "--retry-max", "10",
+                *STREAMLINK_ARGS
+            ]
+            logger.info(f"Command: {' '.join(command)}")
+            
+            if self.journal is not None:
+                # 输出写入日志文件并使用独立的进程组，录制端退出或重启时录制进程继续运行，重启后接管
+                log_path = self.journal.log_path(channel_id, time.time())
+                with open(log_path, 'ab') as log_file:
+                    recorder = subprocess.Popen(
+                        command,
+                        stdout=subprocess.PIPE if remux else log_file,
+                        stderr=log_file,
+                        start_new_session=os.name != 'nt'
+                    )
+                    if remux:
+                        remuxer = open_remuxer(rec_file_path, remux['ffmpeg'], stdin=recorder.stdout,
+                                               stderr=log_file, start_new_session=os.name != 'nt')
+                        recorder.stdout.close()
+                        recorder = RemuxPipeline(recorder, remuxer)
+                recorder.log_path = log_path
+            else:
+                # 输出由 log_pump 以字节读取
+                recorder = subprocess.Popen(
+                    command, 
+                    stdout=subprocess.PIPE, 
+                    stderr=subprocess.PIPE
+                )
+                if remux:
+                    # streamlink 的标准输出直接接到 ffmpeg，本进程不保留该管道
+                    remuxer = open_remuxer(rec_file_path, remux['ffmpeg'], stdin=recorder.stdout)
+                    recorder.stdout.close()
+                    recorder = RemuxPipeline(recorder, remuxer)
+        started_at = time.time()
+        self.stall_watcher.track(channel_id, rec_file_path)
+        self.log_pump.attach(channel_id, recorder, rec_file_path, new_part=new_part,
+                             log_path=getattr(recorder, 'log_path', None))
+        self.latency_tracker.process_started(channel_id, rec_file_path, started_at)
+        self.process_supervisor.watch(channel_id, recorder, started_at)
+        return recorder
+
     def start_delayed_cover_capture(self, channel_id: str, recording_file_path: str, channel_name: str = None):
         """启动延迟封面截取任务"""
         def delayed_capture():
@@ -433,9 +617,15 @@ class MultiChzzkRecorder:
             recorder = process_info['recorder']
             record_id = process_info['record_id']
             file_path = process_info['path']
+            fragments = process_info.get('fragments', [])
+            self._pending_restarts.pop(channel_id, None)
+            self.process_supervisor.reset(channel_id)
+            if process_info.get('rotation'):
+                self.finish_rotation(channel_id)
             
             if recorder and recorder.poll() is None:
                 # 终止录制进程
+                self.process_supervisor.expect_exit(recorder)
                 recorder.terminate()
                 try:
                     recorder.wait(timeout=10)
@@ -443,10 +633,11 @@ class MultiChzzkRecorder:
                     recorder.kill()
                     recorder.wait()
             
-            # 检查文件是否存在并获取大小
+            # 检查文件是否存在并获取大小（包括进程重启前写入的文件）
             file_size = 0
-            if file_path and os.path.exists(file_path):
-                file_size = os.path.getsize(file_path)
+            for path in fragments + [file_path]:
+                if path and os.path.exists(path):
+                    file_size += os.path.getsize(path)
             
             # 尝试更新录制记录（API可用时）
             try:
@@ -483,16 +674,28 @@ class MultiChzzkRecorder:
             # 发送通知
             self.send_recording_end_notification(channel_id, file_path, file_size)
             
-            # 异步处理文件转换
-            if self.config['processing']['auto_convert_to_mp4']:
-                threading.Thread(
-                    target=self.process_recording_file,
-                    args=(channel_id, file_path, record_id),
-                    daemon=True
-                ).start()
+            # 异步合并续录片段并处理文件转换（实时封装的文件在此收尾）
+            processed_parts = process_info.get('processed_parts', [])
+            for group in group_fragments(fragments + [file_path]):
+                group = [path for path in group if path not in processed_parts]
+                if group:
+                    self._processing_paths.update(group)
+                    threading.Thread(
+                        target=self.process_recording_group,
+                        args=(channel_id, group, record_id),
+                        daemon=True
+                    ).start()
             
             # 清理进程信息
             del self.recorder_processes[channel_id]
+            if self.journal is not None:
+                self.journal.remove(channel_id)
+            self.resume_index.remove(channel_id)
+            self.stall_watcher.untrack(channel_id)
+            self._stalled.pop(channel_id, None)
+            self.quality_allocator.release(channel_id)
+            self._step_downs.pop(channel_id, None)
+            self.log_pump.remove(channel_id)
             if channel_id in self.record_dict:
                 del self.record_dict[channel_id]
             
@@ -502,6 +705,33 @@ class MultiChzzkRecorder:
             logger.error(f"Failed to stop recording for {channel_id}: {e}")
             return False
 
+    def process_recording_group(self, channel_id: str, paths: List[str], record_id: int):
+        """处理同一文件及其续录片段：先无损合并为一个文件（去掉重叠部分），再逐个转换"""
+        original_paths = list(paths)
+        try:
+            if len(paths) > 1 and self.config['processing'].get('merge_fragments', True):
+                if all(path.endswith('.ts') for path in paths):
+                    paths = merge_fragments(paths)
+                else:
+                    # 实时封装时每个片段由单独的 ffmpeg 写入，时间轴都从0开始、初始化信息也不同，无法按时间戳去重合并
+                    logger.info(f"Keeping {len(paths)} remuxed fragments of {channel_id} as separate files")
+            if self.config['processing']['auto_convert_to_mp4'] or self.live_remux:
+                for path in paths:
+                    self.process_recording_file(channel_id, path, record_id)
+        finally:
+            self._processing_paths.difference_update(original_paths)
+
+    def is_recording_path(self, path: str) -> bool:
+        """文件属于进行中的录制（当前文件、之前的片段、交接中的上一个分段）或正在后处理"""
+        if path in self._processing_paths:
+            return True
+        for process_info in list(self.recorder_processes.values()):
+            rotation = process_info.get('rotation') or {}
+            if path == process_info['path'] or path in process_info.get('fragments', ()) \
+                    or path == rotation.get('path'):
+                return True
+        return False
+
     def process_recording_file(self, channel_id: str, file_path: str, record_id: int):
         """处理录制文件（转换、生成缩略图等）"""
         try:
@@ -509,8 +739,20 @@ class MultiChzzkRecorder:
                 logger.warning(f"Recording file not found: {file_path}")
                 return
             
+            # 实时封装的分片 MP4：截掉不完整的分片并改名，无需转换
+            if file_path.endswith(PART_SUFFIX):
+                mp4_path = finalize_remux(file_path, self.config['processing'].get('live_remux_faststart', False))
+                if not mp4_path:
+                    return
+                file_path = mp4_path
+                try:
+                    self.api_client.update_recording_status(record_id, 'completed', mp4_path)
+                except Exception as e:
+                    logger.warning(f"Failed to sync remuxed file to API: {e}")
+                logger.info(f"Live remux finalized: {mp4_path}")
+            
             # 转换为MP4
-            if self.config['processing']['auto_convert_to_mp4']:
+            elif self.config['processing']['auto_convert_to_mp4']:
                 mp4_path = file_path.replace('.ts', '.mp4')
                 success = self.ffmpeg_converter.convert_ts_to_mp4(
                     ts_file_path=file_path,
@@ -579,24 +821,10 @@ class MultiChzzkRecorder:
     def check_for_resume_recording(self, channel_id: str) -> str:
         """检查是否有未完成的录制文件需要续录"""
         try:
-            recording_dir = os.path.join(self.config['recording']['recording_save_root_dir'])
-            if not os.path.exists(recording_dir):
-                return None
-            
-            # 查找该频道的未完成录制文件
-            for root, dirs, files in os.walk(recording_dir):
-                for file in files:
-                    if file.endswith('.ts') and channel_id in file:
-                        file_path = os.path.join(root, file)
-                        # 检查文件是否在最近24小时内被修改（表示可能是未完成的录制）
-                        mtime = os.path.getmtime(file_path)
-                        if time.time() - mtime < 86400:  # 24小时内
-                            # 检查文件大小是否合理（至少几MB）
-                            file_size = os.path.getsize(file_path)
-                            if file_size > 1024 * 1024:  # 至少1MB
-                                logger.info(f"Found potential resume file: {file_path} (size: {file_size} bytes)")
-                                return file_path
-            return None
+            file_path = self.resume_index.lookup(channel_id)
+            if file_path:
+                logger.info(f"Found potential resume file: {file_path} (size: {os.path.getsize(file_path)} bytes)")
+            return file_path
         except Exception as e:
             logger.error(f"Failed to check for resume recording: {e}")
             return None
@@ -613,35 +841,31 @@ class MultiChzzkRecorder:
                 return False
             
             # 构建续录文件名（在原文件名后添加续录标识）
-            base_name = os.path.splitext(existing_file)[0]
-            resume_file = f"{base_name}_resume_{int(time.time())}.ts"
-            
-            # 构建streamlink命令进行续录
-            stream_url = f"https://chzzk.naver.com/live/{channel_id}"
-            command = [
-                "streamlink",
-                stream_url,
-                self.config['recording']['quality'],
-                "-o", resume_file,
-                "--retry-streams", "5",
-                "--retry-max", "10"
-            ]
-            
-            logger.info(f"Starting resume recording: {channel_id}")
-            logger.info(f"Command: {' '.join(command)}")
+            base_name = recording_stem(existing_file)
+            resume_file = self.recording_output_path(f"{base_name}_resume_{int(time.time())}.ts")
             
             # 启动录制进程
-            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            logger.info(f"Starting resume recording: {channel_id}")
+            recording_quality = self.allocate_quality(channel_id, self.config['recording']['quality'])
+            process = self.spawn_recorder(channel_id, resume_file, recording_quality)
             
-            # 记录录制信息
+            # 记录录制信息（与 start_recording 相同的字段，stop_recording 据此结束录制）
             self.recorder_processes[channel_id] = {
-                'process': process,
-                'start_time': datetime.datetime.now(),
-                'file_path': resume_file,
+                'recorder': process,
+                'path': resume_file,
+                'time': datetime.datetime.now(),
+                'record_id': f"local_{int(time.time())}_{channel_id[:8]}",
+                'fragments': [existing_file],  # 结束后续录片段合并回原文件
+                'processed_parts': [],
+                'part_started': time.time(),
+                'requested_quality': self.config['recording']['quality'],
+                'quality': recording_quality,
                 'original_file': existing_file,
                 'is_resume': True,
                 'channel_data': channel_data
             }
+            self.journal_save(channel_id)
+            self.resume_index.add(channel_id, resume_file)
             
             # 启动延迟封面截取任务
             self.start_delayed_cover_capture(channel_id, resume_file, channel_data.get('channel_name'))
@@ -654,6 +878,8 @@ class MultiChzzkRecorder:
             
         except Exception as e:
             logger.error(f"Failed to resume recording for {channel_id}: {e}")
+            if channel_id not in self.recorder_processes:
+                self.quality_allocator.release(channel_id)
             return False
 
     def send_resume_notification(self, channel_id: str, original_file: str, resume_file: str):
@@ -1178,35 +1404,89 @@ Duration: {duration}
         """主运行循环"""
         logger.info("Starting Multi Chzzk Recorder...")
         
+        interval = self.config['recording']['interval']
+        channels: Dict[str, Dict] = {}
+        last_channel_refresh = 0.0
+        self._channels_changed.set()
+        self.channel_registry.start()
+        self.adopt_recordings()
+        threading.Thread(
+            target=self.resume_index.rebuild,
+            args=(self.config['recording']['recording_save_root_dir'],),
+            name="resume-index",
+            daemon=True
+        ).start()
+        if self.live_remux:
+            # 收尾上次运行崩溃时遗留的 .mp4.part 文件；接管的录制由会话日志的流程收尾，
+            # 扫描期间开始的录制与交接、后处理中的文件在收尾前逐个检查
+            threading.Thread(
+                target=recover_partial_files,
+                args=(self.config['recording']['recording_save_root_dir'], self.is_recording_path,
+                      self.config['processing'].get('live_remux_faststart', False)),
+                daemon=True
+            ).start()
+        
         while True:
             try:
+                # 处理已退出的录制进程，重启到期的录制
+                self.handle_process_exits()
+                self.handle_stalls()
+                self.restart_due_recordings()
+                self.apply_step_downs()
+                self.rotate_recordings()
+                
                 # 检查 Cookie 有效性
                 if not self.cookie_manager.check_and_update_cookies():
                     logger.error("Cookie has expired, skipping this check")
-                    time.sleep(self.config['recording']['interval'])
+                    time.sleep(interval)
                     continue
                 
-                # 获取监控频道列表
-                channels = self.get_monitored_channels()
-                if not channels:
+                # 频道列表变化（或元数据可能过期）时重新加载并同步到调度器，正在录制的频道继续轮询直到下播
+                if self._channels_changed.is_set() or time.time() - last_channel_refresh >= interval:
+                    self._channels_changed.clear()
+                    channels = {channel['channel_id']: channel for channel in self.get_monitored_channels()}
+                    last_channel_refresh = time.time()
+                    for channel_id in self.admission.channel_ids:
+                        if channel_id not in channels:
+                            self.admission.discard(channel_id)
+                    self.poll_scheduler.sync(set(channels) | set(self.recorder_processes))
+                
+                if not channels and not self.recorder_processes:
                     logger.warning("No monitored channels found")
-                    time.sleep(self.config['recording']['interval'])
+                    self._wakeup.wait(interval)
+                    self._wakeup.clear()
                     continue
                 
-                # 检查每个频道
-                for channel in channels:
-                    channel_id = channel['channel_id']
-                    
+                # 取出到期的频道并发检查；疑似失效的频道在退避期内推迟（正在录制的频道除外）
+                due_channels = []
+                for channel_id in self.poll_scheduler.pop_due():
+                    retry_at = None if channel_id in self.recorder_processes \
+                        else self.channel_failures.retry_at(channel_id)
+                    if retry_at is not None:
+                        self.poll_scheduler.defer(channel_id, retry_at)
+                    else:
+                        due_channels.append(channel_id)
+                if due_channels:
+                    statuses = self.channel_poller.poll(due_channels)
+                    logger.info(f"Poll cycle: {self.channel_poller.format_stats()}")
+                    publish_state('breakers', breaker_snapshots())
+                    publish_state('accounts', self.account_pool.snapshot())
+                
+                for channel_id in due_channels:
                     try:
-                        # 检查频道状态
-                        status = self.check_channel_status(channel_id)
+                        status = statuses[channel_id]
+                        self.poll_scheduler.record_result(channel_id, status['isLive'], status.get('openDate'))
+                        self.latency_tracker.observe_status(channel_id, status['isLive'], status.get('openDate'),
+                                                            status.get('observedAt'))
                         
                         if status['isLive']:
                             # 如果正在直播且未录制，开始录制
-                            if channel_id not in self.recorder_processes:
+                            if channel_id not in self.recorder_processes and channel_id in channels \
+                                    and self.admission.request(channel_id, len(self.recorder_processes)):
                                 logger.info(f"Channel {channel_id} is live, starting recording...")
-                                self.start_recording(channel_id, channel)
+                                self.start_recording(channel_id, channels[channel_id], status=status)
                         else:
+                            self.admission.discard(channel_id)
                             # 如果不在直播但正在录制，停止录制
                             if channel_id in self.recorder_processes:
                                 logger.info(f"Channel {channel_id} is offline, stopping recording...")
@@ -1215,8 +1495,25 @@ Duration: {duration}
                     except Exception as e:
                         logger.error(f"Error processing channel {channel_id}: {e}")
                 
-                # 等待下次检查
-                time.sleep(self.config['recording']['interval'])
+                # 有空位时开始排队的录制
+                self.admit_queued_recordings(channels)
+                if due_channels:
+                    publish_state('queue', self.admission.snapshot())
+                self.publish_latency_metrics()
+                
+                # 已从列表移除的频道下播后不再轮询
+                if any(channel_id not in channels for channel_id in due_channels):
+                    self.poll_scheduler.sync(set(channels) | set(self.recorder_processes))
+                
+                # 等待下一个到期频道或待重启的录制，频道列表变化或录制进程退出时提前唤醒
+                timeout = self.poll_scheduler.seconds_until_next()
+                if self._pending_restarts:
+                    timeout = min(timeout, min(self._pending_restarts.values()) - time.time())
+                rotating = self._step_downs or any(info.get('rotation') for info in self.recorder_processes.values())
+                if self.recorder_processes and (self.split_duration or self.split_size or rotating):
+                    timeout = min(timeout, SPLIT_CHECK_INTERVAL)
+                self._wakeup.wait(max(timeout, 0.5))
+                self._wakeup.clear()
                 
             except KeyboardInterrupt:
                 logger.info("Received interrupt signal, stopping...")
@@ -1225,6 +1522,337 @@ Duration: {duration}
                 logger.error(f"Unexpected error in main loop: {e}")
                 time.sleep(10)
 
+    def admit_queued_recordings(self, channels: Dict[str, Dict]):
+        """按优先级开始排队的录制（开始前重新检查开播状态）"""
+        ready = self.admission.pop_ready(len(self.recorder_processes))
+        for channel_id in ready:
+            if channel_id in self.recorder_processes or channel_id not in channels:
+                continue
+            logger.info(f"Recording slot available, starting queued recording for {channel_id}...")
+            self.start_recording(channel_id, channels[channel_id])
+        if ready:
+            publish_state('queue', self.admission.snapshot())
+
+    def _on_channels_changed(self):
+        self._channels_changed.set()
+        self._wakeup.set()
+
+    def handle_process_exits(self):
+        """处理录制进程退出：非主动停止的进程按退避安排重启，连续失败过多时结束本次录制"""
+        for exit_info in self.process_supervisor.pop_exits():
+            channel_id = exit_info.channel_id
+            process_info = self.recorder_processes.get(channel_id)
+            if exit_info.reason == EXIT_STOPPED or process_info is None \
+                    or process_info['recorder'] is not exit_info.process:
+                continue
+            for line in self.log_pump.tail(channel_id):
+                logger.warning(f"[{channel_id}] streamlink: {line}")
+            
+            delay = self.process_supervisor.restart_delay(exit_info)
+            if delay is None:
+                logger.error(f"Recording for {channel_id} failed {self.process_supervisor.max_attempts} times "
+                             f"in a row, finishing it; the next poll will start a new one if still live")
+                self.stop_recording(channel_id)
+                continue
+            logger.info(f"Restarting recording for {channel_id} in {delay:.0f}s if still live")
+            self._pending_restarts[channel_id] = time.time() + delay
+
+    def _on_stall(self, channel_id: str, path: str, stalled_for: float):
+        self._stalled[channel_id] = (path, stalled_for)
+        self._wakeup.set()
+
+    def handle_stalls(self):
+        """
+        录制文件停滞：结束卡住的进程并重启录制（已下播时结束录制）。
+        停滞与异常退出共用重启计数与退避，连续停滞过多时结束本次录制；文件恢复增长后计数清零
+        """
+        for channel_id, (path, stalled_for) in list(self._stalled.items()):
+            del self._stalled[channel_id]
+            process_info = self.recorder_processes.get(channel_id)
+            # 已切换到新文件、进程已退出（由退出处理负责重启）或正在交接分段时忽略
+            if process_info is None or process_info['path'] != path or channel_id in self._pending_restarts \
+                    or process_info['recorder'].poll() is not None or process_info.get('rotation'):
+                continue
+            for line in self.log_pump.tail(channel_id):
+                logger.warning(f"[{channel_id}] streamlink: {line}")
+            stalled_recorder = process_info['recorder']
+            delay = self.process_supervisor.restart_delay(
+                self.process_supervisor.record_stall(channel_id, stalled_recorder, stalled_for))
+            if delay is None:
+                logger.error(f"Recording for {channel_id} stalled {self.process_supervisor.max_attempts} times "
+                             f"in a row, finishing it; the next poll will start a new one if still live")
+                self.stop_recording(channel_id)
+                continue
+            self.process_supervisor.expect_exit(stalled_recorder)
+            threading.Thread(target=self.stop_recorder_process, args=(stalled_recorder,), daemon=True).start()
+            if delay > 0:
+                logger.warning(f"Restarting stalled recording for {channel_id} in {delay:.0f}s if still live")
+                self._pending_restarts[channel_id] = time.time() + delay
+                continue
+            logger.warning(f"Restarting stalled recording for {channel_id}")
+            self.restart_recording(channel_id)
+
+    @staticmethod
+    def stop_recorder_process(recorder):
+        """结束录制进程，10秒内没有退出时强制结束"""
+        recorder.terminate()
+        try:
+            recorder.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            recorder.kill()
+            recorder.wait()
+
+    def restart_due_recordings(self):
+        """重新检查开播状态，仍在直播时将录制写入新文件，已下播时结束录制"""
+        now = time.time()
+        for channel_id, due in list(self._pending_restarts.items()):
+            if due > now:
+                continue
+            del self._pending_restarts[channel_id]
+            if channel_id in self.recorder_processes:
+                self.restart_recording(channel_id)
+
+    def restart_recording(self, channel_id: str) -> bool:
+        """重启已退出的录制进程，保留录制记录、弹幕录制与开始时间"""
+        process_info = self.recorder_processes[channel_id]
+        try:
+            status = self.check_channel_status(channel_id)
+            if not status['isLive']:
+                logger.info(f"Channel {channel_id} is offline, finishing recording...")
+                return self.stop_recording(channel_id)
+            
+            # 在首个文件名后添加续录标识，与 resume_recording 的命名一致
+            first_path = (process_info['fragments'] or [process_info['path']])[0]
+            rec_file_path = self.recording_output_path(f"{recording_stem(first_path)}_resume_{int(time.time())}.ts")
+            quality = self.allocate_quality(channel_id, self.requested_quality(channel_id))
+            recorder = self.spawn_recorder(channel_id, rec_file_path, quality)
+            
+            process_info['fragments'].append(process_info['path'])
+            process_info['recorder'] = recorder
+            process_info['quality'] = quality
+            process_info['path'] = rec_file_path
+            process_info['part_started'] = time.time()
+            self.journal_save(channel_id)
+            self.resume_index.add(channel_id, rec_file_path)
+            logger.info(f"Recording restarted for {channel_id}: {rec_file_path}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to restart recording for {channel_id}: {e}")
+            self._pending_restarts[channel_id] = time.time() + self.process_supervisor.max_delay
+            return False
+
+    def rotate_recordings(self):
+        """当前文件达到分段时长或大小时启动下一个分段，新分段写入数据后结束旧分段（包括降级切换的分段）"""
+        now = time.time()
+        for channel_id, process_info in list(self.recorder_processes.items()):
+            if process_info.get('rotation'):
+                rotation = process_info['rotation']
+                recorder = process_info['recorder']
+                try:
+                    started = os.path.getsize(process_info['path']) > 0
+                except OSError:
+                    started = False
+                if started or recorder.poll() is not None or now >= rotation['deadline']:
+                    self.finish_rotation(channel_id)
+                continue
+            if not (self.split_duration or self.split_size) or channel_id in self._pending_restarts \
+                    or process_info['recorder'].poll() is not None:
+                continue
+            try:
+                size = os.path.getsize(process_info['path'])
+            except OSError:
+                size = 0
+            elapsed = now - process_info.get('part_started', now)
+            if (self.split_duration and elapsed >= self.split_duration) or (self.split_size and size >= self.split_size):
+                self.rotate_recording(channel_id)
+
+    def rotate_recording(self, channel_id: str, quality: str = None) -> bool:
+        """开始写入下一个分段（quality 为空时重新分配质量），旧进程继续录制到新分段有数据为止，避免切换时丢失内容"""
+        process_info = self.recorder_processes[channel_id]
+        try:
+            parts = group_fragments(process_info['fragments'] + [process_info['path']])
+            rec_file_path = self.recording_output_path(
+                f"{recording_stem(parts[0][0])}_part{len(parts) + 1:03d}.ts")
+            if quality is None:
+                quality = self.allocate_quality(channel_id, self.requested_quality(channel_id))
+            recorder = self.spawn_recorder(channel_id, rec_file_path, quality, new_part=True)
+            process_info['rotation'] = {
+                'recorder': process_info['recorder'],
+                'path': process_info['path'],
+                'deadline': time.time() + SPLIT_HANDOVER_TIMEOUT
+            }
+            process_info['fragments'].append(process_info['path'])
+            process_info['recorder'] = recorder
+            process_info['path'] = rec_file_path
+            process_info['part_started'] = time.time()
+            process_info['quality'] = quality
+            self.journal_save(channel_id)
+            self.resume_index.add(channel_id, rec_file_path)
+            logger.info(f"Recording for {channel_id} rolled over to {rec_file_path}")
+            return True
+        except Exception as e:
+            logger.error(f"Failed to roll over recording for {channel_id}: {e}")
+            process_info['part_started'] = time.time()  # 下一个分段周期再试
+            return False
+
+    def finish_rotation(self, channel_id: str):
+        """结束上一个分段的录制进程，并立即把该分段（连同其续录片段）交给后处理"""
+        process_info = self.recorder_processes[channel_id]
+        rotation = process_info.pop('rotation')
+        self.process_supervisor.expect_exit(rotation['recorder'])
+        group = group_fragments(process_info['fragments'])[-1]
+        process_info.setdefault('processed_parts', []).extend(group)
+        self.journal_save(channel_id)
+        self._processing_paths.update(group)
+        threading.Thread(
+            target=self.finish_part,
+            args=(channel_id, rotation['recorder'], group, process_info['record_id']),
+            daemon=True
+        ).start()
+
+    def finish_part(self, channel_id: str, recorder, paths: List[str], record_id):
+        self.stop_recorder_process(recorder)
+        logger.info(f"Recording part finished for {channel_id}: {paths[0]}")
+        self.process_recording_group(channel_id, paths, record_id)
+
+    def requested_quality(self, channel_id: str) -> str:
+        """录制开始时请求的质量上限（接管的旧录制没有记录时使用配置的质量）"""
+        process_info = self.recorder_processes.get(channel_id) or {}
+        return process_info.get('requested_quality') or self.config['recording']['quality']
+
+    def allocate_quality(self, channel_id: str, requested_quality: str) -> str:
+        """按带宽/磁盘写入预算与频道优先级分配录制质量，需要降级的低优先级录制交给主循环切换"""
+        recordings = self.stall_watcher.snapshot()['channels']
+        measured = {other: recordings[other]['rate'] for other in self.recorder_processes
+                    if other != channel_id and other in recordings}
+        quality, step_downs = self.quality_allocator.allocate(channel_id, requested_quality, measured)
+        for other, lower_quality in step_downs:
+            self._step_downs[other] = lower_quality
+        if step_downs:
+            self._wakeup.set()
+        publish_state('quality', self.quality_allocator.snapshot())
+        return quality
+
+    def apply_step_downs(self):
+        """把被降级的录制切换到新分段，旧进程录制到新分段有数据为止（交接期间短暂占用两份带宽）"""
+        for channel_id, quality in list(self._step_downs.items()):
+            process_info = self.recorder_processes.get(channel_id)
+            if process_info is None or channel_id in self._pending_restarts:
+                # 已结束，或等待重启（重启时重新分配质量）
+                del self._step_downs[channel_id]
+                continue
+            if process_info.get('rotation') or process_info['recorder'].poll() is not None:
+                continue  # 等上一次交接完成或退出处理安排重启
+            del self._step_downs[channel_id]
+            if process_info.get('quality') == quality:
+                continue
+            logger.info(f"Switching {channel_id} to {quality} to stay within the bandwidth budget")
+            self.rotate_recording(channel_id, quality)
+
+    def journal_save(self, channel_id: str):
+        """把一路录制的当前状态写入会话日志"""
+        process_info = self.recorder_processes.get(channel_id)
+        if self.journal is None or process_info is None:
+            return
+        info = {'record': self.record_dict.get(channel_id),
+                'quality': [process_info.get('requested_quality'), process_info.get('quality')]}
+        rotation = process_info.get('rotation')
+        if rotation:
+            info['rotation'] = {'path': rotation['path'], 'pids': self._recorder_pids(rotation['recorder'])}
+        try:
+            self.journal.save(channel_id, {
+                'record_id': process_info['record_id'],
+                'engine': self.engine,
+                'path': process_info['path'],
+                'fragments': process_info['fragments'],
+                'processed_parts': process_info.get('processed_parts', []),
+                'pids': self._recorder_pids(process_info['recorder']),
+                'log_path': getattr(process_info['recorder'], 'log_path', None),
+                'started_at': process_info['time'].timestamp(),
+                'part_started': process_info.get('part_started', time.time()),
+                'info': info
+            })
+        except Exception as e:
+            logger.warning(f"Failed to write recording journal for {channel_id}: {e}")
+
+    @staticmethod
+    def _recorder_pids(recorder) -> List[List]:
+        """录制句柄的进程（PID 与启动时间）；进程内录制引擎的录制随录制端退出，不记录"""
+        pids = recorder.pids if hasattr(recorder, 'pids') else [recorder.pid]
+        return [[pid, process_identity(pid)] for pid in pids if pid != os.getpid()]
+
+    def adopt_recordings(self):
+        """接管上次运行留下的录制：仍在运行的录制进程继续录制，已退出的按进程重启流程续录或结束"""
+        if self.journal is None:
+            return
+        for entry in self.journal.entries():
+            channel_id = entry['channel_id']
+            recorder = AdoptedProcess([tuple(pid) for pid in entry['pids']] if entry['engine'] == ENGINE_CLI else [])
+            recorder.log_path = entry['log_path']
+            self.recorder_processes[channel_id] = {
+                'recorder': recorder,
+                'path': entry['path'],
+                'time': datetime.datetime.fromtimestamp(entry['started_at']),
+                'record_id': entry['record_id'],
+                'fragments': entry['fragments'],
+                'processed_parts': entry['processed_parts'],
+                'part_started': entry['part_started']
+            }
+            if entry['info'].get('record'):
+                self.record_dict[channel_id] = entry['info']['record']
+            requested_quality, quality = entry['info'].get('quality') or [None, None]
+            if requested_quality and quality:
+                self.recorder_processes[channel_id].update(requested_quality=requested_quality, quality=quality)
+                self.quality_allocator.assign(channel_id, requested_quality, quality)
+            self.resume_index.add(channel_id, entry['path'])
+            
+            # 分段交接中断：结束上一个分段的进程并交给后处理
+            rotation = entry['info'].get('rotation')
+            if rotation:
+                group = group_fragments(entry['fragments'])[-1]
+                self.recorder_processes[channel_id]['processed_parts'].extend(group)
+                self._processing_paths.update(group)
+                threading.Thread(
+                    target=self.finish_part,
+                    args=(channel_id, AdoptedProcess([tuple(pid) for pid in rotation['pids']]), group,
+                          entry['record_id']),
+                    daemon=True
+                ).start()
+            
+            if recorder.poll() is None:
+                if entry['log_path'] and os.path.exists(entry['log_path']):
+                    self.log_pump.attach(channel_id, recorder, entry['path'], log_path=entry['log_path'],
+                                         from_end=True)
+                self.process_supervisor.watch(channel_id, recorder, entry['part_started'])
+                self.stall_watcher.track(channel_id, entry['path'])
+                self.start_chat_recording(channel_id, os.path.dirname(entry['path']))
+                logger.info(f"Adopted running recording for {channel_id} (pid {recorder.pid}): {entry['path']}")
+            else:
+                # 录制进程已退出：与进程异常退出相同，仍在直播则立即续录，否则结束录制
+                if entry['log_path'] and os.path.exists(entry['log_path']):
+                    os.remove(entry['log_path'])
+                self._pending_restarts[channel_id] = time.time()
+                logger.info(f"Recording process for {channel_id} exited while the recorder was down, "
+                            f"resuming if still live")
+            self.journal_save(channel_id)
+
+    def publish_latency_metrics(self):
+        """有新的延迟样本时通过ZMQ发布，并更新Web面板可读取的运行状态"""
+        events = self.latency_tracker.pop_events()
+        if not events:
+            return
+        
+        snapshot = self.latency_tracker.snapshot()
+        for event in events:
+            try:
+                payload = {**event, 'histograms': snapshot['channels'].get(event['channel_id'], {})}
+                self.zmq_socket.send_multipart([b'latency', json.dumps(payload).encode('utf-8')])
+            except zmq.ZMQError as e:
+                logger.warning(f"Failed to publish latency metrics: {e}")
+                break
+        publish_state('latency', snapshot)
+        logger.info(f"Go-live latency: {self.latency_tracker.format_summary()}")
+
     def cleanup(self):
         """清理资源"""
         logger.info("Cleaning up resources...")
@@ -1242,6 +1870,24 @@ Duration: {duration}
                 logger.warning(f"Error stopping chat recording for {channel_id}: {e}")
         self.chat_recorders.clear()
         
+        # 结束进程内录制引擎（工作进程、HLS 下载线程）
+        if getattr(self, 'recording_engine', None) is not None:
+            self.recording_engine.shutdown()
+        
+        if getattr(self, 'journal', None) is not None:
+            self.journal.close()
+        
+        if hasattr(self, 'stall_watcher'):
+            self.stall_watcher.stop()
+        
+        # 停止频道列表监视
+        if hasattr(self, 'channel_registry'):
+            self.channel_registry.stop()
+        
+        # 关闭状态轮询线程池
+        if hasattr(self, 'channel_poller'):
+            self.channel_poller.shutdown()
+        
         # 关闭ZMQ
         if hasattr(self, 'zmq_socket'):
             self.zmq_socket.close()
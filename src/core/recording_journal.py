@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+录制会话日志
+正在进行的录制（频道、录制进程 PID、文件路径、开始时间、录制记录ID等）写入 SQLite（WAL 模式），
+每次状态变化立即提交。录制端崩溃或被 AutoRestartManager 重启后据此接管仍在运行的 streamlink 进程，
+已退出的录制则按进程重启的流程续录或结束，不需要再扫描录制目录
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOURNAL_PATH = 'recordings.db'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS recordings (
+    channel_id TEXT PRIMARY KEY,
+    record_id,  -- 无类型亲和性：API 返回的整数ID与本地的字符串ID原样保存
+    engine TEXT NOT NULL,
+    path TEXT NOT NULL,
+    fragments TEXT NOT NULL DEFAULT '[]',
+    processed_parts TEXT NOT NULL DEFAULT '[]',
+    pids TEXT NOT NULL DEFAULT '[]',
+    log_path TEXT,
+    started_at REAL NOT NULL,
+    part_started REAL NOT NULL,
+    info TEXT NOT NULL DEFAULT '{}',
+    updated_at REAL NOT NULL DEFAULT (strftime('%s', 'now'))
+)
+"""
+
+_JSON_COLUMNS = ('fragments', 'processed_parts', 'pids', 'info')
+
+
+class RecordingJournal:
+    def __init__(self, path: str = DEFAULT_JOURNAL_PATH):
+        self.path = path
+        self.log_dir = os.path.join(os.path.dirname(os.path.abspath(path)), 'recording_logs')
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        # WAL：提交只追加日志，崩溃后未完成的写入自动回滚
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(_SCHEMA)
+
+    @classmethod
+    def from_config(cls, recording_config: Dict) -> Optional['RecordingJournal']:
+        """journal_path 为空时不记录（录制端重启后无法接管录制）"""
+        path = recording_config.get('journal_path', DEFAULT_JOURNAL_PATH)
+        if not path:
+            return None
+        try:
+            return cls(path)
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open recording journal {path}: {e}")
+            return None
+
+    def log_path(self, channel_id: str, started_at: float) -> str:
+        """录制进程输出的日志文件（不经过管道，录制端退出后进程仍能继续写入）"""
+        os.makedirs(self.log_dir, exist_ok=True)
+        return os.path.join(self.log_dir, f'{channel_id}_{int(started_at)}.log')
+
+    def save(self, channel_id: str, entry: Dict):
+        """写入（或覆盖）一路录制的当前状态"""
+        values = {key: json.dumps(entry[key], ensure_ascii=False) if key in _JSON_COLUMNS else entry[key]
+                  for key in ('record_id', 'engine', 'path', 'fragments', 'processed_parts', 'pids', 'log_path',
+                              'started_at', 'part_started', 'info')}
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO recordings (channel_id, {', '.join(values)}, updated_at) "
+                f"VALUES (?, {', '.join('?' * len(values))}, strftime('%s', 'now'))",
+                (channel_id, *values.values())
+            )
+
+    def remove(self, channel_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM recordings WHERE channel_id = ?", (channel_id,))
+
+    def entries(self) -> List[Dict]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM recordings ORDER BY started_at").fetchall()
+        entries = []
+        for row in rows:
+            entry = dict(row)
+            for key in _JSON_COLUMNS:
+                entry[key] = json.loads(entry[key])
+            entries.append(entry)
+        return entries
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
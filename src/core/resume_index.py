@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+续录候选索引
+按频道ID记录未正常结束的录制文件：录制开始、重启或切换分段时更新，正常结束时移除，
+启动时扫描一次录制目录补上崩溃遗留的文件。开始录制时只需查一次字典并 stat 一个文件，
+与录制目录中的文件数量无关
+"""
+
+import logging
+import os
+import re
+import threading
+import time
+from typing import Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_ID_RE = re.compile(r'[0-9a-f]{32}')
+
+RESUME_MAX_AGE = 86400  # 最近24小时内修改过的文件才可能是未完成的录制
+RESUME_MIN_SIZE = 1024 * 1024  # 至少1MB
+
+
+class ResumeIndex:
+    def __init__(self, max_age: float = RESUME_MAX_AGE, min_size: int = RESUME_MIN_SIZE):
+        self.max_age = max_age
+        self.min_size = min_size
+        self._lock = threading.Lock()
+        self._paths: Dict[str, str] = {}
+        self._touched: Set[str] = set()  # 扫描期间 add/remove 过的频道，扫描结果不覆盖
+
+    def add(self, channel_id: str, path: str):
+        """频道当前正在写入的录制文件"""
+        with self._lock:
+            self._paths[channel_id] = path
+            self._touched.add(channel_id)
+
+    def remove(self, channel_id: str):
+        """录制正常结束，不再需要续录"""
+        with self._lock:
+            self._paths.pop(channel_id, None)
+            self._touched.add(channel_id)
+
+    def lookup(self, channel_id: str) -> Optional[str]:
+        """返回可续录的文件（最近修改过且大小合理），没有时返回None"""
+        with self._lock:
+            path = self._paths.get(channel_id)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.remove(channel_id)
+            return None
+        if time.time() - stat.st_mtime >= self.max_age:
+            self.remove(channel_id)
+            return None
+        if stat.st_size <= self.min_size:
+            return None
+        return path
+
+    def rebuild(self, root: str):
+        """扫描录制目录，按文件名中的频道ID收集最近修改的 .ts 文件；扫描期间开始或结束录制的频道不覆盖"""
+        started = time.time()
+        with self._lock:
+            self._touched.clear()
+        found: Dict[str, tuple] = {}
+        scanned = 0
+        for dirpath, _, files in os.walk(root):
+            for name in files:
+                if not name.endswith('.ts'):
+                    continue
+                match = CHANNEL_ID_RE.search(name)
+                if not match:
+                    continue
+                path = os.path.join(dirpath, name)
+                scanned += 1
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    continue
+                if started - mtime < self.max_age and mtime > found.get(match.group(), ('', 0))[1]:
+                    found[match.group()] = (path, mtime)
+        with self._lock:
+            for channel_id, (path, _) in found.items():
+                if channel_id not in self._touched:
+                    self._paths[channel_id] = path
+        logger.info(f"Resume index rebuilt: {len(found)} candidate(s) from {scanned} file(s) "
+                    f"in {time.time() - started:.1f}s")
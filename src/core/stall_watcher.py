@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+录制停滞检测
+streamlink 进程可能仍在运行却不再写入数据（CDN 卡住等），只检查 isLive 发现不了。
+一个定时线程统一采样所有录制文件的大小，按频道计算写入速率；文件持续 threshold 秒没有增长时
+回调 on_stall，由主循环重启录制，停滞事件计入统计并发布给 Web 面板
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _StreamState:
+    def __init__(self, path: str, now: float):
+        self.path = path
+        self.size = self.current_size()
+        self.sampled_at = now
+        self.last_growth_at = now  # 刚开始跟踪时从此刻计时（包括等待第一个字节）
+        self.rate = 0.0  # 写入速率（字节/秒，指数平滑）
+        self.grown = False  # 开始跟踪后是否已增长过
+        self.stalled = False
+        self.stalls = 0
+        self.last_stall_at: Optional[float] = None
+
+    def current_size(self) -> int:
+        try:
+            return os.path.getsize(self.path)
+        except OSError:
+            return 0
+
+
+class StallWatcher:
+    def __init__(self, on_stall: Callable[[str, str, float], None] = None, interval: float = 10,
+                 threshold: float = 90, smoothing: float = 0.3,
+                 on_snapshot: Callable[[Dict], None] = None,
+                 on_growth: Callable[[str], None] = None):
+        self.on_stall = on_stall
+        self.on_growth = on_growth  # 新跟踪的文件第一次增长时回调
+        self.on_snapshot = on_snapshot
+        self.interval = interval
+        self.threshold = threshold
+        self.smoothing = smoothing
+        self.events = 0
+        self.recent_events = deque(maxlen=50)
+        self._lock = threading.Lock()
+        self._streams: Dict[str, _StreamState] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @classmethod
+    def from_config(cls, recording_config: Dict, **kwargs) -> 'StallWatcher':
+        return cls(interval=recording_config.get('stall_check_interval', 10),
+                   threshold=recording_config.get('stall_threshold', 90), **kwargs)
+
+    def track(self, channel_id: str, path: str):
+        """开始跟踪频道当前写入的文件（新录制、重启或切换分段时调用），保留该频道的停滞统计"""
+        now = time.time()
+        with self._lock:
+            previous = self._streams.get(channel_id)
+            state = _StreamState(path, now)
+            if previous is not None:
+                state.stalls = previous.stalls
+                state.last_stall_at = previous.last_stall_at
+            self._streams[channel_id] = state
+        self._ensure_thread()
+
+    def untrack(self, channel_id: str):
+        with self._lock:
+            self._streams.pop(channel_id, None)
+
+    def sample(self):
+        """采样一次所有录制文件的大小"""
+        now = time.time()
+        stalled, grown = [], []
+        with self._lock:
+            for channel_id, state in self._streams.items():
+                size = state.current_size()
+                elapsed = max(now - state.sampled_at, 1e-6)
+                state.sampled_at = now
+                growth = size - state.size
+                state.size = size
+                state.rate += self.smoothing * (max(growth, 0) / elapsed - state.rate)
+                if growth > 0:
+                    state.last_growth_at = now
+                    state.stalled = False
+                    if not state.grown:
+                        state.grown = True
+                        grown.append(channel_id)
+                elif not state.stalled and now - state.last_growth_at >= self.threshold:
+                    # 每次停滞只报告一次，恢复增长或重新跟踪后才会再次报告
+                    state.stalled = True
+                    state.stalls += 1
+                    state.last_stall_at = now
+                    self.events += 1
+                    self.recent_events.append({'channel_id': channel_id, 'path': state.path, 'time': now,
+                                               'size': size})
+                    stalled.append((channel_id, state.path, now - state.last_growth_at))
+
+        for channel_id in grown:
+            if self.on_growth:
+                try:
+                    self.on_growth(channel_id)
+                except Exception as e:
+                    logger.error(f"Growth callback failed for {channel_id}: {e}")
+        for channel_id, path, stalled_for in stalled:
+            logger.warning(f"Recording for {channel_id} has not grown for {stalled_for:.0f}s: {path}")
+            if self.on_stall:
+                try:
+                    self.on_stall(channel_id, path, stalled_for)
+                except Exception as e:
+                    logger.error(f"Stall callback failed for {channel_id}: {e}")
+        if self.on_snapshot:
+            try:
+                self.on_snapshot(self.snapshot())
+            except Exception as e:
+                logger.warning(f"Failed to publish stall metrics: {e}")
+
+    def snapshot(self) -> Dict:
+        now = time.time()
+        with self._lock:
+            channels = {
+                channel_id: {
+                    'path': state.path,
+                    'size': state.size,
+                    'rate': round(state.rate, 1),
+                    'idle': round(now - state.last_growth_at, 1),
+                    'stalled': state.stalled,
+                    'stalls': state.stalls,
+                    'last_stall_at': state.last_stall_at
+                }
+                for channel_id, state in self._streams.items()
+            }
+            return {'threshold': self.threshold, 'events': self.events, 'recent': list(self.recent_events),
+                    'channels': channels}
+
+    def stop(self):
+        self._stop.set()
+
+    def _ensure_thread(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="stall-watcher", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.sample()
+            except Exception as e:
+                logger.error(f"Stall watcher error: {e}")
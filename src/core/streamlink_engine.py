@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程内 streamlink 录制引擎
+通过 streamlink 的 Python API 录制，每个工作进程共用一个 Streamlink 会话并以线程承载多路直播，
+避免每路录制各启动一个 streamlink CLI 进程（约 60 MB 常驻内存与解释器启动时间）；
+录制句柄提供与 subprocess.Popen 相同的 poll/wait/terminate/kill 接口，进程监督与停止录制无需区分引擎
+"""
+
+import importlib.util
+import itertools
+import logging
+import multiprocessing
+import queue
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from utils.live_remux import RemuxSink
+
+logger = logging.getLogger(__name__)
+
+ENGINE_CLI = 'cli'
+ENGINE_SESSION = 'session'
+
+READ_CHUNK_SIZE = 65536
+PROGRESS_INTERVAL = 1.0
+
+
+class _EventLogHandler(logging.Handler):
+    """把录制线程（及其 HLS 下载/写入线程）的 streamlink 日志转发给主进程，格式与 CLI 输出一致"""
+
+    def __init__(self, events, thread_recordings: Dict[int, str]):
+        super().__init__()
+        self.events = events
+        self.thread_recordings = thread_recordings
+
+    def emit(self, record: logging.LogRecord):
+        rec_id = self.thread_recordings.get(record.thread)
+        if rec_id is None:
+            return
+        message = record.getMessage()
+        # debug 级别只转发分段日志
+        if record.levelno < logging.INFO and 'egment' not in message:
+            return
+        name = record.name[len('streamlink.'):] if record.name.startswith('streamlink.') else record.name
+        try:
+            self.events.put(('log', rec_id, f"[{name}][{record.levelname.lower()}] {message}"))
+        except Exception:
+            pass
+
+
+def _open_stream(session, url: str, quality: str, retry_streams: float, retry_max: int,
+                 stop: threading.Event, log: Callable[[str], None]):
+    """获取直播流，没有可用流时按 --retry-streams/--retry-max 的语义重试"""
+    for attempt in range(retry_max + 1):
+        streams = session.streams(url)
+        if streams:
+            # 与 CLI 一致，逗号分隔的备选清晰度依次尝试，都没有时报错而不是改用 best
+            stream = next((streams[name] for name in (item.strip() for item in quality.split(','))
+                           if name in streams), None)
+            if stream is None:
+                log(f"[cli][error] The specified stream(s) '{quality}' could not be found")
+                log(f"[cli][error] Available streams: {', '.join(streams)}")
+                return None, ''
+            # 与 CLI 一致，best/worst 显示实际的清晰度名称
+            name = next((key for key, value in streams.items()
+                         if value is stream and key not in ('best', 'worst')), quality)
+            return stream, name
+        if attempt < retry_max:
+            log(f"[cli][info] Waiting for streams, retrying every {retry_streams:.1f} second(s)")
+            if stop.wait(retry_streams):
+                return None, ''
+    log(f"[cli][error] No playable streams found on this URL: {url}")
+    return None, ''
+
+
+def _record(session, events, thread_recordings: Dict[int, str], rec_id: str, url: str, quality: str,
+            path: str, stop: threading.Event, retry_streams: float, retry_max: int, remux: Optional[Dict]):
+    """工作进程中的单路录制线程"""
+    def log(line: str):
+        events.put(('log', rec_id, line))
+
+    returncode = 0
+    stream_fd = None
+    thread_recordings[threading.get_ident()] = rec_id
+    try:
+        stream, name = _open_stream(session, url, quality, retry_streams, retry_max, stop, log)
+        if stream is None:
+            returncode = 0 if stop.is_set() else 1
+            return
+        log(f"[cli][info] Opening stream: {name} ({stream.shortname()})")
+        stream_fd = stream.open()
+        # HLS 的下载与写入线程输出的日志同样归属本次录制
+        for attr in ('worker', 'writer'):
+            thread = getattr(stream_fd, attr, None)
+            if thread is not None and thread.ident is not None:
+                thread_recordings[thread.ident] = rec_id
+        log(f"[cli][info] Writing output to\n{path}")
+
+        written = 0
+        last_report, last_written = time.monotonic(), 0
+        # 实时封装时数据交给 ffmpeg 写成分片 MP4
+        with (RemuxSink(path, remux.get('ffmpeg', 'ffmpeg'), on_log=log) if remux else open(path, 'wb')) as output:
+            while not stop.is_set():
+                data = stream_fd.read(READ_CHUNK_SIZE)
+                if not data:
+                    log("[cli][info] Stream ended")
+                    break
+                output.write(data)
+                written += len(data)
+                now = time.monotonic()
+                if now - last_report >= PROGRESS_INTERVAL:
+                    events.put(('progress', rec_id, written, (written - last_written) / (now - last_report)))
+                    last_report, last_written = now, written
+        events.put(('progress', rec_id, written, 0.0))
+    except Exception as e:
+        log(f"[cli][error] {e}")
+        returncode = 1
+    finally:
+        if stream_fd is not None:
+            try:
+                stream_fd.close()
+            except Exception:
+                pass
+        for ident in [ident for ident, owner in thread_recordings.items() if owner == rec_id]:
+            thread_recordings.pop(ident, None)
+        events.put(('exit', rec_id, returncode))
+
+
+def _worker_main(commands, events, options: Dict):
+    """工作进程入口：接收 start/stop/shutdown 命令，每路录制一个线程"""
+    try:
+        from streamlink import Streamlink
+    except ImportError as e:
+        events.put(('worker_error', None, str(e)))
+        return
+
+    session = Streamlink(options=options.get('session_options') or None)
+    thread_recordings: Dict[int, str] = {}
+    streamlink_logger = logging.getLogger('streamlink')
+    streamlink_logger.setLevel(logging.DEBUG)
+    streamlink_logger.addHandler(_EventLogHandler(events, thread_recordings))
+
+    stops: Dict[str, threading.Event] = {}
+    threads: List[threading.Thread] = []
+    while True:
+        try:
+            command = commands.recv()
+        except EOFError:
+            command = ('shutdown',)
+        if command[0] == 'start':
+            _, rec_id, url, quality, path, remux = command
+            stops[rec_id] = threading.Event()
+            thread = threading.Thread(target=_record, name=rec_id, daemon=True,
+                                      args=(session, events, thread_recordings, rec_id, url, quality, path,
+                                            stops[rec_id], options.get('retry_streams', 5),
+                                            options.get('retry_max', 10), remux))
+            thread.start()
+            threads = [item for item in threads if item.is_alive()] + [thread]
+        elif command[0] == 'stop':
+            stop = stops.pop(command[1], None)
+            if stop is not None:
+                stop.set()
+        elif command[0] == 'shutdown':
+            for stop in stops.values():
+                stop.set()
+            for thread in threads:
+                thread.join(timeout=5)
+            return
+
+
+class SessionRecording:
+    """进程内录制的句柄，接口与 subprocess.Popen 一致"""
+    stdout = None
+    stderr = None
+
+    def __init__(self, engine: 'StreamlinkSessionEngine', worker: '_Worker', rec_id: str, channel_id: str,
+                 args: List[str]):
+        self.engine = engine
+        self.worker = worker
+        self.rec_id = rec_id
+        self.channel_id = channel_id
+        self.args = args
+        self.pid = worker.process.pid
+        self.returncode: Optional[int] = None
+        self._done = threading.Event()
+
+    def _finish(self, returncode: int):
+        if self.returncode is None:
+            self.returncode = returncode
+        self._done.set()
+
+    def poll(self) -> Optional[int]:
+        return self.returncode
+
+    def wait(self, timeout: float = None) -> int:
+        if not self._done.wait(timeout):
+            raise subprocess.TimeoutExpired(self.args, timeout)
+        return self.returncode
+
+    def terminate(self):
+        self.engine._send(self.worker, ('stop', self.rec_id))
+
+    def kill(self):
+        """工作进程无响应时直接结束句柄（录制线程随后自行退出）"""
+        self.terminate()
+        self.engine._finish(self.rec_id, -9)
+
+
+class _Worker:
+    def __init__(self, index: int, process, conn):
+        self.index = index
+        self.process = process
+        self.conn = conn
+        self.recordings: Dict[str, SessionRecording] = {}
+
+
+class StreamlinkSessionEngine:
+    def __init__(self, max_workers: int = 4, streams_per_worker: int = 16,
+                 on_log: Callable[[str, str], None] = None,
+                 on_progress: Callable[[str, int, float], None] = None,
+                 options: Dict = None):
+        self.max_workers = max(1, max_workers)
+        self.streams_per_worker = max(1, streams_per_worker)
+        self.on_log = on_log
+        self.on_progress = on_progress
+        self.options = options or {}
+        # 主进程有多个线程，工作进程使用 spawn 启动
+        self._context = multiprocessing.get_context('spawn')
+        self._events = self._context.Queue()
+        self._lock = threading.Lock()
+        self._workers: List[_Worker] = []
+        self._recordings: Dict[str, SessionRecording] = {}
+        self._ids = itertools.count(1)
+        self._worker_ids = itertools.count(1)
+        self._closed = False
+        self._dispatcher = threading.Thread(target=self._dispatch, name="streamlink-engine", daemon=True)
+        self._dispatcher.start()
+
+    @classmethod
+    def from_config(cls, recording_config: Dict, on_log=None, on_progress=None) -> 'StreamlinkSessionEngine':
+        return cls(max_workers=recording_config.get('engine_workers', 4),
+                   streams_per_worker=recording_config.get('engine_streams_per_worker', 16),
+                   on_log=on_log, on_progress=on_progress,
+                   options={'retry_streams': 5, 'retry_max': 10,
+                            'session_options': recording_config.get('engine_session_options', {})})
+
+    @staticmethod
+    def available() -> bool:
+        return importlib.util.find_spec('streamlink') is not None
+
+    def _spawn_worker(self) -> _Worker:
+        parent_conn, child_conn = self._context.Pipe()
+        index = next(self._worker_ids)
+        process = self._context.Process(target=_worker_main, args=(child_conn, self._events, self.options),
+                                        name=f"streamlink-worker-{index}", daemon=True)
+        process.start()
+        child_conn.close()
+        logger.info(f"Started streamlink worker {index} (pid {process.pid})")
+        return _Worker(index, process, parent_conn)
+
+    def _select_worker(self) -> _Worker:
+        """
+        选择负载最低且未满的工作进程，都已满且未达到上限时新建。
+        已退出的工作进程留在列表中，由 _reap_workers 结束其上的录制后移除
+        """
+        alive = [worker for worker in self._workers if worker.process.is_alive()]
+        candidates = [worker for worker in alive if len(worker.recordings) < self.streams_per_worker]
+        if candidates:
+            return min(candidates, key=lambda worker: len(worker.recordings))
+        if len(alive) < self.max_workers:
+            worker = self._spawn_worker()
+            self._workers.append(worker)
+            return worker
+        return min(alive, key=lambda worker: len(worker.recordings))
+
+    def start(self, channel_id: str, url: str, quality: str, path: str, remux: Dict = None) -> SessionRecording:
+        """在工作进程中开始一路录制；remux（如 {'ffmpeg': 'ffmpeg'}）不为空时实时封装为分片 MP4"""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("streamlink engine is shut down")
+            worker = self._select_worker()
+            rec_id = f"{channel_id}#{next(self._ids)}"
+            recording = SessionRecording(self, worker, rec_id, channel_id, ['streamlink', url, quality, '-o', path])
+            worker.recordings[rec_id] = recording
+            self._recordings[rec_id] = recording
+        self._send(worker, ('start', rec_id, url, quality, path, remux))
+        return recording
+
+    def _send(self, worker: _Worker, command: tuple):
+        try:
+            with self._lock:
+                worker.conn.send(command)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to send {command[0]} to streamlink worker {worker.index}: {e}")
+
+    def _finish(self, rec_id: str, returncode: int):
+        with self._lock:
+            recording = self._recordings.pop(rec_id, None)
+            if recording is not None:
+                recording.worker.recordings.pop(rec_id, None)
+        if recording is not None:
+            recording._finish(returncode)
+
+    def _dispatch(self):
+        """转发工作进程的日志/进度，结束录制句柄，并回收异常退出的工作进程"""
+        while True:
+            try:
+                event = self._events.get(timeout=1)
+            except queue.Empty:
+                event = None
+            except (OSError, ValueError, EOFError):
+                return
+            try:
+                if event is not None:
+                    self._handle_event(event)
+                self._reap_workers()
+            except Exception as e:
+                logger.error(f"Streamlink engine dispatch error: {e}")
+
+    def _handle_event(self, event: tuple):
+        kind, rec_id = event[0], event[1]
+        if kind == 'worker_error':
+            logger.error(f"Streamlink worker failed to start: {event[2]}")
+            return
+        recording = self._recordings.get(rec_id)
+        if kind == 'exit':
+            self._finish(rec_id, event[2])
+        elif recording is None:
+            return
+        elif kind == 'log' and self.on_log:
+            for line in event[2].splitlines():
+                self.on_log(recording.channel_id, line)
+        elif kind == 'progress' and self.on_progress:
+            self.on_progress(recording.channel_id, event[2], event[3])
+
+    def _reap_workers(self):
+        """工作进程退出（崩溃、被 OOM killer 结束）时，其上的录制以该进程的退出码结束"""
+        with self._lock:
+            dead = [worker for worker in self._workers if not worker.process.is_alive()]
+            self._workers = [worker for worker in self._workers if worker.process.is_alive()]
+        for worker in dead:
+            exitcode = worker.process.exitcode if worker.process.exitcode is not None else -9
+            if worker.recordings:
+                logger.error(f"Streamlink worker {worker.index} exited with code {exitcode}, "
+                             f"{len(worker.recordings)} recording(s) lost")
+            for rec_id in list(worker.recordings):
+                self._finish(rec_id, exitcode if exitcode != 0 else 1)
+
+    def snapshot(self) -> List[Dict]:
+        with self._lock:
+            return [{'index': worker.index, 'pid': worker.process.pid, 'recordings': len(worker.recordings)}
+                    for worker in self._workers]
+
+    def shutdown(self, timeout: float = 10):
+        """停止所有录制并结束工作进程"""
+        with self._lock:
+            self._closed = True
+            workers = list(self._workers)
+        for worker in workers:
+            self._send(worker, ('shutdown',))
+        for worker in workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.kill()
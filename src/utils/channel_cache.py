@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+频道元数据缓存
+持久化保存频道名称和头像，带TTL与容量上限，过期条目在后台刷新
+"""
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ChannelMetadataCache:
+    def __init__(self, fetch_func: Callable[[str], Optional[Dict]], cache_path: str,
+                 ttl: int = 86400, max_entries: int = 1000):
+        self.fetch_func = fetch_func
+        self.cache_path = cache_path
+        self.ttl = ttl
+        self.max_entries = max(1, int(max_entries))
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict] = self.load()
+
+        # 后台刷新队列
+        self._pending = set()
+        self._queue: queue.Queue = queue.Queue()
+        self._worker = threading.Thread(target=self._refresh_worker, daemon=True)
+        self._worker.start()
+
+    def load(self) -> Dict[str, Dict]:
+        """从磁盘加载缓存"""
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            logger.info(f"Loaded channel metadata cache with {len(entries)} entries")
+            return entries
+        except Exception as e:
+            logger.warning(f"Failed to load channel metadata cache: {e}")
+            return {}
+
+    def save(self):
+        """保存缓存到磁盘（先写临时文件再替换）"""
+        with self._lock:
+            snapshot = dict(self._entries)
+        try:
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, self.cache_path)
+        except Exception as e:
+            logger.warning(f"Failed to save channel metadata cache: {e}")
+
+    def update(self, channel_id: str, channel_name: str, channel_image: str = ''):
+        """写入一条元数据（LRU淘汰超出容量的条目）"""
+        if not channel_name:
+            return
+        now = time.time()
+        with self._lock:
+            self._entries[channel_id] = {
+                'channelName': channel_name,
+                'channelImageUrl': channel_image or '',
+                'updated_at': now,
+                'accessed_at': now
+            }
+            if len(self._entries) > self.max_entries:
+                oldest = sorted(self._entries, key=lambda key: self._entries[key].get('accessed_at', 0))
+                for key in oldest[:len(self._entries) - self.max_entries]:
+                    del self._entries[key]
+
+    def get(self, channel_id: str, fetch: bool = True) -> Optional[Dict]:
+        """获取频道元数据：命中直接返回（过期则后台刷新），未命中同步获取一次（fetch=False 时只读缓存）"""
+        with self._lock:
+            entry = self._entries.get(channel_id)
+            if entry:
+                entry['accessed_at'] = time.time()
+                entry = dict(entry)
+
+        if entry:
+            if fetch and time.time() - entry['updated_at'] >= self.ttl:
+                self.refresh_async(channel_id)
+            return entry
+
+        if fetch and self._fetch(channel_id):
+            self.save()
+            with self._lock:
+                entry = self._entries.get(channel_id)
+                return dict(entry) if entry else None
+        return None
+
+    def refresh_async(self, channel_id: str):
+        """将频道加入后台刷新队列"""
+        with self._lock:
+            if channel_id in self._pending:
+                return
+            self._pending.add(channel_id)
+        self._queue.put(channel_id)
+
+    def _fetch(self, channel_id: str) -> bool:
+        try:
+            channel_info = self.fetch_func(channel_id)
+        except Exception as e:
+            logger.warning(f"Failed to fetch channel metadata for {channel_id}: {e}")
+            return False
+        if channel_info and channel_info.get('channelName'):
+            self.update(channel_id, channel_info['channelName'], channel_info.get('channelImageUrl', ''))
+            return True
+        return False
+
+    def _refresh_worker(self):
+        """后台刷新线程：队列清空后统一落盘"""
+        while True:
+            channel_id = self._queue.get()
+            try:
+                self._fetch(channel_id)
+            finally:
+                with self._lock:
+                    self._pending.discard(channel_id)
+            if self._queue.empty():
+                self.save()
@@ -2,25 +2,30 @@
 # -*- coding: utf-8 -*-
 """
 Cookie 管理器
-自动检测和更新 Chzzk Cookie
+自动检测和更新 Chzzk Cookie：优先使用 API 正常流量得出的健康状态，
+只有在最近没有流量时才发送探测请求
 """
 
 import json
 import logging
 import os
-import requests
 import time
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Tuple
 
+from api.account_pool import AccountPool
+from api.http_transport import get_cookie_health, get_session, get_timeout
+
 logger = logging.getLogger(__name__)
 
 class CookieManager:
-    def __init__(self, config_path: str = "config_local.json"):
+    def __init__(self, config_path: str = "config_local.json", account_pool: AccountPool = None):
         self.config_path = config_path
+        self.account_pool = account_pool  # 多账号时逐个检查并隔离失效账号
         self.config = self.load_config()
         self.last_check_time = None
         self.check_interval = 300  # 5分钟检查一次
+        self.last_valid = None
         
     def load_config(self) -> Dict:
         """加载配置文件"""
@@ -40,11 +45,11 @@ class CookieManager:
         except Exception as e:
             logger.error(f"Failed to save config: {e}")
     
-    def validate_cookies(self) -> bool:
-        """验证当前 Cookie 是否有效"""
+    def validate_cookies(self, nid_aut: str = None, nid_ses: str = None) -> bool:
+        """验证 Cookie 是否有效（默认验证配置中的 Cookie）"""
         try:
-            nid_aut = self.config.get('recording', {}).get('nid_aut', '')
-            nid_ses = self.config.get('recording', {}).get('nid_ses', '')
+            if nid_aut is None:
+                nid_aut, nid_ses = self.get_cookies()
             
             # 检查是否是占位符
             if (not nid_aut or not nid_ses or 
@@ -60,11 +65,11 @@ class CookieManager:
             cookies = {'NID_AUT': nid_aut, 'NID_SES': nid_ses}
             
             # 使用一个简单的 API 端点测试
-            response = requests.get(
+            response = get_session().get(
                 'https://api.chzzk.naver.com/service/v1/channels/7c992b6ba76eb14f84168df1da6ccdcb',
                 headers=headers,
                 cookies=cookies,
-                timeout=10
+                timeout=get_timeout()
             )
             
             if response.status_code == 200:
@@ -89,6 +94,32 @@ class CookieManager:
         time_since_last_check = time.time() - self.last_check_time
         return time_since_last_check >= self.check_interval
     
+    def get_cookie_validity(self, max_age: float = None, nid_aut: str = None, nid_ses: str = None) -> bool:
+        """获取 Cookie 有效性：最近 max_age 秒内有 API 流量时直接使用流量得出的结果，否则主动探测"""
+        max_age = self.check_interval if max_age is None else max_age
+        if nid_aut is None:
+            nid_aut, nid_ses = self.get_cookies()
+        valid = get_cookie_health().verdict(nid_aut, nid_ses, max_age=max_age)
+        if valid is None:
+            logger.info("No recent API traffic, probing cookie validity")
+            valid = self.validate_cookies(nid_aut, nid_ses)
+        return valid
+    
+    def check_accounts(self) -> bool:
+        """逐个检查账号池中的账号：隔离失效账号、恢复重新有效的账号，任一账号有效即返回True"""
+        accounts = [account for account in self.account_pool.accounts if account.cookies]
+        if not accounts:
+            return self.get_cookie_validity()
+        
+        any_valid = False
+        for account in accounts:
+            if self.get_cookie_validity(nid_aut=account.nid_aut, nid_ses=account.nid_ses):
+                self.account_pool.release(account)
+                any_valid = True
+            else:
+                self.account_pool.quarantine(account, 'cookie validation failed')
+        return any_valid
+    
     def check_and_update_cookies(self) -> bool:
         """检查并更新 Cookie（如果需要）"""
         if not self.should_check_cookies():
@@ -96,12 +127,16 @@ class CookieManager:
         
         self.last_check_time = time.time()
         
-        if self.validate_cookies():
-            logger.info("Cookie is still valid")
+        valid = self.check_accounts() if self.account_pool is not None else self.get_cookie_validity()
+        previous, self.last_valid = self.last_valid, valid
+        if valid:
+            if previous is False:
+                logger.info("Cookie is valid again")
             return True
         else:
             logger.warning("Cookie has expired, manual update required")
-            self.notify_cookie_expired()
+            if previous is not False:
+                self.notify_cookie_expired()
             return False
     
     def notify_cookie_expired(self):
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+录制时实时封装为分片 MP4
+录制数据（Chzzk 为 fMP4 分段，其他来源可能是 TS，由 ffmpeg 自行探测）通过管道交给 ffmpeg 以流复制方式写成 fragmented MP4（moov 在文件开头，每个关键帧一个分片），
+录制结束后不再需要整份重读重写的 TS→MP4 转换。录制中的文件以 .mp4.part 结尾，
+进程崩溃后只需截掉最后一个不完整的分片即可播放，收尾时改名为 .mp4（可选再做一次 faststart 整理）
+"""
+
+import logging
+import os
+import struct
+import subprocess
+import threading
+import time
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+PART_SUFFIX = '.part'
+FMP4_MOVFLAGS = '+frag_keyframe+empty_moov+default_base_moof'
+RECOVER_MIN_IDLE = 120  # 遗留文件至少这么多秒没有写入才收尾
+
+# 分片 MP4 中能作为可播放结尾的顶层 box（moof 之后必须跟完整的 mdat）
+_INIT_BOXES = {b'ftyp', b'moov', b'free', b'skip'}
+_END_BOXES = {b'mdat', b'mfra', b'sidx', b'styp'}
+
+
+def remux_output_path(rec_file_path: str) -> str:
+    """录制中的分片 MP4 路径（录制文件名换成 .mp4.part）"""
+    return os.path.splitext(rec_file_path)[0] + '.mp4' + PART_SUFFIX
+
+
+def recording_stem(path: str) -> str:
+    """去掉 .part 与扩展名后的录制文件路径"""
+    if path.endswith(PART_SUFFIX):
+        path = path[:-len(PART_SUFFIX)]
+    return os.path.splitext(path)[0]
+
+
+def remux_command(output_path: str, ffmpeg: str = 'ffmpeg') -> List[str]:
+    """从标准输入读取录制流、流复制写入分片 MP4 的 ffmpeg 命令（不指定输入格式：HLS 可能是 TS 也可能是 fMP4）"""
+    return [
+        ffmpeg, '-hide_banner', '-loglevel', 'warning', '-nostdin',
+        '-fflags', '+genpts+discardcorrupt',
+        '-i', 'pipe:0',
+        '-map', '0:v?', '-map', '0:a?',  # HLS 中的 timed ID3 等数据流无法写入 MP4
+        '-c', 'copy',
+        '-f', 'mp4', '-movflags', FMP4_MOVFLAGS,
+        '-y', output_path
+    ]
+
+
+def open_remuxer(output_path: str, ffmpeg: str = 'ffmpeg', stdin=subprocess.PIPE, stderr=subprocess.PIPE,
+                 **kwargs) -> subprocess.Popen:
+    return subprocess.Popen(remux_command(output_path, ffmpeg), stdin=stdin,
+                            stdout=subprocess.DEVNULL, stderr=stderr, **kwargs)
+
+
+class RemuxSink:
+    """进程内录制引擎使用的输出：写入的数据直接交给 ffmpeg 封装，ffmpeg 的输出逐行交给 on_log（默认写入日志）"""
+
+    def __init__(self, output_path: str, ffmpeg: str = 'ffmpeg', on_log: Callable[[str], None] = None):
+        self.output_path = output_path
+        self.on_log = on_log
+        self.process = subprocess.Popen(remux_command(output_path, ffmpeg), stdin=subprocess.PIPE,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        self._stderr_thread = threading.Thread(target=self._read_stderr, name="remux-stderr", daemon=True)
+        self._stderr_thread.start()
+
+    def _read_stderr(self):
+        for raw in iter(self.process.stderr.readline, b''):
+            line = raw.decode('utf-8', errors='replace').rstrip()
+            if not line:
+                continue
+            if self.on_log:
+                self.on_log(f"[ffmpeg][warning] {line}")
+            else:
+                logger.warning(f"ffmpeg ({self.output_path}): {line}")
+        self.process.stderr.close()
+
+    def write(self, data: bytes):
+        if self.process.poll() is not None:
+            raise IOError(f"ffmpeg exited with code {self.process.returncode}")
+        self.process.stdin.write(data)
+
+    def close(self, timeout: float = 30) -> int:
+        """关闭输入，等待 ffmpeg 写完最后一个分片"""
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            returncode = self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            returncode = self.process.wait()
+        self._stderr_thread.join(5)
+        if returncode:
+            message = f"ffmpeg exited with code {returncode} while remuxing {self.output_path}"
+            if self.on_log:
+                self.on_log(f"[ffmpeg][error] {message}")
+            else:
+                logger.error(message)
+        return returncode
+
+    def __enter__(self) -> 'RemuxSink':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RemuxPipeline:
+    """streamlink（输出到标准输出）与 ffmpeg 组成的录制管道，接口与 subprocess.Popen 一致"""
+    stdout = None
+    stderr = None
+
+    def __init__(self, source: subprocess.Popen, remuxer: subprocess.Popen):
+        self.source = source
+        self.remuxer = remuxer
+        self.pid = source.pid
+        self.args = source.args
+        self.pipes = [source.stderr, remuxer.stderr]  # 供 StreamlinkLogPump 读取
+
+    @property
+    def returncode(self) -> Optional[int]:
+        if self.source.returncode is None or self.remuxer.returncode is None:
+            return None
+        # streamlink 正常结束但 ffmpeg 出错时以 ffmpeg 的返回码为准
+        return self.source.returncode or self.remuxer.returncode
+
+    @property
+    def pids(self) -> List[int]:
+        return [self.source.pid, self.remuxer.pid]
+
+    def poll(self) -> Optional[int]:
+        self.source.poll()
+        self.remuxer.poll()
+        return self.returncode
+
+    def wait(self, timeout: float = None) -> int:
+        self.source.wait(timeout)
+        self.remuxer.wait(timeout)
+        return self.returncode
+
+    def terminate(self):
+        """只结束 streamlink，ffmpeg 读到输入结束后写完最后一个分片自行退出"""
+        self.source.terminate()
+
+    def kill(self):
+        self.source.kill()
+        self.remuxer.kill()
+
+
+def complete_length(path: str) -> int:
+    """扫描顶层 box，返回最后一个完整分片（moof+mdat）结束处的偏移，没有有效的初始化信息时返回0"""
+    size = os.path.getsize(path)
+    offset = good = 0
+    has_moov = False
+    with open(path, 'rb') as f:
+        while offset + 8 <= size:
+            f.seek(offset)
+            box_size, box_type = struct.unpack('>I4s', f.read(8))
+            header = 8
+            if box_size == 1:
+                if offset + 16 > size:
+                    break
+                box_size = struct.unpack('>Q', f.read(8))[0]
+                header = 16
+            elif box_size == 0:
+                box_size = size - offset
+            if box_size < header or offset + box_size > size:
+                break
+            offset += box_size
+            if box_type == b'moov':
+                has_moov = True
+            if box_type in _INIT_BOXES or box_type in _END_BOXES:
+                good = offset
+    return good if has_moov else 0
+
+
+def finalize_remux(part_path: str, faststart: bool = False, ffmpeg: str = 'ffmpeg') -> Optional[str]:
+    """收尾录制中的分片 MP4：截掉不完整的分片并改名为 .mp4，faststart 时再流复制整理为普通 MP4"""
+    if not os.path.exists(part_path):
+        return None
+    final_path = part_path[:-len(PART_SUFFIX)] if part_path.endswith(PART_SUFFIX) else part_path
+    size = os.path.getsize(part_path)
+    length = complete_length(part_path)
+    if length == 0:
+        logger.warning(f"No playable data in {part_path}, leaving it in place")
+        return None
+    if length < size:
+        logger.warning(f"Truncating incomplete fragment from {part_path} ({size - length} bytes)")
+        with open(part_path, 'r+b') as f:
+            f.truncate(length)
+
+    if faststart:
+        tmp_path = final_path + '.faststart' + PART_SUFFIX
+        result = subprocess.run([ffmpeg, '-hide_banner', '-loglevel', 'error', '-y', '-i', part_path,
+                                 '-c', 'copy', '-f', 'mp4', '-movflags', '+faststart', tmp_path],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if result.returncode == 0:
+            os.replace(tmp_path, final_path)
+            os.remove(part_path)
+            return final_path
+        logger.warning(f"Faststart pass failed for {part_path}, keeping the fragmented file: "
+                       f"{result.stderr.decode('utf-8', errors='replace').strip()[-200:]}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    os.replace(part_path, final_path)
+    return final_path
+
+
+def recover_partial_files(root: str, is_active: Callable[[str], bool] = None, faststart: bool = False,
+                          ffmpeg: str = 'ffmpeg', min_idle: float = RECOVER_MIN_IDLE) -> List[str]:
+    """
+    收尾录制端崩溃后遗留的 .mp4.part 文件。扫描与录制同时进行，is_active 在收尾每个文件前调用，
+    跳过正在录制或后处理中的文件；最近 min_idle 秒内仍有写入的文件也跳过（可能属于未被接管的进程）
+    """
+    recovered = []
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            if not name.endswith('.mp4' + PART_SUFFIX) or (is_active and is_active(path)):
+                continue
+            try:
+                if time.time() - os.path.getmtime(path) < min_idle:
+                    logger.info(f"Skipping recently written partial file: {path}")
+                    continue
+            except OSError:
+                continue
+            final_path = finalize_remux(path, faststart=faststart, ffmpeg=ffmpeg)
+            if final_path:
+                logger.info(f"Recovered interrupted recording: {final_path}")
+                recovered.append(final_path)
+    return recovered
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+运行时状态共享
+录制端按分区（如 breakers）把运行状态写入临时目录下的状态文件，Web 面板读取后展示；
+写入时先写临时文件再原子替换，读取方不会看到写了一半的内容
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_PATH = os.path.join(tempfile.gettempdir(), 'chzzk_recorder_state.json')
+
+_lock = threading.Lock()
+_sections: Dict[str, Dict] = {}
+
+
+def publish_state(section: str, data, state_path: str = DEFAULT_STATE_PATH):
+    """更新本进程的某个状态分区并写入状态文件"""
+    with _lock:
+        _sections[section] = data
+        snapshot = {'updated': time.time(), 'pid': os.getpid(), **_sections}
+        tmp_path = f'{state_path}.{os.getpid()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.replace(tmp_path, state_path)
+        except OSError as e:
+            logger.warning(f"Failed to write runtime state {state_path}: {e}")
+
+
+def read_state(state_path: str = DEFAULT_STATE_PATH) -> Dict:
+    """读取录制端发布的运行状态，文件不存在或损坏时返回空字典"""
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
@@ -8,18 +8,24 @@ import json
 import logging
 import os
 import psutil
-import requests
+import sys
 import time
 import subprocess
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from api.http_transport import get_cookie_health, get_session, get_timeout
+
 class SystemMonitor:
     def __init__(self, config_file: str = 'config.json'):
         """初始化系统监控"""
         self.config = self.load_config(config_file)
         self.setup_logging()
         self.monitor_interval = 60  # 检查间隔（秒）
+        self.cookie_check_max_age = 300  # 超过该时间没有API流量才主动检查Cookie（秒）
         self.last_check = {}
         
     def load_config(self, config_file: str) -> Dict:
@@ -89,9 +95,9 @@ class SystemMonitor:
         """检查API连接性"""
         try:
             # 测试Chzzk API连接
-            response = requests.get(
+            response = get_session().get(
                 'https://api.chzzk.naver.com/service/v1/channels/7c992b6ba76eb14f84168df1da6ccdcb',
-                timeout=5  # 减少超时时间
+                timeout=get_timeout()
             )
             
             if response.status_code == 200:
@@ -138,15 +144,22 @@ class SystemMonitor:
                 self.logger.error("Cookie配置缺失")
                 return False
             
+            # 录制端等进程近期的API流量已得出结果时直接使用，避免额外请求
+            valid = get_cookie_health().verdict(nid_aut, nid_ses, max_age=self.cookie_check_max_age)
+            if valid is not None:
+                if not valid:
+                    self.logger.error("Cookie可能已过期（来自API流量）")
+                return valid
+            
             # 测试API调用
             headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
             cookies = {'NID_AUT': nid_aut, 'NID_SES': nid_ses}
             
-            response = requests.get(
+            response = get_session().get(
                 'https://api.chzzk.naver.com/service/v1/channels/7c992b6ba76eb14f84168df1da6ccdcb',
                 headers=headers,
                 cookies=cookies,
-                timeout=10
+                timeout=get_timeout()
             )
             
             if response.status_code == 200:
@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+续录片段无损合并
+录制进程重启或续录时写出的 *_resume_<ts>.ts 片段与前一个文件在时间上通常有重叠（新进程从直播边缘的前几个分段开始下载）。
+合并时按 PTS 找到切点：片段开头的关键帧也出现在前一个文件末尾时，在该关键帧处截断前一个文件、从同一关键帧接上片段
+（同一 HLS 分段的数据完全相同，无缝且不丢帧）；找不到相同关键帧时丢弃片段中 PTS 不晚于前一个文件的 PES。
+片段直接追加到前一个文件末尾（流复制、只读写一遍片段），各 PID 的连续计数器不连续时插入带 discontinuity_indicator 的空包。
+Chzzk 的 HLS 为 fMP4（写入 .ts 文件名）：按 moof+mdat 分片合并，初始化信息（moov）必须相同，
+片段中各轨道 tfdt 不晚于前一个文件最后一个分片的分片丢弃，其余分片追加到前一个文件末尾
+"""
+
+import logging
+import os
+import re
+import shutil
+import struct
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TS_PACKET_SIZE = 188
+PTS_WRAP = 1 << 33
+MAX_OVERLAP = 10 * 60 * 90000  # 片段开头早于前一个文件结尾超过10分钟时视为新的时间轴，不裁剪
+TAIL_WINDOW = 32 * 1024 * 1024  # 在前一个文件末尾查找关键帧的范围
+HEAD_WINDOW = 64 * 1024 * 1024  # 在片段开头查找切点的范围
+NULL_PID = 0x1FFF
+
+MAX_OVERLAP_SECONDS = 10 * 60  # fMP4 片段开头早于前一个文件结尾超过10分钟时视为时间轴重新开始
+CONTAINER_TS = 'ts'
+CONTAINER_FMP4 = 'fmp4'
+
+VIDEO_STREAM_TYPES = {0x01, 0x02, 0x10, 0x1B, 0x24}
+RESUME_FRAGMENT_RE = re.compile(r'_resume_\d+')
+
+
+class MergeError(Exception):
+    """两个文件无法安全合并（流结构不同、数据未按 TS 包对齐等）"""
+
+
+def is_resume_fragment(path: str) -> bool:
+    return bool(RESUME_FRAGMENT_RE.search(os.path.basename(path)))
+
+
+def group_fragments(paths: List[str]) -> List[List[str]]:
+    """按录制顺序把文件分组：每个非续录文件（首个文件或分段）与其后的续录片段为一组"""
+    groups: List[List[str]] = []
+    for path in paths:
+        if groups and is_resume_fragment(path):
+            groups[-1].append(path)
+        else:
+            groups.append([path])
+    return groups
+
+
+def pts_distance(a: int, b: int) -> int:
+    """b 相对 a 的 PTS 差（考虑33位回绕）"""
+    d = (b - a) % PTS_WRAP
+    return d - PTS_WRAP if d >= PTS_WRAP // 2 else d
+
+
+def _parse_pts(data: bytes) -> int:
+    return (((data[0] >> 1) & 0x07) << 30 | data[1] << 22 | (data[2] >> 1) << 15 | data[3] << 7 | data[4] >> 1)
+
+
+def _is_keyframe(stream_type: int, es: bytes) -> bool:
+    """PES 开头是否包含 IDR/IRAP 帧或参数集（H.264/HEVC），其他编码只看 random_access_indicator"""
+    start = es.find(b'\x00\x00\x01')
+    while 0 <= start < len(es) - 3:
+        header = es[start + 3]
+        if stream_type == 0x1B and header & 0x1F in (5, 7):
+            return True
+        if stream_type == 0x24 and (16 <= (header >> 1) & 0x3F <= 21 or 32 <= (header >> 1) & 0x3F <= 34):
+            return True
+        start = es.find(b'\x00\x00\x01', start + 3)
+    return False
+
+
+class _Packet:
+    __slots__ = ('pid', 'cc', 'has_payload', 'pts', 'keyframe', 'pes_start')
+
+    def __init__(self):
+        self.pid = 0
+        self.cc = 0
+        self.has_payload = False
+        self.pts: Optional[int] = None
+        self.keyframe = False
+        self.pes_start = False
+
+
+class _Demuxer:
+    """逐包解析 PAT/PMT 与 PES 头，记录各基本流的类型"""
+
+    def __init__(self):
+        self.pmt_pids = set()
+        self.streams: Dict[int, int] = {}  # pid -> stream_type
+
+    def parse(self, packet: bytes) -> _Packet:
+        if packet[0] != 0x47:
+            raise MergeError("lost TS sync")
+        info = _Packet()
+        info.pid = (packet[1] & 0x1F) << 8 | packet[2]
+        pusi = packet[1] & 0x40
+        afc = (packet[3] >> 4) & 0x03
+        info.cc = packet[3] & 0x0F
+        info.has_payload = bool(afc & 0x01)
+        offset = 4
+        rai = False
+        if afc & 0x02:
+            length = packet[4]
+            rai = length > 0 and bool(packet[5] & 0x40)
+            offset = 5 + length
+        if not info.has_payload or not pusi or offset >= TS_PACKET_SIZE:
+            return info
+        payload = packet[offset:]
+
+        if info.pid == 0:
+            self._parse_pat(payload)
+        elif info.pid in self.pmt_pids:
+            self._parse_pmt(payload)
+        elif info.pid in self.streams and payload[:3] == b'\x00\x00\x01' and len(payload) >= 14:
+            info.pes_start = True
+            if payload[7] & 0x80:
+                info.pts = _parse_pts(payload[9:14])
+            stream_type = self.streams[info.pid]
+            if stream_type in VIDEO_STREAM_TYPES:
+                info.keyframe = rai or _is_keyframe(stream_type, payload[9 + payload[8]:])
+        return info
+
+    def _section(self, payload: bytes) -> bytes:
+        section = payload[1 + payload[0]:]
+        length = (section[1] & 0x0F) << 8 | section[2] if len(section) >= 3 else 0
+        return section[:3 + length]
+
+    def _parse_pat(self, payload: bytes):
+        section = self._section(payload)
+        for i in range(8, len(section) - 4, 4):
+            if section[i] << 8 | section[i + 1]:  # program_number 0 为 NIT
+                self.pmt_pids.add((section[i + 2] & 0x1F) << 8 | section[i + 3])
+
+    def _parse_pmt(self, payload: bytes):
+        section = self._section(payload)
+        if len(section) < 12 or section[0] != 0x02:
+            return
+        i = 12 + ((section[10] & 0x0F) << 8 | section[11])
+        while i + 5 <= len(section) - 4:
+            pid = (section[i + 1] & 0x1F) << 8 | section[i + 2]
+            self.streams[pid] = section[i]
+            i += 5 + ((section[i + 3] & 0x0F) << 8 | section[i + 4])
+
+
+def _packets(f, start: int, end: int):
+    """从 start 到 end 逐包读取，产生 (偏移, 包)"""
+    f.seek(start)
+    offset = start
+    while offset < end:
+        chunk = f.read(min(TS_PACKET_SIZE * 4096, end - offset))
+        if len(chunk) < TS_PACKET_SIZE:
+            return
+        for i in range(0, len(chunk) - TS_PACKET_SIZE + 1, TS_PACKET_SIZE):
+            yield offset + i, chunk[i:i + TS_PACKET_SIZE]
+        offset += len(chunk) - len(chunk) % TS_PACKET_SIZE
+
+
+def _bridge_packet(pid: int, cc: int) -> bytes:
+    """只有适配字段、设置 discontinuity_indicator 的包，之后的包连续计数器从 cc+1 开始"""
+    return bytes([0x47, (pid >> 8) & 0x1F, pid & 0xFF, 0x20 | (cc & 0x0F), 183, 0x80]) + b'\xff' * 182
+
+
+class _Tail:
+    """前一个文件末尾的扫描结果"""
+
+    def __init__(self, path: str):
+        self.size = os.path.getsize(path) // TS_PACKET_SIZE * TS_PACKET_SIZE  # 去掉崩溃时写了一半的包
+        self.start = max(0, self.size - TAIL_WINDOW) // TS_PACKET_SIZE * TS_PACKET_SIZE
+        self.demuxer = _Demuxer()
+        self.keyframes: Dict[int, int] = {}  # 视频关键帧 PTS -> 所在 PES 第一个包的偏移
+        self.max_pts: Dict[int, int] = {}
+        with open(path, 'rb') as f:
+            for offset, packet in _packets(f, self.start, self.size):
+                info = self.demuxer.parse(packet)
+                if info.pts is None:
+                    continue
+                if info.pid not in self.max_pts or pts_distance(self.max_pts[info.pid], info.pts) > 0:
+                    self.max_pts[info.pid] = info.pts
+                if info.keyframe:
+                    self.keyframes[info.pts] = offset
+        if not self.demuxer.streams:
+            raise MergeError("no PMT near the end of the file")
+
+    def last_cc(self, path: str, end: int) -> Dict[int, int]:
+        """切点之前各 PID 最后一个带负载的包的连续计数器"""
+        counters = {}
+        with open(path, 'rb') as f:
+            for _, packet in _packets(f, self.start, end):
+                if packet[3] & 0x10:
+                    counters[(packet[1] & 0x1F) << 8 | packet[2]] = packet[3] & 0x0F
+        counters.pop(NULL_PID, None)
+        return counters
+
+
+def append_fragment(target: str, fragment: str) -> Dict:
+    """把续录片段去掉重叠后追加到 target 末尾，返回合并信息"""
+    tail = _Tail(target)
+    video_pids = [pid for pid, stream_type in tail.demuxer.streams.items() if stream_type in VIDEO_STREAM_TYPES]
+
+    # 在片段开头找第一个视频关键帧
+    head = _Demuxer()
+    first_keyframe: Optional[Tuple[int, int]] = None
+    with open(fragment, 'rb') as f:
+        size = os.path.getsize(fragment) // TS_PACKET_SIZE * TS_PACKET_SIZE
+        for offset, packet in _packets(f, 0, min(size, HEAD_WINDOW)):
+            info = head.parse(packet)
+            if info.keyframe and info.pts is not None:
+                first_keyframe = (info.pts, offset)
+                break
+    if head.streams != tail.demuxer.streams:
+        raise MergeError(f"stream layout differs ({head.streams} vs {tail.demuxer.streams})")
+    if first_keyframe is None or not video_pids:
+        raise MergeError("no video keyframe at the start of the fragment")
+
+    key_pts, key_offset = first_keyframe
+    overlap = pts_distance(key_pts, max(tail.max_pts.get(pid, key_pts) for pid in video_pids))
+    if key_pts in tail.keyframes:
+        # 同一个关键帧：前一个文件从该帧截断，片段从该帧开始
+        mode, cut_target, cut_fragment = 'aligned', tail.keyframes[key_pts], key_offset
+    elif abs(overlap) > MAX_OVERLAP:
+        # 时间轴不同（编码器重启等），整段追加
+        mode, cut_target, cut_fragment = 'append', tail.size, 0
+    else:
+        # 重叠或有缺口：丢弃片段开头不晚于前一个文件结尾的 PES
+        mode, cut_target, cut_fragment = 'trim', tail.size, 0
+
+    counters = tail.last_cc(target, cut_target)
+    pending = set(counters)  # 还没在片段中出现过的 PID（可能需要插入过渡包）
+    dropping = {pid for pid in tail.max_pts} if mode == 'trim' else set()
+    demuxer = _Demuxer() if mode == 'trim' else None
+    dropped = bridges = 0
+
+    with open(target, 'r+b') as out, open(fragment, 'rb') as src:
+        out.truncate(cut_target)
+        out.seek(cut_target)
+        try:
+            offset = cut_fragment
+            for offset, packet in _packets(src, cut_fragment, size):
+                if not pending and not dropping:
+                    break
+                pid = (packet[1] & 0x1F) << 8 | packet[2]
+                if demuxer is not None:
+                    info = demuxer.parse(packet)
+                    if pid in dropping:
+                        last = tail.max_pts[pid]
+                        if info.pts is not None and pts_distance(last, info.pts) > 0 and \
+                                (info.keyframe or tail.demuxer.streams.get(pid) not in VIDEO_STREAM_TYPES):
+                            dropping.discard(pid)
+                        else:
+                            dropped += 1
+                            continue
+                if pid in pending:
+                    pending.discard(pid)
+                    cc = packet[3] & 0x0F
+                    expected = (counters[pid] + 1) & 0x0F if packet[3] & 0x10 else counters[pid]
+                    if cc != expected:
+                        out.write(_bridge_packet(pid, cc - 1 if packet[3] & 0x10 else cc))
+                        bridges += 1
+                out.write(packet)
+            else:
+                offset = size
+            # 剩余部分直接复制
+            src.seek(offset)
+            remaining = size - offset
+            while remaining > 0:
+                chunk = src.read(min(1024 * 1024, remaining))
+                if not chunk:
+                    break
+                out.write(chunk)
+                remaining -= len(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+        except BaseException:
+            # 片段保留，去掉写了一半的内容（截断部分的数据片段中也有）
+            out.truncate(cut_target)
+            raise
+
+    return {
+        'mode': mode,
+        'trimmed_bytes': tail.size - cut_target + cut_fragment + dropped * TS_PACKET_SIZE,
+        'bridges': bridges
+    }
+
+
+def detect_container(path: str) -> Optional[str]:
+    """按文件开头判断是 MPEG-TS 还是分片 MP4，都不是时返回None"""
+    with open(path, 'rb') as f:
+        head = f.read(TS_PACKET_SIZE + 1)
+    if len(head) >= 8 and head[4:8] in (b'ftyp', b'styp', b'moov', b'moof'):
+        return CONTAINER_FMP4
+    if head[:1] == b'\x47' and (len(head) <= TS_PACKET_SIZE or head[TS_PACKET_SIZE] == 0x47):
+        return CONTAINER_TS
+    return None
+
+
+def _child_boxes(data: bytes, start: int = 0, end: int = None):
+    """遍历内存中的 box，产生 (类型, 内容开始, 结束)"""
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end:
+        size, kind = struct.unpack_from('>I4s', data, offset)
+        header = 8
+        if size == 1:
+            if offset + 16 > end:
+                return
+            size = struct.unpack_from('>Q', data, offset + 8)[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header or offset + size > end:
+            return
+        yield kind, offset + header, offset + size
+        offset += size
+
+
+def _find_box(data: bytes, path: List[bytes], start: int = 0, end: int = None) -> List[Tuple[int, int]]:
+    """按路径查找子 box（每一级可能有多个），返回各自的 (内容开始, 结束)"""
+    found = []
+    for kind, content, box_end in _child_boxes(data, start, end):
+        if kind == path[0]:
+            found.extend([(content, box_end)] if len(path) == 1 else _find_box(data, path[1:], content, box_end))
+    return found
+
+
+class _FragmentedMP4:
+    """分片 MP4 的顶层结构：初始化信息（moov）与各分片（从上一个 mdat 之后到本分片的 mdat 结束）"""
+
+    def __init__(self, path: str):
+        self.moov: Optional[bytes] = None
+        self.timescales: Dict[int, int] = {}  # track_ID -> timescale
+        self.units: List[Tuple[int, int, Dict[int, int]]] = []  # (开始, 结束, track_ID -> tfdt)
+        self.end = 0  # 最后一个完整分片（或初始化信息）结束处，之后是崩溃时写了一半的数据
+        size = os.path.getsize(path)
+        unit_start, times = None, None
+        with open(path, 'rb') as f:
+            offset = 0
+            while offset + 8 <= size:
+                f.seek(offset)
+                box_size, kind = struct.unpack('>I4s', f.read(8))
+                header = 8
+                if box_size == 1:
+                    box_size = struct.unpack('>Q', f.read(8))[0]
+                    header = 16
+                elif box_size == 0:
+                    box_size = size - offset
+                if box_size < header or offset + box_size > size:
+                    break
+                if unit_start is None:
+                    unit_start = offset
+                if kind == b'moov':
+                    if self.units:
+                        raise MergeError("initialization segment changes within the file")
+                    f.seek(offset)
+                    self.moov = f.read(box_size)
+                    self._parse_moov()
+                    unit_start, self.end = None, offset + box_size
+                elif kind == b'moof':
+                    f.seek(offset)
+                    times = self._parse_moof(f.read(box_size))
+                elif kind == b'mdat' and times is not None:
+                    self.units.append((unit_start, offset + box_size, times))
+                    unit_start, times, self.end = None, None, offset + box_size
+                elif kind in (b'ftyp', b'free', b'skip') and not self.units and self.moov is None:
+                    unit_start, self.end = None, offset + box_size
+                offset += box_size
+        if self.moov is None:
+            raise MergeError("no initialization segment (moov)")
+
+    def _parse_moov(self):
+        for trak, trak_end in _find_box(self.moov, [b'moov', b'trak']):
+            tkhd = _find_box(self.moov, [b'tkhd'], trak, trak_end)
+            mdhd = _find_box(self.moov, [b'mdia', b'mdhd'], trak, trak_end)
+            if not tkhd or not mdhd:
+                continue
+            start = tkhd[0][0]
+            track_id = struct.unpack_from('>I', self.moov, start + (20 if self.moov[start] == 1 else 12))[0]
+            start = mdhd[0][0]
+            timescale = struct.unpack_from('>I', self.moov, start + (20 if self.moov[start] == 1 else 12))[0]
+            self.timescales[track_id] = timescale
+
+    @staticmethod
+    def _parse_moof(moof: bytes) -> Dict[int, int]:
+        times = {}
+        for traf, traf_end in _find_box(moof, [b'moof', b'traf']):
+            tfhd = _find_box(moof, [b'tfhd'], traf, traf_end)
+            tfdt = _find_box(moof, [b'tfdt'], traf, traf_end)
+            if not tfhd or not tfdt:
+                raise MergeError("fragment without tfhd/tfdt")
+            track_id = struct.unpack_from('>I', moof, tfhd[0][0] + 4)[0]
+            start = tfdt[0][0]
+            times[track_id] = struct.unpack_from('>Q' if moof[start] == 1 else '>I', moof, start + 4)[0]
+        return times
+
+    def last_times(self) -> Dict[int, int]:
+        last = {}
+        for _, _, times in self.units:
+            for track_id, time in times.items():
+                last[track_id] = max(last.get(track_id, time), time)
+        return last
+
+
+def append_fmp4_fragment(target: str, fragment: str) -> Dict:
+    """把分片 MP4 的续录片段去掉重叠分片后追加到 target 末尾（先截掉 target 末尾不完整的分片）"""
+    tail = _FragmentedMP4(target)
+    head = _FragmentedMP4(fragment)
+    if head.moov != tail.moov:
+        raise MergeError("initialization segment differs")
+    last = tail.last_times()
+    if head.units and last:
+        first = head.units[0][2]
+        for track_id, time in first.items():
+            if track_id in last and last[track_id] - time > MAX_OVERLAP_SECONDS * tail.timescales.get(track_id, 1):
+                raise MergeError("fragment timeline restarted")
+    keep = next((index for index, (_, _, times) in enumerate(head.units)
+                 if any(time > last.get(track_id, -1) for track_id, time in times.items())), len(head.units))
+
+    with open(target, 'r+b') as out, open(fragment, 'rb') as src:
+        out.truncate(tail.end)
+        out.seek(tail.end)
+        start = head.units[keep][0] if keep < len(head.units) else head.end
+        try:
+            src.seek(start)
+            remaining = head.end - start
+            while remaining > 0:
+                chunk = src.read(min(1024 * 1024, remaining))
+                if not chunk:
+                    break
+                out.write(chunk)
+                remaining -= len(chunk)
+            out.flush()
+            os.fsync(out.fileno())
+        except BaseException:
+            out.truncate(tail.end)
+            raise
+
+    return {
+        'mode': 'fmp4',
+        'trimmed_bytes': start,
+        'dropped_fragments': keep
+    }
+
+
+def merge_fragments(paths: List[str]) -> List[str]:
+    """把续录片段依次合并到第一个文件（TS 或分片 MP4），成功合并的片段删除；返回合并后剩下的文件"""
+    outputs = [paths[0]]
+    for fragment in paths[1:]:
+        target = outputs[-1]
+        try:
+            if not os.path.exists(fragment) or os.path.getsize(fragment) < TS_PACKET_SIZE:
+                logger.info(f"Skipping empty fragment {fragment}")
+                if os.path.exists(fragment):
+                    os.remove(fragment)
+                continue
+            if not os.path.exists(target) or os.path.getsize(target) < TS_PACKET_SIZE:
+                # 前一个文件为空，片段直接作为合并目标
+                shutil.move(fragment, target)
+                continue
+            container = detect_container(target)
+            if container is None or detect_container(fragment) != container:
+                logger.warning(f"Not merging {fragment} into {target}: unsupported or mismatched container "
+                               f"({container} vs {detect_container(fragment)}), keeping it separate")
+                outputs.append(fragment)
+                continue
+            if container == CONTAINER_FMP4:
+                result = append_fmp4_fragment(target, fragment)
+            else:
+                result = append_fragment(target, fragment)
+            os.remove(fragment)
+            logger.info(f"Merged {os.path.basename(fragment)} into {os.path.basename(target)} "
+                        f"({result['mode']}, {result['trimmed_bytes']} overlapping bytes dropped)")
+        except (MergeError, OSError) as e:
+            logger.warning(f"Cannot merge {fragment} into {target}, keeping it separate: {e}")
+            outputs.append(fragment)
+    return outputs
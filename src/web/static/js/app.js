@@ -42,6 +42,9 @@ class RecorderPanel {
                 this.loadChannels(),
                 this.loadConfig(),
                 this.loadStatus(),
+                this.loadHealth(),
+                this.loadLatency(),
+                this.loadRecordings(),
                 this.loadLogs()
             ]);
         } catch (error) {
@@ -83,6 +86,122 @@ class RecorderPanel {
         }
     }
 
+    async loadHealth() {
+        try {
+            const response = await fetch('/api/health');
+            const health = await response.json();
+            this.renderHealth(health);
+        } catch (error) {
+            console.error('Failed to load API health:', error);
+        }
+    }
+
+    renderHealth(health) {
+        const container = document.getElementById('api-health');
+        // 录制端的统计优先，Web面板自身的请求作为补充
+        const breakers = Object.assign({}, health.web_panel || {}, health.recorder || {});
+        const names = Object.keys(breakers);
+        if (names.length === 0) {
+            container.innerHTML = `<span class="text-muted">${t('dashboard.no_api_data')}</span>`;
+            return;
+        }
+        const classes = {closed: 'text-success', half_open: 'text-warning', open: 'text-danger'};
+        container.innerHTML = names.map(name => {
+            const breaker = breakers[name];
+            const retry = breaker.state === 'open' ? ` (${Math.ceil(breaker.retry_in)}s)` : '';
+            return `<div>
+                <span class="fw-bold ${classes[breaker.state] || ''}">${name}</span>:
+                ${t('dashboard.breaker_' + breaker.state)}${retry},
+                ${(breaker.failure_rate * 100).toFixed(0)}% / ${breaker.window}
+            </div>`;
+        }).join('');
+    }
+
+    async loadLatency() {
+        try {
+            const response = await fetch('/api/latency');
+            const latency = await response.json();
+            this.renderLatency(latency.overall || {});
+        } catch (error) {
+            console.error('Failed to load go-live latency:', error);
+        }
+    }
+
+    renderLatency(overall) {
+        const container = document.getElementById('golive-latency');
+        const metrics = ['detection', 'spawn', 'first_byte'].filter(name => overall[name] && overall[name].count > 0);
+        if (metrics.length === 0) {
+            container.innerHTML = `<span class="text-muted">${t('dashboard.no_latency_data')}</span>`;
+            return;
+        }
+        container.innerHTML = metrics.map(name => {
+            const stats = overall[name];
+            return `<div>
+                <span class="fw-bold">${t('dashboard.latency_' + name)}</span>:
+                ${stats.p50.toFixed(1)}s / ${stats.p95.toFixed(1)}s (n=${stats.count})
+            </div>`;
+        }).join('');
+    }
+
+    async loadRecordings() {
+        try {
+            const response = await fetch('/api/recordings');
+            const data = await response.json();
+            this.renderRecordings(data.recordings || {}, (data.stalls || {}).channels || {});
+            this.renderQueue(data.queue || {});
+        } catch (error) {
+            console.error('Failed to load recording throughput:', error);
+        }
+    }
+
+    renderRecordings(recordings, stalls = {}) {
+        const container = document.getElementById('recording-throughput');
+        const channelIds = Object.keys(recordings);
+        if (channelIds.length === 0) {
+            container.innerHTML = `<span class="text-muted">${t('dashboard.no_recordings')}</span>`;
+            return;
+        }
+        const formatSize = bytes => bytes >= 1024 ** 3
+            ? `${(bytes / 1024 ** 3).toFixed(2)} GiB`
+            : `${(bytes / 1024 ** 2).toFixed(1)} MiB`;
+        container.innerHTML = channelIds.map(channelId => {
+            const stats = recordings[channelId];
+            const channel = (this.channels || []).find(item => item.channel_id === channelId);
+            const name = channel ? channel.channel_name : channelId.slice(0, 8);
+            const bitrate = (stats.speed * 8 / 1e6).toFixed(1);
+            const quality = stats.quality ? ` ${stats.quality}` : '';
+            const restarts = stats.restarts > 0 ? `, ${t('dashboard.recording_restarts')} ${stats.restarts}` : '';
+            const parts = stats.parts > 1 ? `, ${t('dashboard.recording_part')} ${stats.parts}` : '';
+            const stall = stalls[channelId] || {};
+            const stallCount = stall.stalls > 0
+                ? `, <span class="text-warning">${t('dashboard.recording_stalls')} ${stall.stalls}</span>` : '';
+            return `<div>
+                <span class="fw-bold">${name}</span>${quality}:
+                ${bitrate} Mbps, ${formatSize(stats.bytes_written)},
+                ${stats.segments} ${t('dashboard.recording_segments')}${restarts}${parts}${stallCount}
+            </div>`;
+        }).join('');
+    }
+
+    renderQueue(queue) {
+        const container = document.getElementById('recording-queue');
+        const waiting = queue.waiting || [];
+        if (waiting.length === 0) {
+            container.innerHTML = `<span class="text-muted">${t('dashboard.no_queue')}</span>`;
+            return;
+        }
+        container.innerHTML = waiting.map(entry => {
+            const channel = (this.channels || []).find(item => item.channel_id === entry.channel_id);
+            const name = channel ? channel.channel_name : entry.channel_id.slice(0, 8);
+            return `<div>
+                #${entry.position} <span class="fw-bold">${name}</span>
+                (${t('dashboard.queue_priority')} ${entry.priority}):
+                ${t('dashboard.queue_reason_' + entry.reason)}, ${Math.round(entry.waiting)}s
+                <span class="text-muted">(${queue.active}/${queue.max_concurrent})</span>
+            </div>`;
+        }).join('');
+    }
+
     async loadLogs() {
         try {
             const response = await fetch('/api/logs');
@@ -127,6 +246,9 @@ class RecorderPanel {
         const statusClass = channel.is_live ? 'status-live' : 'status-offline';
         const statusText = channel.is_live ? t('channels.live') : t('channels.offline');
         const viewerCount = channel.viewer_count ? channel.viewer_count.toLocaleString() : '0';
+        const suspectBadge = channel.suspect
+            ? `<span class="badge bg-warning text-dark ms-1" title="${channel.suspect_reason}">${t('channels.suspect')}</span>`
+            : '';
         
         row.innerHTML = `
             <td>
@@ -143,7 +265,7 @@ class RecorderPanel {
                 <code class="small">${channel.channel_id}</code>
             </td>
             <td>
-                <span class="badge ${statusClass}">${statusText}</span>
+                <span class="badge ${statusClass}">${statusText}</span>${suspectBadge}
             </td>
             <td>
                 <span class="text-muted">${viewerCount}</span>
@@ -317,6 +439,9 @@ class RecorderPanel {
         // 每30秒刷新一次状态
         setInterval(() => {
             this.loadStatus();
+            this.loadHealth();
+            this.loadLatency();
+            this.loadRecordings();
         }, 30000);
 
         // 每60秒刷新一次日志
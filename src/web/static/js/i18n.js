@@ -23,7 +23,29 @@ const i18n = {
             quick_actions: "Quick Actions",
             system_info: "System Information",
             recorder_status: "Recorder Status",
-            web_panel_status: "Web Panel Status"
+            web_panel_status: "Web Panel Status",
+            api_health: "API Health",
+            breaker_closed: "Healthy",
+            breaker_open: "Circuit Open",
+            breaker_half_open: "Probing",
+            no_api_data: "No API requests yet",
+            golive_latency: "Go-live Latency (p50 / p95)",
+            latency_detection: "Detection",
+            latency_spawn: "Spawn",
+            latency_first_byte: "First Byte",
+            no_latency_data: "No go-live observed yet",
+            recording_throughput: "Recording Throughput",
+            recording_segments: "segments",
+            recording_restarts: "restarts",
+            recording_part: "part",
+            recording_stalls: "stalls",
+            no_recordings: "Not recording",
+            recording_queue: "Recording Queue",
+            queue_priority: "priority",
+            queue_reason_capacity: "next free slot",
+            queue_reason_priority: "behind higher-priority channels",
+            queue_reason_order: "behind earlier channels",
+            no_queue: "No channels waiting"
         },
         channels: {
             title: "Channel Management",
@@ -37,6 +59,7 @@ const i18n = {
             live: "Live",
             offline: "Offline",
             recording: "Recording",
+            suspect: "Suspect",
             no_channels: "No channels found. Click 'Add Channel' to start recording.",
             id_help: "Enter the channel ID or username from chzzk.naver.com",
             preview: "Preview Channel"
@@ -159,7 +182,29 @@ const i18n = {
             quick_actions: "快速操作",
             system_info: "系统信息",
             recorder_status: "录制器状态",
-            web_panel_status: "Web面板状态"
+            web_panel_status: "Web面板状态",
+            api_health: "接口健康度",
+            breaker_closed: "正常",
+            breaker_open: "已熔断",
+            breaker_half_open: "探测中",
+            no_api_data: "暂无接口请求",
+            golive_latency: "开播录制延迟 (p50 / p95)",
+            latency_detection: "检测",
+            latency_spawn: "进程启动",
+            latency_first_byte: "首字节",
+            no_latency_data: "尚未观察到开播",
+            recording_throughput: "录制吞吐量",
+            recording_segments: "个分段",
+            recording_restarts: "重启",
+            recording_part: "分段",
+            recording_stalls: "停滞",
+            no_recordings: "未在录制",
+            recording_queue: "录制队列",
+            queue_priority: "优先级",
+            queue_reason_capacity: "等待空闲名额",
+            queue_reason_priority: "排在更高优先级频道之后",
+            queue_reason_order: "排在更早开播的频道之后",
+            no_queue: "没有等待中的频道"
         },
         channels: {
             title: "频道管理",
@@ -173,6 +218,7 @@ const i18n = {
             live: "直播中",
             offline: "离线",
             recording: "录制中",
+            suspect: "疑似失效",
             no_channels: "暂无频道，点击'添加频道'开始录制",
             id_help: "输入来自chzzk.naver.com的频道ID或用户名",
             preview: "预览频道"
@@ -295,7 +341,29 @@ const i18n = {
             quick_actions: "빠른 작업",
             system_info: "시스템 정보",
             recorder_status: "녹화기 상태",
-            web_panel_status: "웹 패널 상태"
+            web_panel_status: "웹 패널 상태",
+            api_health: "API 상태",
+            breaker_closed: "정상",
+            breaker_open: "차단됨",
+            breaker_half_open: "확인 중",
+            no_api_data: "API 요청 없음",
+            golive_latency: "방송 시작 감지 지연 (p50 / p95)",
+            latency_detection: "감지",
+            latency_spawn: "프로세스 시작",
+            latency_first_byte: "첫 바이트",
+            no_latency_data: "아직 방송 시작 기록 없음",
+            recording_throughput: "녹화 처리량",
+            recording_segments: "세그먼트",
+            recording_restarts: "재시작",
+            recording_part: "파트",
+            recording_stalls: "정체",
+            no_recordings: "녹화 중 아님",
+            recording_queue: "녹화 대기열",
+            queue_priority: "우선순위",
+            queue_reason_capacity: "다음 빈 슬롯 대기",
+            queue_reason_priority: "더 높은 우선순위 채널 대기 중",
+            queue_reason_order: "먼저 방송을 시작한 채널 대기 중",
+            no_queue: "대기 중인 채널 없음"
         },
         channels: {
             title: "채널 관리",
@@ -309,6 +377,7 @@ const i18n = {
             live: "라이브",
             offline: "오프라인",
             recording: "녹화 중",
+            suspect: "확인 필요",
             no_channels: "채널이 없습니다. '채널 추가'를 클릭하여 녹화를 시작하세요.",
             id_help: "chzzk.naver.com의 채널 ID 또는 사용자명을 입력하세요",
             preview: "채널 미리보기"
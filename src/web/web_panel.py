@@ -14,7 +14,13 @@ from datetime import datetime
 from flask import Flask, request, jsonify, render_template, send_from_directory
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
-import requests
+
+from api.chzzk import record_endpoint_result
+from api.circuit_breaker import breaker_snapshots, get_breaker
+from api.http_transport import configure_transport, get_session, get_timeout
+from core.channel_failures import ChannelFailureTracker
+from core.channel_registry import ChannelRegistry
+from utils.runtime_state import read_state
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -25,6 +31,14 @@ class RecorderWebPanel:
         self.config_path = config_path
         self.record_list_path = record_list_path
         self.config = self.load_config()
+        configure_transport(self.config.get('http'))
+        self.channel_registry = ChannelRegistry(record_list_path)
+        self.channel_registry.start()
+        # 与录制端共用的失效频道状态（保存在频道列表同目录）
+        self.channel_failures = ChannelFailureTracker.from_config(
+            self.config,
+            state_path=os.path.join(os.path.dirname(os.path.abspath(record_list_path)), 'channel_failures.json')
+        )
         self.recorder_processes = {}  # 存储录制进程信息
         self.is_running = False
         
@@ -65,34 +79,26 @@ class RecorderWebPanel:
             return False
     
     def load_channel_list(self):
-        """加载频道列表"""
+        """加载频道列表（频道ID来自注册表的内存副本）"""
         try:
-            logger.info(f"Loading channel list from: {self.record_list_path}")
-            logger.info(f"File exists: {os.path.exists(self.record_list_path)}")
-            
-            if not os.path.exists(self.record_list_path):
-                logger.warning(f"Channel list file does not exist: {self.record_list_path}")
-                return []
-            
-            with open(self.record_list_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-                logger.info(f"File content: {repr(content)}")
-                
-                channels = []
-                for line in content.strip().split('\n'):
-                    channel_id = line.strip()
-                    if channel_id:
-                        logger.info(f"Found channel ID: {channel_id}")
-                        # 获取频道信息以检查直播状态
-                        channel_info = self.get_channel_info(channel_id)
-                        channels.append({
-                            'channel_id': channel_id,
-                            'channel_name': channel_info.get('channelName', f'Channel_{channel_id[:8]}'),
-                            'channel_image': channel_info.get('channelImageUrl', ''),
-                            'is_live': channel_info.get('isLive', False),
-                            'live_title': channel_info.get('liveTitle', ''),
-                            'viewer_count': channel_info.get('viewerCount', 0)
-                        })
+            channels = []
+            suspects = self.channel_failures.suspects()
+            for channel_id in self.channel_registry.channel_ids:
+                # 获取频道信息以检查直播状态
+                channel_info = self.get_channel_info(channel_id)
+                suspect = suspects.get(channel_id)
+                channels.append({
+                    'channel_id': channel_id,
+                    'channel_name': channel_info.get('channelName', f'Channel_{channel_id[:8]}'),
+                    'channel_image': channel_info.get('channelImageUrl', ''),
+                    'is_live': channel_info.get('isLive', False),
+                    'live_title': channel_info.get('liveTitle', ''),
+                    'viewer_count': channel_info.get('viewerCount', 0),
+                    'suspect': suspect is not None,
+                    'suspect_reason': suspect['reason'] if suspect else '',
+                    'suspect_retry_at': suspect['next_retry'] if suspect else 0,
+                    'priority': self.channel_registry.priority(channel_id)
+                })
             
             logger.info(f"Loaded {len(channels)} channels")
             return channels
@@ -101,35 +107,54 @@ class RecorderWebPanel:
             return []
     
     def save_channel_list(self, channels):
-        """保存频道列表"""
+        """保存频道列表（没有指定优先级的频道保留列表中原有的优先级）"""
         try:
             with open(self.record_list_path, 'w', encoding='utf-8') as f:
                 for channel in channels:
-                    f.write(f"{channel['channel_id']}\n")
+                    priority = channel.get('priority', self.channel_registry.priority(channel['channel_id']))
+                    if priority is None:
+                        f.write(f"{channel['channel_id']}\n")
+                    else:
+                        f.write(f"{channel['channel_id']} {priority}\n")
+            self.channel_registry.reload()
             return True
         except Exception as e:
             logger.error(f"Failed to save channel list: {e}")
             return False
     
-    def get_channel_info(self, channel_id):
-        """获取频道信息"""
+    def get_channel_info(self, channel_id, force=False):
+        """获取频道信息（疑似失效的频道在退避期内不请求，force=True 时仍然请求）"""
+        if not force and self.channel_failures.should_skip(channel_id):
+            return {}
+        
+        breaker = get_breaker('channel-info')
+        if not breaker.allow_request():
+            logger.debug(f"Channel info circuit open, skipping request for {channel_id}")
+            return {}
+        
         try:
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
             }
-            response = requests.get(
-                f'https://api.chzzk.naver.com/service/v1/channels/{channel_id}',
-                headers=headers,
-                timeout=10
-            )
+            try:
+                response = get_session().get(
+                    f'https://api.chzzk.naver.com/service/v1/channels/{channel_id}',
+                    headers=headers,
+                    timeout=get_timeout()
+                )
+            except Exception:
+                breaker.record_failure()
+                raise
+            record_endpoint_result(breaker, response.status_code)
             
             logger.info(f"API response for {channel_id}: {response.status_code}")
             
             if response.status_code == 200:
                 data = response.json()
                 logger.info(f"API data: {data}")
-                if data.get('content'):
+                if data.get('content') and data['content'].get('channelId'):
                     content = data['content']
+                    self.channel_failures.record_success(channel_id)
                     result = {
                         'channelName': content.get('channelName', ''),
                         'channelImageUrl': content.get('channelImageUrl', ''),
@@ -141,8 +166,11 @@ class RecorderWebPanel:
                     return result
                 else:
                     logger.warning(f"No content in API response for {channel_id}")
+                    self.channel_failures.record_failure(channel_id, 'empty content', definitive=True)
             else:
                 logger.warning(f"API request failed with status {response.status_code}")
+                if response.status_code == 404:
+                    self.channel_failures.record_failure(channel_id, 'HTTP 404', definitive=True)
                 
         except Exception as e:
             logger.error(f"Failed to get channel info for {channel_id}: {e}")
@@ -444,6 +472,51 @@ class RecorderWebPanel:
             except Exception as e:
                 return jsonify({'error': str(e)}), 500
         
+        @self.app.route('/api/health')
+        def get_health():
+            """获取接口熔断器（录制端与Web面板各自统计）与账号池状态"""
+            try:
+                recorder_state = read_state()
+                return jsonify({
+                    'recorder': recorder_state.get('breakers', {}),
+                    'accounts': recorder_state.get('accounts', []),
+                    'recorder_updated': recorder_state.get('updated'),
+                    'web_panel': breaker_snapshots(),
+                    'timestamp': datetime.now().isoformat()
+                })
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+        
+        @self.app.route('/api/latency')
+        def get_latency():
+            """获取录制端发布的开播检测/进程启动/首字节延迟直方图"""
+            try:
+                recorder_state = read_state()
+                latency = recorder_state.get('latency', {})
+                return jsonify({
+                    'overall': latency.get('overall', {}),
+                    'channels': latency.get('channels', {}),
+                    'recorder_updated': recorder_state.get('updated'),
+                    'timestamp': datetime.now().isoformat()
+                })
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+        
+        @self.app.route('/api/recordings')
+        def get_recordings():
+            """获取录制端发布的各录制写入量、码率、分段与停滞统计，以及等待录制的队列"""
+            try:
+                recorder_state = read_state()
+                return jsonify({
+                    'recordings': recorder_state.get('recordings', {}),
+                    'stalls': recorder_state.get('stalls', {}),
+                    'queue': recorder_state.get('queue', {}),
+                    'recorder_updated': recorder_state.get('updated'),
+                    'timestamp': datetime.now().isoformat()
+                })
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+        
         @self.app.route('/api/channels')
         def get_channels():
             """获取频道列表"""
@@ -470,8 +543,8 @@ class RecorderWebPanel:
                     logger.warning("Empty channel ID provided")
                     return jsonify({'error': 'Channel ID is required'}), 400
                 
-                # 验证频道是否存在
-                channel_info = self.get_channel_info(channel_id)
+                # 验证频道是否存在（即使之前被标记为疑似失效也重新请求）
+                channel_info = self.get_channel_info(channel_id, force=True)
                 logger.info(f"Channel info for {channel_id}: {channel_info}")
                 logger.info(f"Channel name: '{channel_info.get('channelName')}'")
                 logger.info(f"Channel name length: {len(channel_info.get('channelName', ''))}")
@@ -480,9 +553,9 @@ class RecorderWebPanel:
                     logger.warning(f"Channel validation failed for {channel_id}: no channelName")
                     return jsonify({'error': 'Invalid channel ID'}), 400
                 
-                # 加载现有频道列表
-                channels = self.load_channel_list()
-                channel_ids = [ch['channel_id'] for ch in channels]
+                # 现有频道列表（无需重新请求每个频道的信息）
+                channel_ids = self.channel_registry.channel_ids
+                channels = [{'channel_id': cid} for cid in channel_ids]
                 
                 if channel_id in channel_ids:
                     return jsonify({'error': 'Channel already exists'}), 400
@@ -496,6 +569,11 @@ class RecorderWebPanel:
                     'live_title': channel_info.get('liveTitle', ''),
                     'viewer_count': channel_info.get('viewerCount', 0)
                 }
+                if data.get('priority') not in (None, ''):
+                    try:
+                        new_channel['priority'] = int(data['priority'])
+                    except (TypeError, ValueError):
+                        return jsonify({'error': 'Priority must be an integer'}), 400
                 
                 channels.append(new_channel)
                 
@@ -511,8 +589,7 @@ class RecorderWebPanel:
         def delete_channel(channel_id):
             """删除频道"""
             try:
-                channels = self.load_channel_list()
-                channels = [ch for ch in channels if ch['channel_id'] != channel_id]
+                channels = [{'channel_id': cid} for cid in self.channel_registry.channel_ids if cid != channel_id]
                 
                 if self.save_channel_list(channels):
                     return jsonify({'success': True})